@@ -0,0 +1,71 @@
+"""对比单条分析与批量分析的延迟和token消耗
+
+    python -m benchmarks.ai_batch               # 使用本地模拟接口
+    python -m benchmarks.ai_batch --live        # 使用配置中的真实接口
+"""
+import argparse
+import asyncio
+import time
+
+from src.processors.ai_processor import AIProcessor
+from benchmarks.mock_llm_server import MockLLMServer
+
+
+def make_news(count: int):
+    return [
+        {
+            'unique_id': f"bench-{i:04d}",
+            'title': f"某AI公司发布第{i}代大模型，推理成本下降40%",
+            'summary': "该公司宣布新一代大模型在多项基准测试中取得领先，同时推出面向企业的API服务，"
+                       "并计划在未来半年内开放更多行业解决方案。",
+            'tags': ['ai_ml', 'business'],
+            'source': '量子位',
+            'link': f"https://example.com/news/{i}"
+        }
+        for i in range(count)
+    ]
+
+
+async def run_per_item(processor: AIProcessor, news_list):
+    for news in news_list:
+        await processor.analyze_news(news)
+
+
+async def run_batch(processor: AIProcessor, news_list, batch_size: int):
+    await processor.analyze_news_batch(news_list, batch_size=batch_size)
+
+
+def measure(name: str, endpoint: str, coro_factory):
+    processor = AIProcessor()
+    if endpoint:
+        processor.config.SILICONFLOW = dict(processor.config.SILICONFLOW, api_endpoint=endpoint)
+    start = time.monotonic()
+    asyncio.run(coro_factory(processor))
+    wall = time.monotonic() - start
+    stats = processor.get_usage_stats()
+    print(f"{name:<16}{stats['requests']:>10}{stats['prompt_tokens']:>14}{stats['cached_prompt_tokens']:>12}"
+          f"{stats['completion_tokens']:>14}{wall:>10.2f}s")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--items', type=int, default=30)
+    parser.add_argument('--batch-sizes', default='5,10')
+    parser.add_argument('--live', action='store_true')
+    args = parser.parse_args()
+
+    server = None if args.live else MockLLMServer().start()
+    endpoint = server.endpoint if server else None
+    news_list = make_news(args.items)
+
+    print(f"{'mode':<16}{'requests':>10}{'prompt_tok':>14}{'cached_tok':>12}{'output_tok':>14}{'wall':>11}")
+    measure('per-item', endpoint, lambda p: run_per_item(p, news_list))
+    for size in (int(s) for s in args.batch_sizes.split(',')):
+        measure(f"batch={size}", endpoint, lambda p, size=size: run_batch(p, news_list, size))
+
+    if server:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
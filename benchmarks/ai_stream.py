@@ -0,0 +1,59 @@
+"""对比非流式调用与流式提前截断的单条分析延迟、首token耗时和token消耗
+
+    python -m benchmarks.ai_stream
+    python -m benchmarks.ai_stream --live
+"""
+import argparse
+import time
+
+from src.processors.ai_processor import AIProcessor
+from benchmarks.ai_batch import make_news
+from benchmarks.mock_llm_server import MockLLMServer
+
+
+def measure(name: str, endpoint: str, news_list, stream: bool):
+    processor = AIProcessor()
+    if endpoint:
+        processor.config.SILICONFLOW = dict(processor.config.SILICONFLOW, api_endpoint=endpoint)
+
+    start = time.monotonic()
+    lengths = []
+    for news in news_list:
+        prompt = processor._generate_prompt(news)
+        if stream:
+            analysis = processor.call_siliconflow_api_stream(prompt)
+        else:
+            analysis = processor.call_siliconflow_api(prompt)
+        lengths.append(len(analysis or ''))
+    wall = time.monotonic() - start
+
+    stats = processor.get_usage_stats()
+    ttft = f"{stats['avg_ttft']:.2f}s" if stats['avg_ttft'] is not None else '-'
+    print(f"{name:<12}{wall / len(news_list):>10.2f}s{ttft:>10}"
+          f"{stats['completion_tokens'] / len(news_list):>14.0f}{sum(lengths) / len(lengths):>10.0f}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--items', type=int, default=5)
+    parser.add_argument('--reasoning-tokens', type=int, default=60)
+    parser.add_argument('--live', action='store_true')
+    args = parser.parse_args()
+
+    server = None
+    if not args.live:
+        server = MockLLMServer(overhead=0.3, decode_per_token=0.01,
+                               reasoning_tokens=args.reasoning_tokens).start()
+    endpoint = server.endpoint if server else None
+    news_list = make_news(args.items)
+
+    print(f"{'mode':<12}{'latency':>11}{'ttft':>10}{'output_tok':>14}{'chars':>10}")
+    measure('blocking', endpoint, news_list, stream=False)
+    measure('stream', endpoint, news_list, stream=True)
+
+    if server:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
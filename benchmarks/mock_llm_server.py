@@ -0,0 +1,154 @@
+import json
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from src.utils.tokens import estimate_tokens
+
+ANALYSIS_TEXT = "该新闻反映了行业技术迭代加速，头部公司在模型能力和商业化上持续投入，短期内将推动相关产品落地，中长期影响行业竞争格局。"
+
+
+class MockLLMHandler(BaseHTTPRequestHandler):
+    """模拟OpenAI兼容的chat/completions接口
+
+    响应耗时 = 固定开销 + 输入token * 预填充耗时 + 输出token * 解码耗时，
+    用于在本地对比不同调用方式的延迟和token消耗。
+    """
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length', 0))
+        body = json.loads(self.rfile.read(length) or b'{}')
+        messages = body['messages']
+        prompt = ''.join(message['content'] for message in messages)
+        if not self.server.admit():
+            self._send_json(429, {'message': 'rate limit exceeded'}, {'Retry-After': '1'})
+            return
+
+        content = build_content(prompt)
+        if body.get('stream'):
+            self._stream(prompt, content)
+            return
+
+        prompt_tokens = estimate_tokens(prompt)
+        cached_tokens = self.server.cached_prefix_tokens(messages)
+        completion_tokens = estimate_tokens(content) + self.server.reasoning_tokens
+        time.sleep(
+            self.server.overhead
+            + (prompt_tokens - cached_tokens) * self.server.prefill_per_token
+            + completion_tokens * self.server.decode_per_token
+        )
+
+        payload = {
+            'choices': [{'message': {'role': 'assistant', 'content': content}}],
+            'usage': {
+                'prompt_tokens': prompt_tokens,
+                'completion_tokens': completion_tokens,
+                'total_tokens': prompt_tokens + completion_tokens,
+                'prompt_tokens_details': {'cached_tokens': cached_tokens}
+            }
+        }
+        self._send_json(200, payload)
+
+    def _stream(self, prompt: str, content: str):
+        """以SSE逐token推送，先推送推理过程再推送正文；客户端断开后停止生成"""
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.end_headers()
+        time.sleep(self.server.overhead + estimate_tokens(prompt) * self.server.prefill_per_token)
+
+        deltas = [{'reasoning_content': '思考'}] * self.server.reasoning_tokens
+        deltas += [{'content': content[i:i + 2]} for i in range(0, len(content), 2)]
+        try:
+            for delta in deltas:
+                chunk = {'choices': [{'delta': delta}]}
+                self.wfile.write(f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n".encode('utf-8'))
+                self.wfile.flush()
+                time.sleep(self.server.decode_per_token)
+            self.wfile.write(b"data: [DONE]\n\n")
+            self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+        self.close_connection = True
+
+    def _send_json(self, status: int, payload: dict, headers: dict = None):
+        data = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+
+def build_content(prompt: str) -> str:
+    """根据提示词生成模拟回答：批量提示词返回按id组织的JSON"""
+    ids = re.findall(r'"id": "([^"]+)"', prompt)
+    if ids:
+        return json.dumps({news_id: ANALYSIS_TEXT for news_id in ids}, ensure_ascii=False)
+    # 单条分析时模型往往会超出字数要求
+    return ANALYSIS_TEXT * 6
+
+
+class MockLLMServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, port: int = 0, overhead: float = 0.8,
+                 prefill_per_token: float = 0.0005, decode_per_token: float = 0.02,
+                 reasoning_tokens: int = 0, rpm: int = None, burst: int = 1,
+                 handler=MockLLMHandler):
+        super().__init__(('127.0.0.1', port), handler)
+        self.overhead = overhead
+        self.prefill_per_token = prefill_per_token
+        self.decode_per_token = decode_per_token
+        self.reasoning_tokens = reasoning_tokens
+
+        # 服务端限流：每分钟rpm个请求，最多突发burst个
+        self.rpm = rpm
+        self.burst = burst
+        self.allowance = float(burst)
+        self.allowance_updated = time.monotonic()
+        self.admitted = 0
+        self.rejected = 0
+        self.lock = threading.Lock()
+        self.seen_prefixes = set()
+
+    def cached_prefix_tokens(self, messages) -> int:
+        """模拟服务端前缀缓存：之前出现过的system消息计为缓存命中"""
+        if not messages or messages[0].get('role') != 'system':
+            return 0
+        prefix = messages[0]['content']
+        with self.lock:
+            hit = prefix in self.seen_prefixes
+            self.seen_prefixes.add(prefix)
+        return estimate_tokens(prefix) if hit else 0
+
+    def admit(self) -> bool:
+        """按服务端限流判断是否接受请求"""
+        with self.lock:
+            if self.rpm:
+                now = time.monotonic()
+                self.allowance = min(self.burst, self.allowance + (now - self.allowance_updated) * self.rpm / 60)
+                self.allowance_updated = now
+                if self.allowance < 1:
+                    self.rejected += 1
+                    return False
+                self.allowance -= 1
+            self.admitted += 1
+            return True
+
+    @property
+    def endpoint(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}/v1/chat/completions"
+
+    def start(self) -> 'MockLLMServer':
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
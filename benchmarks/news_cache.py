@@ -0,0 +1,204 @@
+"""NewsCache基准测试
+
+写入吞吐：每次添加都重写整个JSON快照（旧实现） vs 追加写日志
+内存占用：{hex摘要: {'title', 'source', 'timestamp'}} 字典（旧实现） vs 二进制摘要集合
+启动耗时：加载并校验JSON、启动时重写（旧实现） vs 读取二进制快照，直到第一次查询返回
+
+    python -m benchmarks.news_cache --items 100000 --memory-items 1000000 --startup-items 100000,1000000
+"""
+import argparse
+import gc
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import time
+import tracemalloc
+
+from src.utils.digest_set import BloomFilter, DigestSet
+from src.utils.news_cache import NewsCache
+
+
+def make_news(index: int) -> dict:
+    return {
+        'title': f"基准测试新闻标题 {index}：某公司发布新一代大模型推理芯片",
+        'link': f"https://example.com/news/{index}",
+        'source': 'bench'
+    }
+
+
+def rewrite_snapshot(path: str, cache: dict) -> None:
+    """旧实现每次添加后的写入：完整序列化、fsync、读回校验、备份、替换"""
+    temp_file = f"{path}.tmp"
+    with open(temp_file, 'w', encoding='utf-8') as f:
+        f.write(json.dumps(cache, ensure_ascii=False, indent=2))
+        f.flush()
+        os.fsync(f.fileno())
+    with open(temp_file, 'r', encoding='utf-8') as f:
+        json.loads(f.read())
+    if os.path.exists(path):
+        os.replace(path, f"{path}.bak")
+    os.replace(temp_file, path)
+
+
+def bench_snapshot_per_add(directory: str, items: int, adds: int) -> float:
+    now = time.time()
+    cache = {
+        'items': {
+            f"{index:032x}": {'title': make_news(index)['title'], 'source': 'bench', 'timestamp': now}
+            for index in range(items)
+        },
+        'last_cleanup': now,
+        'version': '1.0'
+    }
+    path = os.path.join(directory, 'legacy.json')
+    start = time.perf_counter()
+    for index in range(items, items + adds):
+        cache['items'][f"{index:032x}"] = {'title': make_news(index)['title'], 'source': 'bench', 'timestamp': now}
+        rewrite_snapshot(path, cache)
+    return adds / (time.perf_counter() - start)
+
+
+def bench_journal(directory: str, items: int, adds: int) -> float:
+    cache = NewsCache(cache_dir=directory)
+    for index in range(items):
+        cache.add_news(make_news(index))
+    cache.compact(wait=True)
+
+    start = time.perf_counter()
+    for index in range(items, items + adds):
+        cache.add_news(make_news(index))
+    cache.journal.sync()
+    rate = adds / (time.perf_counter() - start)
+    cache.close()
+    return rate
+
+
+def legacy_startup(path: str) -> None:
+    """旧实现的启动过程：完整加载JSON、逐条校验、立即重写快照"""
+    with open(path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    for item in data['items'].values():
+        if not isinstance(item, dict) or 'title' not in item or 'timestamp' not in item:
+            break
+    rewrite_snapshot(path, data)
+
+
+def bench_startup(count: int) -> None:
+    now = time.time()
+    probe = make_news(count // 2)
+    with tempfile.TemporaryDirectory() as directory:
+        legacy_path = os.path.join(directory, 'legacy.json')
+        with open(legacy_path, 'w', encoding='utf-8') as f:
+            json.dump({
+                'items': {
+                    f"{index:032x}": {'title': make_news(index)['title'], 'source': 'bench', 'timestamp': now}
+                    for index in range(count)
+                },
+                'last_cleanup': now,
+                'version': '1.0'
+            }, f, ensure_ascii=False, indent=2)
+        start = time.perf_counter()
+        legacy_startup(legacy_path)
+        legacy_time = time.perf_counter() - start
+        os.remove(legacy_path)
+
+        # 条目分布在最近6天的桶中
+        cache = NewsCache(cache_dir=directory)
+        for index in range(count):
+            news = make_news(index)
+            cache.digests.add(cache._generate_digest(news), now - (index % 6) * 86400 - 1)
+        cache._rebuild_bloom()
+        cache.compact(wait=True)
+        cache.close()
+
+        start = time.perf_counter()
+        cache = NewsCache(cache_dir=directory)
+        assert cache.is_exists(probe)
+        snapshot_time = time.perf_counter() - start
+        cache.close()
+
+    print(f"{count:>10}{legacy_time * 1000:>16.1f}{snapshot_time * 1000:>16.1f}{legacy_time / snapshot_time:>10.1f}x")
+
+
+def measure_memory(build) -> int:
+    """构建数据结构并返回其占用的内存字节数"""
+    gc.collect()
+    tracemalloc.start()
+    result = build()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return size
+
+
+def bench_memory(count: int) -> None:
+    now = time.time()
+
+    def entries():
+        for index in range(count):
+            news = make_news(index)
+            digest = hashlib.md5(f"{news['title']}{news['link']}{news['source']}".encode('utf-8')).digest()
+            yield digest, news
+
+    def legacy_dict():
+        return {
+            digest.hex(): {'title': news['title'], 'source': news['source'], 'timestamp': now}
+            for digest, news in entries()
+        }
+
+    def digest_set():
+        digests = DigestSet(count)
+        for digest, _ in entries():
+            digests.add(digest, now)
+        return digests
+
+    def bloom_filter():
+        bloom = BloomFilter(count * 2)
+        for digest, _ in entries():
+            bloom.add(digest)
+        return bloom
+
+    def title_store():
+        return {digest: news['title'] for digest, news in entries()}
+
+    legacy = measure_memory(legacy_dict)
+    print(f"{'structure':<26}{'MB':>10}{'bytes/item':>12}{'vs dict':>10}")
+    for name, build in (('dict of dicts (old)', None), ('digest set', digest_set),
+                        ('bloom filter (1%)', bloom_filter), ('title side store', title_store)):
+        size = legacy if build is None else measure_memory(build)
+        print(f"{name:<26}{size / 1e6:>10.1f}{size / count:>12.1f}{legacy / size:>9.1f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--items', type=int, default=100000, help='已缓存的新闻条数')
+    parser.add_argument('--legacy-adds', type=int, default=20)
+    parser.add_argument('--journal-adds', type=int, default=20000)
+    parser.add_argument('--memory-items', type=int, default=1000000, help='内存对比的条目数，0表示跳过')
+    parser.add_argument('--startup-items', default='100000,1000000', help='启动耗时对比的条目数，逗号分隔，空表示跳过')
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.CRITICAL)
+
+    print(f"cached items: {args.items}")
+    print(f"{'mode':<22}{'adds':>8}{'adds/sec':>12}")
+    with tempfile.TemporaryDirectory() as directory:
+        rate = bench_snapshot_per_add(directory, args.items, args.legacy_adds)
+        print(f"{'snapshot per add':<22}{args.legacy_adds:>8}{rate:>12.1f}")
+        rate = bench_journal(directory, args.items, args.journal_adds)
+        print(f"{'journal':<22}{args.journal_adds:>8}{rate:>12.1f}")
+
+    if args.startup_items:
+        print("\ntime to ready (ms)")
+        print(f"{'items':>10}{'json (old)':>16}{'snapshot':>16}{'speedup':>11}")
+        for count in args.startup_items.split(','):
+            bench_startup(int(count))
+
+    if args.memory_items:
+        print(f"\nmemory at {args.memory_items} entries")
+        bench_memory(args.memory_items)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""在强制RPM限流的本地模拟接口上对比有无客户端限流时的吞吐和失败数
+
+    python -m benchmarks.rate_limit --rpm 120 --duration 30
+"""
+import argparse
+import logging
+import threading
+import time
+
+from src.config import Config
+from src.processors.ai_processor import AIProcessor
+from src.utils import rate_limiter
+from benchmarks.mock_llm_server import MockLLMServer
+
+
+def run(enabled: bool, args) -> None:
+    server = MockLLMServer(overhead=0.05, decode_per_token=0.0, rpm=args.rpm, burst=args.burst).start()
+
+    Config.RATE_LIMITS = dict(
+        Config.RATE_LIMITS,
+        enabled=enabled,
+        providers={'siliconflow': {'default': {'rpm': args.rpm, 'burst': args.burst}}}
+    )
+    rate_limiter._limiters.clear()
+
+    processor = AIProcessor()
+    processor.config.SILICONFLOW = dict(processor.config.SILICONFLOW, api_endpoint=server.endpoint, model='bench')
+
+    results = {'ok': 0, 'failed': 0}
+    lock = threading.Lock()
+    stop_at = time.monotonic() + args.duration
+
+    def worker():
+        while time.monotonic() < stop_at:
+            ok = processor.call_siliconflow_api("请简要分析这条新闻。", max_tokens=64) is not None
+            with lock:
+                results['ok' if ok else 'failed'] += 1
+
+    threads = [threading.Thread(target=worker) for _ in range(args.workers)]
+    start = time.monotonic()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.monotonic() - start
+
+    name = 'limiter on' if enabled else 'limiter off'
+    print(f"{name:<14}{results['ok']:>8}{results['failed']:>8}{server.rejected:>8}"
+          f"{results['ok'] / elapsed * 60:>12.1f}")
+    server.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rpm', type=int, default=120)
+    parser.add_argument('--burst', type=int, default=5)
+    parser.add_argument('--workers', type=int, default=8)
+    parser.add_argument('--duration', type=float, default=30)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.CRITICAL)
+
+    print(f"limit: {args.rpm} rpm (burst {args.burst}), {args.workers} workers, {args.duration:g}s")
+    print(f"{'mode':<14}{'ok':>8}{'failed':>8}{'429s':>8}{'ok/min':>12}")
+    run(False, args)
+    run(True, args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""多进程共享去重存储的吞吐与独占性：1~8个进程同时认领并标记同一批新闻
+
+    python -m benchmarks.shared_cache --items 20000 --writers 1,2,4,8
+"""
+import argparse
+import logging
+import multiprocessing
+import os
+import random
+import tempfile
+import time
+
+from src.utils.shared_cache import SharedNewsCache
+
+
+def make_news(index: int) -> dict:
+    return {'title': f"基准测试新闻 {index}", 'link': f"https://example.com/news/{index}", 'source': 'bench'}
+
+
+def worker(db_path: str, items: int, seed: int, start_event, results) -> None:
+    cache = SharedNewsCache(db_path, owner=f"worker-{seed}")
+    order = list(range(items))
+    random.Random(seed).shuffle(order)
+    start_event.wait()
+
+    claimed = []
+    for index in order:
+        news = make_news(index)
+        if cache.claim(news):
+            cache.add_news(news)
+            claimed.append(index)
+    cache.close()
+    results.put(claimed)
+
+
+def run(writers: int, items: int) -> None:
+    with tempfile.TemporaryDirectory() as directory:
+        db_path = os.path.join(directory, 'shared.db')
+        SharedNewsCache(db_path).close()
+
+        start_event = multiprocessing.Event()
+        results = multiprocessing.Queue()
+        processes = [
+            multiprocessing.Process(target=worker, args=(db_path, items, seed, start_event, results))
+            for seed in range(writers)
+        ]
+        for process in processes:
+            process.start()
+        time.sleep(0.5)
+
+        start = time.perf_counter()
+        start_event.set()
+        claimed = [results.get() for _ in processes]
+        elapsed = time.perf_counter() - start
+        for process in processes:
+            process.join()
+
+    total = sum(len(indices) for indices in claimed)
+    unique = len(set().union(*claimed))
+    attempts = writers * items
+    print(f"{writers:>8}{attempts / elapsed:>14.0f}{unique / elapsed:>14.0f}{unique:>10}{total - unique:>12}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--items', type=int, default=20000)
+    parser.add_argument('--writers', default='1,2,4,8')
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.CRITICAL)
+
+    print(f"items: {args.items}, every writer tries to claim every item")
+    print(f"{'writers':>8}{'claims/sec':>14}{'pushes/sec':>14}{'claimed':>10}{'duplicates':>12}")
+    for writers in args.writers.split(','):
+        run(int(writers), args.items)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+"""嵌入式SQLite存储的全文检索延迟：FTS5（中日韩二元组） vs LIKE全表扫描
+
+    python -m benchmarks.storage_search --docs 1000000
+
+合成语料的词频服从Zipf分布，查询词按5%、0.5%、0.05%的比例植入新闻。新闻通过upsert_batch写入
+（与BulkWriter相同的写入路径），之后对各类查询各执行多次，统计p50/p95延迟。
+"""
+import argparse
+import itertools
+import logging
+import os
+import random
+import statistics
+import tempfile
+import time
+
+from src.storage.sqlite_backend import SQLiteDatabase
+
+# 合成词表：从常用汉字区间取字组成2~4字的词，按Zipf分布出现，模拟真实语料中词频的长尾
+VOCABULARY_SIZE = 20000
+EN_VOCABULARY = [
+    'OpenAI', 'NVIDIA', 'Google', 'Meta', 'Apple', 'Microsoft', 'DeepSeek', 'GPU', 'LLM', 'transformer',
+    'benchmark', 'inference', 'training', 'robotics', 'cloud', 'startup', 'funding', 'model', 'release', 'agent'
+]
+SOURCES = ['36氪', '虎嗅', '机器之心', '量子位', 'InfoQ', 'TechCrunch', 'The Verge', 'Wired']
+TAGS = ['ai_ml', 'chip', 'robotics', 'cloud', 'startup']
+
+# 查询词及其在新闻中出现的比例：常见、中等、罕见
+PLANTED = {
+    '芯片': 0.05, '量子计算': 0.005, '光刻机': 0.0005,
+    'Anthropic': 0.05, 'open-source': 0.005, 'Mamba': 0.0005,
+    '融资': 0.02, '机器人': 0.02, '算力': 0.01
+}
+QUERIES = [
+    ('zh 2-char 5%', '芯片', {}),
+    ('zh 4-char 0.5%', '量子计算', {}),
+    ('zh 3-char 0.05%', '光刻机', {}),
+    ('en 5%', 'Anthropic', {}),
+    ('en 0.5%', 'open-source', {}),
+    ('en 0.05%', 'Mamba', {}),
+    ('zh 2 words', '芯片 算力', {}),
+    ('mixed', 'Anthropic 芯片', {}),
+    ('zh + tag', '融资', {'tags': ['startup']}),
+    ('zh + date', '机器人', {'start_date': '2026-12-01'}),
+]
+
+
+class Corpus:
+    def __init__(self, seed: int = 42):
+        self.rng = random.Random(seed)
+        chars = [chr(0x4e00 + offset) for offset in range(3000)]
+        self.words = [
+            ''.join(self.rng.choice(chars) for _ in range(self.rng.randint(2, 4)))
+            for _ in range(VOCABULARY_SIZE)
+        ]
+        weights = [1 / rank for rank in range(1, VOCABULARY_SIZE + 1)]
+        self.cum_weights = list(itertools.accumulate(weights))
+
+    def sentence(self, count: int) -> str:
+        words = self.rng.choices(self.words, cum_weights=self.cum_weights, k=count)
+        if self.rng.random() < 0.2:
+            words[self.rng.randrange(count)] = f" {self.rng.choice(EN_VOCABULARY)} "
+        return ''.join(words).strip()
+
+    def make_news(self, index: int) -> dict:
+        rng = self.rng
+        title = self.sentence(rng.randint(4, 8))
+        summary = '，'.join(self.sentence(rng.randint(5, 10)) for _ in range(3))
+        for word, ratio in PLANTED.items():
+            if rng.random() < ratio:
+                padded = f" {word} " if word.isascii() else word
+                if rng.random() < 0.5:
+                    title += padded
+                else:
+                    summary += padded
+        day = index % 365
+        return {
+            'unique_id': f"{index:032x}",
+            'title': title.strip(),
+            'summary': summary.strip() + '。',
+            'published': time.strftime('%Y-%m-%dT%H:%M:%S', time.gmtime(1767225600 + day * 86400 + index % 86400)),
+            'source': rng.choice(SOURCES),
+            'language': 'zh',
+            'tags': rng.sample(TAGS, rng.randint(1, 2)),
+            'text_processed': True,
+            'created_at': '2026-01-01T00:00:00'
+        }
+
+
+def build(db: SQLiteDatabase, docs: int, batch_size: int) -> float:
+    corpus = Corpus()
+    start = time.perf_counter()
+    for offset in range(0, docs, batch_size):
+        db.upsert_batch([corpus.make_news(index) for index in range(offset, min(docs, offset + batch_size))])
+    return docs / (time.perf_counter() - start)
+
+
+def like_scan(db: SQLiteDatabase, keyword: str, limit: int = 50) -> list:
+    """没有全文索引时的做法：对每个词LIKE匹配标题和摘要，按发布时间排序"""
+    conditions, params = [], []
+    for word in keyword.split():
+        conditions.append("(json_extract(data, '$.title') LIKE ? OR json_extract(data, '$.summary') LIKE ?)")
+        params.extend([f'%{word}%', f'%{word}%'])
+    return db._select(
+        f"SELECT data FROM news WHERE {' AND '.join(conditions)} ORDER BY published DESC LIMIT ?",
+        params + [limit]
+    )
+
+
+def measure(run, repeat: int) -> tuple:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = run()
+        timings.append((time.perf_counter() - start) * 1000)
+    timings.sort()
+    return statistics.median(timings), timings[int(len(timings) * 0.95) - 1 if repeat >= 20 else -1], len(result)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--docs', type=int, default=1000000)
+    parser.add_argument('--batch-size', type=int, default=2000)
+    parser.add_argument('--repeat', type=int, default=20, help='每个查询的执行次数')
+    parser.add_argument('--db', help='数据库文件路径：不存在时在此构建，已存在时直接复用')
+    parser.add_argument('--like-repeat', type=int, default=3, help='LIKE扫描的执行次数，0表示跳过')
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.CRITICAL)
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = args.db or os.path.join(directory, 'news.db')
+        reuse = os.path.exists(path)
+        db = SQLiteDatabase(path)
+        if reuse:
+            docs = db.get_stats()['total_news']
+            print(f"docs: {docs}  (reusing {path})")
+        else:
+            rate = build(db, args.docs, args.batch_size)
+            db.conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+            size = os.path.getsize(path)
+            print(f"docs: {args.docs}  build: {rate:,.0f} docs/sec  db size: {size / 1e6:,.0f} MB")
+
+        print(f"\n{'query':<18}{'keyword':<16}{'fts p50':>10}{'fts p95':>10}{'hits':>6}{'like p50':>12}{'speedup':>10}")
+        for name, keyword, filters in QUERIES:
+            p50, p95, hits = measure(lambda: db.search_news(keyword, **filters), args.repeat)
+            like = ''
+            speedup = ''
+            if args.like_repeat and not filters:
+                like_p50, _, _ = measure(lambda: like_scan(db, keyword), args.like_repeat)
+                like = f"{like_p50:.1f}"
+                speedup = f"{like_p50 / p50:.1f}x"
+            print(f"{name:<18}{keyword:<16}{p50:>10.1f}{p95:>10.1f}{hits:>6}{like:>12}{speedup:>10}")
+        print("\nlatency in ms; fts = search_news (bm25 ranked, limit 50), like = LIKE scan ordered by published")
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""对比每条消息新建会话与共享长连接会话的推送延迟（本地HTTPS模拟企业微信webhook）
+
+    python -m benchmarks.wechat_session --messages 50
+"""
+import argparse
+import asyncio
+import json
+import os
+import socket
+import ssl
+import statistics
+import subprocess
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import aiohttp
+
+from src.utils.wechat import WeChatNotifier
+
+
+class WebhookHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # 支持keep-alive
+
+    def log_message(self, format, *args):
+        pass
+
+    def setup(self):
+        super().setup()
+        # 响应头和正文分两次写出，关闭Nagle避免与延迟ACK叠加产生约40ms的额外等待
+        self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        body = json.dumps({'errcode': 0, 'errmsg': 'ok'}).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def start_https_server(cert_dir: str):
+    """生成自签名证书并启动本地HTTPS服务"""
+    cert_file = os.path.join(cert_dir, 'cert.pem')
+    key_file = os.path.join(cert_dir, 'key.pem')
+    subprocess.run(
+        ['openssl', 'req', '-x509', '-newkey', 'rsa:2048', '-nodes', '-days', '1',
+         '-keyout', key_file, '-out', cert_file, '-subj', '/CN=127.0.0.1',
+         '-addext', 'subjectAltName=IP:127.0.0.1'],
+        check=True, capture_output=True
+    )
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), WebhookHandler)
+    server.daemon_threads = True
+    server_context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+    server_context.load_cert_chain(cert_file, key_file)
+    server.socket = server_context.wrap_socket(server.socket, server_side=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    client_context = ssl.create_default_context(cafile=cert_file)
+    return server, client_context
+
+
+async def send_with_new_session(url: str, client_context: ssl.SSLContext, content: str) -> bool:
+    """改造前的做法：每条消息新建一个会话"""
+    data = {"msgtype": "markdown", "markdown": {"content": content}}
+    async with aiohttp.ClientSession(connector=aiohttp.TCPConnector(ssl=client_context)) as session:
+        async with session.post(url, json=data) as response:
+            result = await response.json()
+            return result.get('errcode') == 0
+
+
+async def measure(name: str, send, count: int) -> None:
+    latencies = []
+    for i in range(count):
+        start = time.perf_counter()
+        assert await send(f"## 测试消息 {i}")
+        latencies.append((time.perf_counter() - start) * 1000)
+    latencies.sort()
+    p95 = latencies[int(0.95 * (len(latencies) - 1))]
+    print(f"{name:<16}{statistics.mean(latencies):>10.2f}{statistics.median(latencies):>10.2f}{p95:>10.2f}")
+
+
+async def run(count: int, url: str, client_context: ssl.SSLContext) -> None:
+    print(f"{'mode':<16}{'mean_ms':>10}{'p50_ms':>10}{'p95_ms':>10}")
+    await measure('new session', lambda c: send_with_new_session(url, client_context, c), count)
+
+    notifier = WeChatNotifier()
+    notifier.webhook_url = url
+    await notifier.start(ssl_context=client_context)
+    try:
+        await measure('shared session', notifier.send_message, count)
+    finally:
+        await notifier.close()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--messages', type=int, default=50)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as cert_dir:
+        server, client_context = start_https_server(cert_dir)
+        url = f"https://127.0.0.1:{server.server_address[1]}/cgi-bin/webhook/send?key=bench"
+        try:
+            asyncio.run(run(args.messages, url, client_context))
+        finally:
+            server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -122,11 +122,30 @@ class Config:
         ]
     }
 
-    # MongoDB配置
+    # 新闻存储配置：backend为mongodb（默认）或sqlite（嵌入式，单机部署不需要外部数据库）
     DATABASE = {
+        'backend': os.getenv('STORAGE_BACKEND', 'mongodb'),
+        'sqlite_path': os.getenv(
+            'STORAGE_SQLITE_PATH',
+            os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'news.db')
+        ),
         'uri': os.getenv('MONGODB_URI', 'mongodb://localhost:27017/news_aggregator'),
         'name': 'news_aggregator',
-        'collection': 'news'
+        'collection': 'news',
+        'rollup_collection': 'news_daily',  # 按 (日期, 来源, 语言, 标签) 汇总的计数
+        # 使用sqlite或配置了MONGODB_URI时持久化流水线中的新闻
+        'enabled': os.getenv('STORAGE_BACKEND') == 'sqlite' or bool(os.getenv('MONGODB_URI')),
+        'max_pool_size': int(os.getenv('MONGODB_MAX_POOL_SIZE', '10')),
+        'stats_cache_ttl': 60.0,  # get_stats结果在进程内缓存的秒数
+        # 写后缓冲：新闻先进入内存缓冲，攒够flush_size条或最早一条等待超过flush_interval秒后批量写入，
+        # 缓冲中超过max_buffer条时写入方阻塞等待
+        'write_buffer': {
+            'flush_size': 500,
+            'flush_interval': 5.0,
+            'max_buffer': 5000,
+            'retry_backoff': 5.0,     # 数据库不可用时的重试间隔（秒）
+            'close_timeout': 30.0     # 退出时等待缓冲写完的最长时间（秒）
+        }
     }
 
     # 关键词过滤
@@ -256,7 +275,17 @@ class Config:
         'corp_id': os.getenv('WECHAT_CORP_ID'),
         'corp_secret': os.getenv('WECHAT_CORP_SECRET'),
         'agent_id': os.getenv('WECHAT_AGENT_ID'),
-        'webhook_key': os.getenv('WECHAT_WEBHOOK_KEY')
+        'webhook_key': os.getenv('WECHAT_WEBHOOK_KEY'),
+        'token_refresh_ahead': 300,   # 访问令牌过期前多少秒在后台主动刷新
+        'token_expiry_margin': 60     # 访问令牌过期前多少秒视为失效
+    }
+
+    # 推送渠道HTTP连接配置（每个渠道各自一个连接池）
+    NOTIFY_HTTP = {
+        'connection_limit': 10,     # 连接池最大连接数
+        'dns_cache_ttl': 300,       # DNS缓存时间（秒）
+        'keepalive_timeout': 60,    # 空闲连接保持时间（秒）
+        'timeout': 15               # 单次请求总超时（秒）
     }
 
     # 钉钉配置
@@ -276,5 +305,100 @@ class Config:
     SILICONFLOW = {
         'api_endpoint': 'https://api.siliconflow.cn/v1/chat/completions',
         'api_key': os.getenv('SILICONFLOW_API_KEY'),
-        'model': 'Pro/deepseek-ai/DeepSeek-R1'
-    } 
\ No newline at end of file
+        'model': 'Pro/deepseek-ai/DeepSeek-R1',
+        'stream': True,             # 单条分析使用SSE流式输出
+        'stream_max_chars': 220,            # 分析内容达到该长度后提前结束流
+        'stream_max_reasoning_chars': 2000  # 推理过程（reasoning_content）达到该长度后提前结束流
+    }
+
+    # AI批量分析配置
+    AI_BATCH = {
+        'enabled': os.getenv('AI_BATCH_ENABLED', 'false').lower() == 'true',  # 默认逐条分析，设为true开启批量
+        'batch_size': int(os.getenv('AI_BATCH_SIZE', '5')),  # 每个请求打包的新闻条数
+        'max_tokens_per_item': 400,   # 每条新闻预留的输出token
+        'max_tokens': 4096            # 单次批量请求的输出上限
+    }
+
+    # AI服务商路由配置
+    AI_ROUTER = {
+        'providers': ['siliconflow', 'dify'],  # 按优先级排列
+        'hedge_percentile': 95,       # 主服务商超过该延迟分位数后发起对冲请求
+        'window_size': 50,            # 延迟统计的滚动窗口大小
+        'min_samples': 5,             # 样本不足时使用默认对冲等待时间
+        'default_hedge_delay': 20.0,  # 秒
+        'timeout': 90.0               # 单条分析的总时限（秒）
+    }
+
+    # AI分析预算配置（每轮）
+    AI_BUDGET = {
+        'run_tokens': 60000,             # 每轮AI分析的token预算（输入+输出估算）
+        'run_seconds': 900,              # 每轮AI分析的时间预算（秒）
+        'item_prompt_tokens': 800,       # 单条提示词的token上限
+        'output_tokens_per_item': 600,   # 单条分析预估的输出token（含推理过程）
+        'overflow': 'extractive'         # 超出预算: extractive=抽取式摘要推送, defer=留到下一轮
+    }
+
+    # AI服务商限流配置（按账户等级调整）
+    RATE_LIMITS = {
+        'enabled': True,
+        'max_wait': 120.0,           # 单个请求最长排队时间（秒）
+        'max_throttle_retries': 5,   # 收到429后最多重新排队的次数
+        'providers': {
+            'siliconflow': {
+                'Pro/deepseek-ai/DeepSeek-R1': {'rpm': 1000, 'tpm': 10000},
+                'default': {'rpm': 1000, 'tpm': 50000}
+            },
+            'dify': {
+                'default': {'rpm': 60}
+            }
+        }
+    }
+
+    # AI服务商熔断配置
+    CIRCUIT_BREAKER = {
+        'failure_threshold': 3,    # 连续失败多少次后熔断
+        'recovery_timeout': 60.0,  # 无后台探测时，熔断多久后放行试探请求（秒）
+        'probe_interval': 30.0     # 熔断期间后台探测服务商的间隔（秒）
+    }
+
+    # 推送流水线配置
+    NOTIFICATION = {
+        'queue_size': 5,              # 分析阶段与推送阶段之间的队列长度
+        'analysis_concurrency': 2,    # 同时进行的AI分析单元数
+        'digest': os.getenv('NOTIFICATION_DIGEST', 'false').lower() == 'true',  # 合并多条新闻为一条摘要消息
+        # 启用的推送渠道，逗号分隔：wechat, dingtalk
+        'channels': [name.strip() for name in os.getenv('NOTIFICATION_CHANNELS', 'wechat').split(',') if name.strip()]
+    }
+
+    # 推送发件箱配置
+    OUTBOX = {
+        'path': os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'outbox.db'),
+        # 各渠道独立限速：群机器人每分钟最多20条消息，burst为最多连续发送的消息数
+        'channels': {
+            'wechat': {'rate_per_minute': 20, 'burst': 5},
+            'dingtalk': {'rate_per_minute': 20, 'burst': 5}
+        },
+        'max_attempts': 8,        # 最大发送次数，超过后放弃
+        'base_backoff': 30.0,     # 首次重试等待（秒），之后指数增长
+        'max_backoff': 3600.0,    # 最长重试等待（秒）
+        'lease': 600.0            # 多个进程共用发件箱时，取出的消息在该时间内由本进程独占发送（秒）
+    }
+
+    # 推送缓存配置
+    NEWS_CACHE = {
+        'dir': os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data'),  # 缓存文件目录
+        'fsync_every': 32,                  # 日志每写入多少条记录fsync一次
+        'fsync_interval': 1.0,              # 日志最长间隔多少秒fsync一次
+        'compact_bytes': 4 * 1024 * 1024,   # 日志超过该大小后在后台压缩为快照
+        'bucket_seconds': 86400,            # 过期分桶粒度（秒），过期时整桶丢弃
+        'bloom_error_rate': 0.01,           # 布隆过滤器误判率，设为0关闭
+        'keep_titles': os.getenv('NEWS_CACHE_KEEP_TITLES', 'false').lower() == 'true',  # 保留标题旁路存储，便于调试
+        # 多进程共享去重：backend设为shared时所有进程使用同一个SQLite文件，认领超过claim_ttl秒未推送则失效
+        'backend': os.getenv('NEWS_CACHE_BACKEND', 'local'),
+        'shared_path': os.getenv(
+            'NEWS_CACHE_SHARED_PATH',
+            os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'news_cache_shared.db')
+        ),
+        'claim_ttl': 3600,
+        'claim_refresh_interval': 600       # 发件箱中等待重试的新闻，每隔多少秒延长一次认领
+    }
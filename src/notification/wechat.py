@@ -5,7 +5,64 @@ import requests
 from datetime import datetime
 from ..config import Config
 
+# 企业微信markdown消息内容上限（UTF-8字节）
+MARKDOWN_MAX_BYTES = 4096
+
+
+def group_by_tag(news_items: List[Dict], primary_only: bool = False) -> Dict[str, List[Dict]]:
+    """按标签分组新闻，primary_only时每条新闻只归入第一个标签"""
+    categorized_news = {}
+    for item in news_items:
+        tags = item.get('tags') or ['其他']
+        for tag in (tags[:1] if primary_only else tags):
+            categorized_news.setdefault(tag, []).append(item)
+    return categorized_news
+
+
+def _format_digest_item(item: Dict) -> str:
+    return (
+        f"### [{item['title']}]({item['link']})\n"
+        f"**来源**: {item.get('source', '')} | **评分**: {float(item.get('article_score', 0)):.2f}\n"
+        f"{item.get('ai_summary', '')}\n\n"
+    )
+
+
+def format_digest(news_items: List[Dict]) -> str:
+    """将多条新闻按标签分组渲染为一条markdown摘要消息"""
+    message = f"# 📰 科技新闻速递（{len(news_items)}条）\n\n"
+    for category, items in group_by_tag(news_items, primary_only=True).items():
+        message += f"## {category.upper()}\n\n"
+        for item in items:
+            message += _format_digest_item(item)
+    return message.rstrip() + "\n"
+
+
+def truncate_utf8(text: str, max_bytes: int) -> str:
+    """按UTF-8字节数截断文本，不截断多字节字符"""
+    encoded = text.encode('utf-8')
+    if len(encoded) <= max_bytes:
+        return text
+    return encoded[:max(0, max_bytes - 3)].decode('utf-8', errors='ignore') + '...'
+
+
+def fits_markdown_limit(news_items: List[Dict], max_bytes: int = MARKDOWN_MAX_BYTES) -> bool:
+    """这些新闻渲染成一条摘要后是否不超过字节上限"""
+    return len(format_digest(news_items).encode('utf-8')) <= max_bytes
+
+
+def fit_single_item(item: Dict, max_bytes: int = MARKDOWN_MAX_BYTES) -> Dict:
+    """单条新闻就超过上限时截断其分析内容"""
+    if fits_markdown_limit([item], max_bytes):
+        return item
+    fitted = dict(item, ai_summary='')
+    overhead = len(format_digest([fitted]).encode('utf-8'))
+    fitted['ai_summary'] = truncate_utf8(item.get('ai_summary', ''), max_bytes - overhead)
+    return fitted
+
+
 class WeChatNotifier:
+    """同步版本的企业微信应用消息发送，供脚本使用；事件循环中请使用 src.utils.wechat.WeChatNotifier"""
+    
     def __init__(self):
         self.config = Config()
         self.logger = logging.getLogger(__name__)
@@ -27,12 +84,12 @@ class WeChatNotifier:
                 "corpsecret": self.config.WECHAT['corp_secret']
             }
             
-            response = requests.get(url, params=params)
+            response = requests.get(url, params=params, timeout=self.config.NOTIFY_HTTP['timeout'])
             data = response.json()
             
             if data["errcode"] == 0:
                 self.access_token = data["access_token"]
-                self.token_expires = now + data["expires_in"] - 300  # 提前5分钟刷新
+                self.token_expires = now + data["expires_in"] - self.config.WECHAT['token_refresh_ahead']  # 提前刷新
                 return self.access_token
             else:
                 self.logger.error(f"获取访问令牌失败: {data}")
@@ -50,12 +107,7 @@ class WeChatNotifier:
         message = "# 最新科技新闻动态\n\n"
         
         # 按标签分组新闻
-        categorized_news = {}
-        for item in news_items:
-            for tag in item.get('tags', ['其他']):
-                if tag not in categorized_news:
-                    categorized_news[tag] = []
-                categorized_news[tag].append(item)
+        categorized_news = group_by_tag(news_items)
         
         # 按分类生成消息
         for category, items in categorized_news.items():
@@ -85,7 +137,7 @@ class WeChatNotifier:
                 }
             }
             
-            response = requests.post(url, json=data)
+            response = requests.post(url, json=data, timeout=self.config.NOTIFY_HTTP['timeout'])
             result = response.json()
             
             if result["errcode"] == 0:
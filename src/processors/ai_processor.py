@@ -1,11 +1,34 @@
-from typing import List, Dict
+from typing import Any, Callable, List, Dict, Optional, Tuple
 import logging
 import requests
+import json
+import re
+import time
+import hashlib
+import threading
 from datetime import datetime
 from ..config import Config
+from ..utils.tokens import estimate_tokens
+from ..utils.rate_limiter import get_rate_limiter, parse_retry_after
+from .provider_router import ProviderRouter, ResponseTruncated
+from .prompt_templates import (
+    Prompt, find_template, prompt_to_messages, prompt_to_text,
+    ANALYSIS_TEMPLATE, BATCH_ANALYSIS_TEMPLATE, REPORT_TEMPLATE
+)
+from .budget_manager import BudgetManager, extractive_summary
+from ..utils.circuit_breaker import CircuitBreaker
 import asyncio
 import aiohttp
 
+
+def get_news_key(news: Dict) -> str:
+    """获取新闻的唯一标识，用于批量分析结果的对应"""
+    if news.get('unique_id'):
+        return news['unique_id']
+    content = f"{news.get('link', '')}{news.get('title', '')}"
+    return hashlib.md5(content.encode('utf-8')).hexdigest()
+
+
 class AIProcessor:
     def __init__(self):
         self.config = Config()
@@ -15,32 +38,100 @@ class AIProcessor:
             "Content-Type": "application/json"
         }
         self.timeout = aiohttp.ClientTimeout(total=30)  # 30秒超时
+        
+        # 调用统计（用于批量/单条两种模式的延迟和token对比）
+        self.usage_stats = {
+            'requests': 0,
+            'prompt_tokens': 0,
+            'completion_tokens': 0,
+            'elapsed': 0.0,
+            'ttft_total': 0.0,
+            'ttft_count': 0,
+            'truncated': 0,
+            'cached_prompt_tokens': 0,
+            'templates': {}     # 按模板版本（name@version）统计前缀缓存命中
+        }
+        
+        # 服务商路由，主服务商超过p95延迟时对冲到备用服务商
+        # 每个服务商一个熔断器，熔断期间由后台探测恢复
+        breaker_config = self.config.CIRCUIT_BREAKER
+        self.breakers = {
+            name: CircuitBreaker(
+                name,
+                failure_threshold=breaker_config['failure_threshold'],
+                recovery_timeout=breaker_config['recovery_timeout'],
+                probe=probe,
+                probe_interval=breaker_config['probe_interval']
+            )
+            for name, probe in (
+                ('siliconflow', self._probe_siliconflow),
+                ('dify', self._probe_dify)
+            )
+        }
+        
+        router_config = self.config.AI_ROUTER
+        self.router = ProviderRouter(
+            {
+                'siliconflow': self._call_siliconflow_provider,
+                'dify': self._call_dify_provider
+            },
+            router_config['providers'],
+            window_size=router_config['window_size'],
+            hedge_percentile=router_config['hedge_percentile'],
+            min_samples=router_config['min_samples'],
+            default_hedge_delay=router_config['default_hedge_delay'],
+            timeout=router_config['timeout'],
+            breakers=self.breakers
+        )
+        
+        # 每轮token和时间预算
+        budget_config = self.config.AI_BUDGET
+        self.budget = BudgetManager(
+            run_tokens=budget_config['run_tokens'],
+            run_seconds=budget_config['run_seconds'],
+            item_prompt_tokens=budget_config['item_prompt_tokens'],
+            output_tokens_per_item=budget_config['output_tokens_per_item'],
+            overflow=budget_config['overflow']
+        )
 
-    def call_dify_api(self, prompt: str) -> str:
+    def call_dify_api(self, prompt: Prompt) -> str:
         """调用Dify API进行处理"""
         try:
             url = f"{self.config.DIFY['api_endpoint']}/chat-messages"
             payload = {
                 "inputs": {},
-                "query": prompt,
+                "query": prompt_to_text(prompt),
                 "response_mode": "blocking",
                 "conversation_id": None,
                 "user": "news_processor"
             }
             
-            response = requests.post(
-                url, 
-                headers=self.dify_headers,
-                json=payload,
-                timeout=30  # 添加超时设置
+            response, reserved = self._send_with_rate_limit(
+                'dify',
+                'default',
+                estimate_tokens(prompt_to_text(prompt)),
+                lambda: requests.post(
+                    url, 
+                    headers=self.dify_headers,
+                    json=payload,
+                    timeout=30  # 添加超时设置
+                )
             )
-            
-            if response.status_code == 200:
-                data = response.json()
-                return data.get('answer', '')
-            else:
-                self.logger.error(f"Dify API调用失败: {response.status_code} - {response.text}")
+            if response is None:
                 return None
+            
+            used = 0
+            try:
+                if response.status_code == 200:
+                    data = response.json()
+                    answer = data.get('answer', '')
+                    used = reserved + estimate_tokens(answer)
+                    return answer
+                else:
+                    self.logger.error(f"Dify API调用失败: {response.status_code} - {response.text}")
+                    return None
+            finally:
+                self._settle_tokens('dify', 'default', reserved, used)
                 
         except requests.exceptions.Timeout:
             self.logger.error("Dify API请求超时")
@@ -49,7 +140,7 @@ class AIProcessor:
             self.logger.error(f"调用Dify API时出错: {str(e)}")
             return None
 
-    def call_siliconflow_api(self, prompt: str) -> str:
+    def call_siliconflow_api(self, prompt: Prompt, max_tokens: int = 1024) -> str:
         """调用硅基流动 API进行处理"""
         try:
             headers = {
@@ -59,14 +150,9 @@ class AIProcessor:
             
             payload = {
                 "model": self.config.SILICONFLOW['model'],
-                "messages": [
-                    {
-                        "role": "user",
-                        "content": prompt
-                    }
-                ],
+                "messages": prompt_to_messages(prompt),
                 "temperature": 0.7,
-                "max_tokens": 1024,
+                "max_tokens": max_tokens,
                 "stream": False
             }
             
@@ -75,23 +161,38 @@ class AIProcessor:
             session.trust_env = False  # 不使用环境变量中的代理设置
             
             # 增加超时时间到60秒
-            response = session.post(
-                self.config.SILICONFLOW['api_endpoint'],
-                headers=headers,
-                json=payload,
-                timeout=60,
-                verify=True
+            start_time = time.monotonic()
+            response, reserved = self._send_with_rate_limit(
+                'siliconflow',
+                self.config.SILICONFLOW['model'],
+                self._reserve_tokens(prompt, max_tokens),
+                lambda: session.post(
+                    self.config.SILICONFLOW['api_endpoint'],
+                    headers=headers,
+                    json=payload,
+                    timeout=60,
+                    verify=True
+                )
             )
-            
-            self.logger.info(f"API响应状态码: {response.status_code}")
-            
-            if response.status_code == 200:
-                data = response.json()
-                self.logger.info("成功获取API响应")
-                return data['choices'][0]['message']['content']
-            else:
-                self.logger.error(f"API响应详情: {response.text}")
+            if response is None:
                 return None
+            
+            used = 0
+            try:
+                self.logger.info(f"API响应状态码: {response.status_code}")
+                
+                if response.status_code == 200:
+                    data = response.json()
+                    self.logger.info("成功获取API响应")
+                    content = data['choices'][0]['message']['content']
+                    used = self._record_usage(prompt, content, data.get('usage'), time.monotonic() - start_time)
+                    return content
+                else:
+                    self.logger.error(f"API响应详情: {response.text}")
+                    return None
+            finally:
+                # 请求失败时没有消耗token，归还全部预留额度
+                self._settle_tokens('siliconflow', self.config.SILICONFLOW['model'], reserved, used)
                 
         except requests.exceptions.Timeout:
             self.logger.error("API请求超时 (60秒)")
@@ -107,47 +208,296 @@ class AIProcessor:
             self.logger.error(f"调用API时出错: {str(e)}")
             return None
 
-    def prepare_prompt(self, item: Dict) -> str:
-        """准备发送给AI的提示"""
-        return f"""作为一个专业的科技新闻分析师，请对以下新闻进行分析并以Markdown格式输出：
+    def call_siliconflow_api_stream(self, prompt: Prompt, max_chars: int = None, max_tokens: int = 1024,
+                                    cancel_event: Optional[threading.Event] = None,
+                                    max_reasoning_chars: int = None) -> str:
+        """以SSE流式调用硅基流动API，分析内容或推理过程达到各自的长度预算、或被取消时提前断开"""
+        max_chars = max_chars or self.config.SILICONFLOW['stream_max_chars']
+        max_reasoning_chars = max_reasoning_chars or self.config.SILICONFLOW['stream_max_reasoning_chars']
+        try:
+            headers = {
+                "Authorization": f"Bearer {self.config.SILICONFLOW['api_key']}",
+                "Content-Type": "application/json",
+                "Accept": "text/event-stream"
+            }
+            
+            payload = {
+                "model": self.config.SILICONFLOW['model'],
+                "messages": prompt_to_messages(prompt),
+                "temperature": 0.7,
+                "max_tokens": max_tokens,
+                "stream": True
+            }
+            
+            session = requests.Session()
+            session.trust_env = False  # 不使用环境变量中的代理设置
+            
+            start_time = time.monotonic()
+            ttft = None
+            content_parts = []
+            reasoning_parts = []
+            content_length = 0
+            reasoning_length = 0
+            usage = None
+            truncated = False
+            
+            response, reserved = self._send_with_rate_limit(
+                'siliconflow',
+                self.config.SILICONFLOW['model'],
+                self._reserve_tokens(prompt, max_tokens),
+                lambda: session.post(
+                    self.config.SILICONFLOW['api_endpoint'],
+                    headers=headers,
+                    json=payload,
+                    timeout=60,
+                    verify=True,
+                    stream=True
+                ),
+                cancel_event=cancel_event
+            )
+            if response is None:
+                return None
+            
+            used = 0
+            try:
+                with response:
+                    if response.status_code != 200:
+                        self.logger.error(f"API响应详情: {response.text}")
+                        return None
+                    
+                    # 按字节逐行读取再以UTF-8解码，避免响应未声明charset时按latin-1错误切分
+                    for raw_line in response.iter_lines():
+                        # 对冲请求中另一方已胜出
+                        if cancel_event is not None and cancel_event.is_set():
+                            self.logger.info("流式请求已取消")
+                            return None
+                        line = raw_line.decode('utf-8') if raw_line else ''
+                        if not line.startswith('data:'):
+                            continue
+                        data = line[5:].strip()
+                        if data == '[DONE]':
+                            break
+                        
+                        chunk = json.loads(data)
+                        if chunk.get('usage'):
+                            usage = chunk['usage']
+                        choices = chunk.get('choices') or []
+                        if not choices:
+                            continue
+                        
+                        delta = choices[0].get('delta') or {}
+                        reasoning = delta.get('reasoning_content') or ''
+                        piece = delta.get('content') or ''
+                        if ttft is None and (reasoning or piece):
+                            ttft = time.monotonic() - start_time
+                        if reasoning:
+                            reasoning_parts.append(reasoning)
+                            reasoning_length += len(reasoning)
+                            # DeepSeek-R1的推理过程同样计费，超过推理预算后不再等待正文
+                            if reasoning_length >= max_reasoning_chars:
+                                truncated = True
+                                self.logger.info(f"推理过程超过 {max_reasoning_chars} 字，提前结束流")
+                                break
+                        if piece:
+                            content_parts.append(piece)
+                            content_length += len(piece)
+                            # 达到长度预算后直接断开连接，服务端随之停止生成
+                            if content_length >= max_chars:
+                                truncated = True
+                                break
+                
+                content = ''.join(content_parts).strip()
+                
+                # 提前断开时服务端不会返回用量，按已生成的内容估算
+                used = self._record_usage(
+                    prompt,
+                    ''.join(reasoning_parts) + content,
+                    None if truncated else usage,
+                    time.monotonic() - start_time,
+                    ttft=ttft,
+                    truncated=truncated
+                )
+                if not content:
+                    if truncated:
+                        # 推理过程用完预算、还没有开始输出正文：服务商正常，不计为失败
+                        raise ResponseTruncated(f"推理过程超过 {max_reasoning_chars} 字，没有分析内容")
+                    self.logger.error("流式响应中没有分析内容")
+                    return None
+                self.logger.info(f"流式响应完成, 首token耗时: {ttft if ttft is not None else -1:.2f}s")
+                return self._trim_to_budget(content, max_chars)
+            finally:
+                # 出错、被取消或没有正文时同样修正预留额度：已开始生成的按收到的内容估算，否则归还全部预留
+                if not used and (reasoning_parts or content_parts):
+                    used = estimate_tokens(prompt_to_text(prompt)) + estimate_tokens(''.join(reasoning_parts + content_parts))
+                self._settle_tokens('siliconflow', self.config.SILICONFLOW['model'], reserved, used)
+            
+        except ResponseTruncated:
+            raise
+        except requests.exceptions.Timeout:
+            self.logger.error("API流式请求超时 (60秒)")
+            return None
+        except requests.exceptions.ConnectionError as e:
+            self.logger.error(f"连接错误: {str(e)}")
+            return None
+        except Exception as e:
+            self.logger.error(f"调用流式API时出错: {str(e)}")
+            return None
 
-新闻内容：
-标题：{item['title']}
-来源：{item['source']}
-正文：{item['summary']}
+    def _send_with_rate_limit(self, provider: str, model: str, reserved: int, send: Callable,
+                              cancel_event: Optional[threading.Event] = None) -> Tuple[Optional[Any], int]:
+        """在限流器许可下发送请求，收到429时按Retry-After暂停并重新排队
 
-请按以下结构进行分析：
+        返回 (响应, 预留的token数)，排队超时、被取消或多次429后返回 (None, 0)。
+        """
+        limiter = get_rate_limiter(provider, model)
+        if limiter is None:
+            return send(), 0
+        
+        max_retries = self.config.RATE_LIMITS['max_throttle_retries']
+        for attempt in range(max_retries):
+            if not limiter.acquire(reserved, cancel_event):
+                return None, 0
+            
+            try:
+                response = send()
+            except Exception:
+                # 请求没有发出或没有响应，归还预留额度
+                limiter.settle(reserved, 0)
+                raise
+            if response.status_code != 429:
+                return response, reserved
+            
+            # 429: 归还预留额度，按服务端要求暂停后重新排队
+            retry_after = parse_retry_after(response.headers.get('Retry-After'), default=5.0 * 2 ** attempt)
+            response.close()
+            limiter.settle(reserved, 0)
+            limiter.penalize(retry_after)
+        
+        self.logger.error(f"{provider} 连续 {max_retries} 次触发限流，放弃请求")
+        return None, 0
 
-## 核心要点
-用3-5个简短的句子总结新闻最重要的信息。每句话以"•"开头，确保突出新闻的关键信息。
+    def _reserve_tokens(self, prompt: Prompt, max_tokens: int) -> int:
+        """请求发出前为TPM限流预留的token数（输入 + 预估输出）"""
+        return estimate_tokens(prompt_to_text(prompt)) + min(max_tokens, self.config.AI_BUDGET['output_tokens_per_item'])
 
-## 详细分析
+    def _settle_tokens(self, provider: str, model: str, reserved: int, used: int) -> None:
+        """按实际用量修正TPM限流的预留额度"""
+        limiter = get_rate_limiter(provider, model)
+        if limiter is not None and reserved:
+            limiter.settle(reserved, used)
 
-### 相关方
-- 主要公司/机构：列出新闻中提到的主要公司、机构及其角色
-- 合作方/竞争方：相关的合作伙伴或竞争对手（如有）
+    def _call_siliconflow_provider(self, prompt: Prompt, cancel_event: Optional[threading.Event] = None) -> Optional[str]:
+        """路由使用的硅基流动调用，流式模式下达到消息长度预算即停止"""
+        if self.config.SILICONFLOW.get('stream'):
+            return self.call_siliconflow_api_stream(prompt, cancel_event=cancel_event)
+        return self.call_siliconflow_api(prompt)
 
-### 关键数据
-- 技术指标：具体的技术参数、性能数据等
-- 商业数据：市场份额、投资金额、营收等数据（如有）
-- 时间节点：重要的时间信息
+    def _call_dify_provider(self, prompt: Prompt, cancel_event: Optional[threading.Event] = None) -> Optional[str]:
+        """路由使用的Dify调用，未配置密钥时直接跳过"""
+        if not self.config.DIFY['api_key']:
+            return None
+        return self.call_dify_api(prompt)
 
-### 创新亮点
-- 技术创新：新技术、新特性、技术突破等
-- 商业创新：新商业模式、新应用场景等（如有）
+    def _probe_siliconflow(self) -> bool:
+        """熔断期间探测硅基流动是否恢复（查询模型列表，不消耗token）"""
+        url = self.config.SILICONFLOW['api_endpoint'].rsplit('/chat/completions', 1)[0] + '/models'
+        session = requests.Session()
+        session.trust_env = False
+        response = session.get(
+            url,
+            headers={"Authorization": f"Bearer {self.config.SILICONFLOW['api_key']}"},
+            timeout=10
+        )
+        return response.status_code == 200
 
-## 影响分析
+    def _probe_dify(self) -> bool:
+        """熔断期间探测Dify是否恢复"""
+        if not self.config.DIFY['api_key']:
+            return False
+        response = requests.get(
+            f"{self.config.DIFY['api_endpoint']}/parameters",
+            headers=self.dify_headers,
+            timeout=10
+        )
+        return response.status_code == 200
 
-### 短期影响（0-6个月）
-分析此事件在半年内可能产生的直接影响
+    def get_provider_stats(self) -> Dict:
+        """获取各服务商的延迟、对冲和熔断统计"""
+        return self.router.get_stats()
 
-### 中长期影响（6个月以上）
-分析此事件可能带来的深远影响
+    def _trim_to_budget(self, text: str, max_chars: int) -> str:
+        """将分析内容截断到长度预算内，尽量在句末截断"""
+        if len(text) < max_chars:
+            return text
+        cut = text[:max_chars]
+        end = max(cut.rfind(mark) for mark in '。！？!?\n')
+        if end >= max_chars // 2:
+            return cut[:end + 1].rstrip()
+        return cut.rstrip() + '...'
 
-### 行业启示
-总结这个新闻对行业从业者的启示和建议
+    def _record_usage(self, prompt: Prompt, content: str, usage: Optional[Dict], elapsed: float,
+                      ttft: Optional[float] = None, truncated: bool = False) -> int:
+        """记录一次API调用的token用量和耗时，服务端未返回用量时使用估算值，返回本次总token数"""
+        usage = usage or {}
+        prompt_tokens = usage.get('prompt_tokens') or estimate_tokens(prompt_to_text(prompt))
+        completion_tokens = usage.get('completion_tokens') or estimate_tokens(content)
+        self.usage_stats['requests'] += 1
+        self.usage_stats['prompt_tokens'] += prompt_tokens
+        self.usage_stats['completion_tokens'] += completion_tokens
+        # 服务端返回的前缀缓存命中token（DeepSeek格式或OpenAI格式）
+        cached_tokens = (
+            usage.get('prompt_cache_hit_tokens')
+            or (usage.get('prompt_tokens_details') or {}).get('cached_tokens')
+            or 0
+        )
+        self.usage_stats['cached_prompt_tokens'] += cached_tokens
+        template = find_template(prompt)
+        if template is not None:
+            template_stats = self.usage_stats['templates'].setdefault(template.id, {
+                'prefix_hash': template.prefix_hash,
+                'requests': 0,
+                'prompt_tokens': 0,
+                'cached_prompt_tokens': 0
+            })
+            template_stats['requests'] += 1
+            template_stats['prompt_tokens'] += prompt_tokens
+            template_stats['cached_prompt_tokens'] += cached_tokens
+        self.usage_stats['elapsed'] += elapsed
+        if ttft is not None:
+            self.usage_stats['ttft_total'] += ttft
+            self.usage_stats['ttft_count'] += 1
+        if truncated:
+            self.usage_stats['truncated'] += 1
+        return prompt_tokens + completion_tokens
 
-请用专业、客观的语言进行分析，确保内容准确、逻辑清晰。如果某些信息新闻中未提供，可以基于专业判断进行合理推测，但需要标注"(推测)"。"""
+    def get_usage_stats(self) -> Dict:
+        """获取API调用统计"""
+        stats = dict(self.usage_stats)
+        requests_count = stats['requests'] or 1
+        stats['avg_latency'] = stats['elapsed'] / requests_count
+        stats['avg_ttft'] = stats['ttft_total'] / stats['ttft_count'] if stats['ttft_count'] else None
+        stats['prefix_cache_hit_rate'] = (
+            stats['cached_prompt_tokens'] / stats['prompt_tokens'] if stats['prompt_tokens'] else None
+        )
+        stats['templates'] = {
+            template_id: dict(
+                template_stats,
+                prefix_cache_hit_rate=(
+                    template_stats['cached_prompt_tokens'] / template_stats['prompt_tokens']
+                    if template_stats['prompt_tokens'] else None
+                )
+            )
+            for template_id, template_stats in self.usage_stats['templates'].items()
+        }
+        return stats
+
+    def prepare_prompt(self, item: Dict) -> Prompt:
+        """准备发送给AI的提示"""
+        return REPORT_TEMPLATE.render(
+            title=item['title'],
+            source=item['source'],
+            summary=item['summary']
+        )
 
     def process_item(self, item: Dict) -> Dict:
         """处理单条新闻"""
@@ -187,30 +537,120 @@ class AIProcessor:
     async def analyze_news(self, news: Dict) -> str:
         """分析单条新闻"""
         try:
-            # 先尝试硅基流动API
-            analysis = await self._get_ai_analysis_siliconflow(news)
-            if analysis:
-                return analysis
+            # 所有服务商都已熔断时直接降级为抽取式摘要
+            if not self.router.is_available():
+                self.logger.warning(f"AI服务商均已熔断，使用抽取式摘要: {news['title']}")
+                return extractive_summary(news)
             
-            # 如果失败，尝试Dify API
-            analysis = await self._get_ai_analysis_dify(news)
+            # 按延迟分位数在硅基流动和Dify之间路由，主服务商过慢时对冲
+            prompt = self._generate_prompt(news)
+            analysis = await self.router.call(prompt)
             if analysis:
                 return analysis
             
             # 如果都失败，返回简单摘要
             return f"新闻摘要: {news.get('summary', '无摘要')}"
             
+        except ResponseTruncated as e:
+            self.logger.warning(f"{str(e)}，使用抽取式摘要: {news['title']}")
+            return extractive_summary(news)
         except Exception as e:
             self.logger.error(f"AI分析失败: {str(e)}")
             return news.get('summary', '无摘要')  # 失败时返回原始摘要
     
-    def _generate_prompt(self, news: Dict) -> str:
-        """生成AI分析提示词"""
-        return (
-            f"请简要分析以下科技新闻的要点和影响（200字以内）：\n\n"
-            f"标题：{news['title']}\n"
-            f"摘要：{news.get('summary', '无摘要')}\n"
-            f"标签：{', '.join(news.get('tags', []))}\n"
+    def plan_run(self, news_list: List[Dict]) -> Tuple[List[Dict], List[Dict]]:
+        """开始新一轮分析：压缩提示词内容并按评分分配预算，返回 (预算内的新闻, 超出预算的新闻)"""
+        self.budget.start_run()
+        fitted = [self.budget.fit_item(news) for news in news_list]
+        return self.budget.plan(fitted, self._generate_prompt)
+    
+    async def analyze_news_batch(self, news_list: List[Dict], batch_size: int = None) -> Dict[str, str]:
+        """批量分析新闻，返回 {unique_id: 分析结果}
+        
+        每个请求打包batch_size条新闻，共用一份指令，要求模型按unique_id输出JSON。
+        解析失败或缺失的条目回退为单条分析。
+        """
+        batch_size = batch_size or self.config.AI_BATCH['batch_size']
+        results = {}
+        
+        for start in range(0, len(news_list), batch_size):
+            chunk = news_list[start:start + batch_size]
+            parsed = {}
+            
+            breaker = self.breakers['siliconflow']
+            if len(chunk) > 1 and breaker.allow_request():
+                try:
+                    prompt = self._generate_batch_prompt(chunk)
+                    max_tokens = min(
+                        self.config.AI_BATCH['max_tokens'],
+                        self.config.AI_BATCH['max_tokens_per_item'] * len(chunk)
+                    )
+                    response = await asyncio.to_thread(self.call_siliconflow_api, prompt, max_tokens)
+                    if response:
+                        breaker.record_success()
+                        parsed = self._parse_batch_response(response, chunk)
+                    else:
+                        breaker.record_failure()
+                    self.logger.info(f"批量分析完成: {len(parsed)}/{len(chunk)} 条解析成功")
+                except Exception as e:
+                    breaker.record_failure()
+                    self.logger.error(f"批量分析失败: {str(e)}")
+            
+            # 解析失败的条目逐条分析
+            for news in chunk:
+                key = get_news_key(news)
+                if key in parsed:
+                    results[key] = parsed[key]
+                else:
+                    results[key] = await self.analyze_news(news)
+        
+        return results
+    
+    def _generate_batch_prompt(self, news_list: List[Dict]) -> Prompt:
+        """生成批量分析提示词"""
+        items = [
+            {
+                'id': get_news_key(news),
+                'title': news['title'],
+                'summary': news.get('summary', '无摘要'),
+                'tags': news.get('tags', [])
+            }
+            for news in news_list
+        ]
+        return BATCH_ANALYSIS_TEMPLATE.render(items=json.dumps(items, ensure_ascii=False))
+    
+    def _parse_batch_response(self, response: str, news_list: List[Dict]) -> Dict[str, str]:
+        """解析批量分析结果，只保留请求中存在且内容非空的条目"""
+        # 去掉推理模型的思考过程和代码块标记
+        text = re.sub(r'<think>.*?</think>', '', response, flags=re.S)
+        start = text.find('{')
+        end = text.rfind('}')
+        if start == -1 or end <= start:
+            self.logger.warning("批量分析结果中未找到JSON")
+            return {}
+        
+        try:
+            data = json.loads(text[start:end + 1])
+        except json.JSONDecodeError as e:
+            self.logger.warning(f"批量分析结果JSON解析失败: {str(e)}")
+            return {}
+        
+        if not isinstance(data, dict):
+            return {}
+        
+        expected_keys = {get_news_key(news) for news in news_list}
+        return {
+            key: value.strip()
+            for key, value in data.items()
+            if key in expected_keys and isinstance(value, str) and value.strip()
+        }
+    
+    def _generate_prompt(self, news: Dict) -> Prompt:
+        """生成AI分析提示词（静态指令在前，新闻内容在后）"""
+        return ANALYSIS_TEMPLATE.render(
+            title=news['title'],
+            summary=news.get('summary', '无摘要'),
+            tags=', '.join(news.get('tags', []))
         )
     
     async def _get_ai_analysis_siliconflow(self, news: Dict) -> str:
@@ -218,8 +658,8 @@ class AIProcessor:
         try:
             prompt = self._generate_prompt(news)
             
-            # 使用硅基流动API
-            analysis = self.call_siliconflow_api(prompt)
+            # 使用硅基流动API，流式模式下达到消息长度预算即停止
+            analysis = self._call_siliconflow_provider(prompt)
             if analysis:
                 return analysis
             
@@ -232,7 +672,7 @@ class AIProcessor:
     async def _get_ai_analysis_dify(self, news: Dict) -> str:
         """调用Dify API获取分析结果"""
         try:
-            prompt = self._generate_prompt(news)
+            prompt = prompt_to_text(self._generate_prompt(news))
             prompt = prompt.encode('utf-8').decode('utf-8')  # 确保UTF-8编码
             
             # 使用Dify API
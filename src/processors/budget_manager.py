@@ -0,0 +1,97 @@
+from typing import Callable, Dict, List, Tuple
+import logging
+import re
+import time
+from ..utils.tokens import estimate_tokens, truncate_to_tokens
+from .prompt_templates import Prompt, prompt_to_text
+
+# 提示词中除新闻正文外的指令、标题和标签部分的预留token
+PROMPT_OVERHEAD_TOKENS = 100
+
+
+def extractive_summary(news: Dict, max_chars: int = 200) -> str:
+    """从摘要或正文中按原文顺序抽取前几句，作为不调用AI时的简要分析"""
+    text = news.get('summary') or news.get('full_content') or ''
+    sentences = [s.strip() for s in re.split(r'(?<=[。！？!?.;；])\s*', text) if s.strip()]
+    if not sentences:
+        return news.get('title', '')
+
+    parts = []
+    length = 0
+    for sentence in sentences:
+        if parts and length + len(sentence) > max_chars:
+            break
+        parts.append(sentence)
+        length += len(sentence)
+
+    separator = ' ' if news.get('language') == 'en' else ''
+    result = separator.join(parts)
+    if len(result) > max_chars:
+        result = result[:max_chars].rstrip() + '...'
+    return result
+
+
+class BudgetManager:
+    """单轮AI分析的token和时间预算
+
+    按article_score从高到低分配预算，超出预算的新闻按overflow配置处理：
+    extractive 使用抽取式摘要直接推送，defer 不推送、留到下一轮（未推送的新闻不会进入缓存）。
+    """
+
+    def __init__(self, run_tokens: int, run_seconds: float, item_prompt_tokens: int,
+                 output_tokens_per_item: int, overflow: str = 'extractive'):
+        self.logger = logging.getLogger(__name__)
+        self.run_tokens = run_tokens
+        self.run_seconds = run_seconds
+        self.item_prompt_tokens = item_prompt_tokens
+        self.output_tokens_per_item = output_tokens_per_item
+        self.overflow = overflow
+
+        self.spent_tokens = 0
+        self.deadline = None
+
+    def start_run(self) -> None:
+        """开始新一轮预算"""
+        self.spent_tokens = 0
+        self.deadline = time.monotonic() + self.run_seconds
+
+    def time_exhausted(self) -> bool:
+        """本轮时间预算是否已用完"""
+        return self.deadline is not None and time.monotonic() >= self.deadline
+
+    def fit_item(self, news: Dict) -> Dict:
+        """压缩summary和full_content，使单条提示词不超过token上限"""
+        available = (self.item_prompt_tokens - PROMPT_OVERHEAD_TOKENS
+                     - estimate_tokens(news.get('title', '')))
+        fitted = news.copy()
+
+        summary = news.get('summary') or ''
+        if not summary and news.get('full_content'):
+            summary = extractive_summary(news, max_chars=400)
+        fitted['summary'] = truncate_to_tokens(summary, available)
+
+        if news.get('full_content'):
+            remaining = available - estimate_tokens(fitted['summary'])
+            fitted['full_content'] = truncate_to_tokens(news['full_content'], remaining)
+            if not fitted['full_content']:
+                del fitted['full_content']
+        return fitted
+
+    def plan(self, news_list: List[Dict], prompt_builder: Callable[[Dict], Prompt]) -> Tuple[List[Dict], List[Dict]]:
+        """按评分分配本轮token预算，返回 (预算内的新闻, 超出预算的新闻)"""
+        ranked = sorted(news_list, key=lambda x: float(x.get('article_score', 0)), reverse=True)
+        accepted, overflow = [], []
+        for news in ranked:
+            cost = estimate_tokens(prompt_to_text(prompt_builder(news))) + self.output_tokens_per_item
+            if self.spent_tokens + cost <= self.run_tokens:
+                self.spent_tokens += cost
+                accepted.append(news)
+            else:
+                overflow.append(news)
+
+        if overflow:
+            self.logger.info(
+                f"本轮token预算 {self.run_tokens} 已分配 {self.spent_tokens}，"
+                f"{len(overflow)} 条新闻超出预算 (处理方式: {self.overflow})"
+            )
+        return accepted, overflow
@@ -1,26 +1,104 @@
 import logging
 import asyncio
-from typing import Dict, List
+import time
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
 from tqdm import tqdm
 from ..utils.wechat import WeChatNotifier
-from ..processors.ai_processor import AIProcessor
+from ..utils.dingtalk import DingTalkNotifier
+from ..processors.ai_processor import AIProcessor, get_news_key
+from ..processors.budget_manager import extractive_summary
+from ..notification.wechat import fit_single_item, fits_markdown_limit, format_digest
 from src.utils.news_cache import NewsCache
+from src.utils.shared_cache import SharedNewsCache
+from src.utils.outbox import Outbox
+from src.utils.rate_limiter import TokenBucket
+from src.storage.bulk_writer import BulkWriter
+from src.config import Config
 
 class NotificationProcessor:
-    def __init__(self, test_mode=True):  # 默认使用测试模式
+    def __init__(self, test_mode=True, writer: Optional[BulkWriter] = None):  # 默认使用测试模式
+        self.config = Config()
         self.logger = logging.getLogger(__name__)
         self.wechat = WeChatNotifier()
+        
+        # 启用的推送渠道，同一条消息只渲染一次，由各渠道独立发送
+        available_channels = {'wechat': self.wechat, 'dingtalk': DingTalkNotifier()}
+        self.channels = {
+            name: available_channels[name]
+            for name in self.config.NOTIFICATION['channels']
+            if name in available_channels
+        }
         self.ai_processor = AIProcessor()
         self.test_mode = test_mode
+        self.writer = writer  # 可选的数据库写后缓冲，保存AI分析结果
         
         # 重试配置
         self.max_retries = 3
         self.retry_delay = 5  # 秒
         
-        self.news_cache = NewsCache()
+        # 多个进程共同推送时使用共享去重存储，选中的新闻由本进程独占认领
+        cache_config = self.config.NEWS_CACHE
+        if cache_config['backend'] == 'shared':
+            self.news_cache = SharedNewsCache(cache_config['shared_path'], claim_ttl=cache_config['claim_ttl'])
+        else:
+            self.news_cache = NewsCache()
+        
+        # 持久化发件箱，按渠道限速发送，失败的消息跨重启退避重试
+        outbox_config = self.config.OUTBOX
+        self.outbox = Outbox(
+            outbox_config['path'],
+            max_attempts=outbox_config['max_attempts'],
+            base_backoff=outbox_config['base_backoff'],
+            max_backoff=outbox_config['max_backoff'],
+            lease=outbox_config['lease']
+        )
+        # 每个渠道独立的限速令牌桶和后台发送任务，慢渠道不会拖慢其他渠道
+        self.send_buckets = {
+            name: TokenBucket(
+                outbox_config['channels'][name]['burst'],
+                outbox_config['channels'][name]['rate_per_minute'] / 60
+            )
+            for name in self.channels
+        }
+        self._outbox_tasks = {}
+        self._outbox_wakeups = {name: asyncio.Event() for name in self.channels}
+        self._claims_refreshed_at = 0.0
+        
+    async def start(self) -> None:
+        """打开各推送渠道的长连接会话，启动发件箱后台发送"""
+        try:
+            self.outbox.purge()
+        except Exception as e:
+            self.logger.warning(f"清理发件箱出错: {str(e)}")
         
+        for name, channel in self.channels.items():
+            await channel.start()
+            task = self._outbox_tasks.get(name)
+            if task is None or task.done():
+                self._outbox_tasks[name] = asyncio.ensure_future(self._outbox_worker(name))
+    
+    async def close(self) -> None:
+        """停止发件箱后台发送，关闭各推送渠道的会话"""
+        for task in self._outbox_tasks.values():
+            task.cancel()
+        for task in self._outbox_tasks.values():
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        self._outbox_tasks = {}
+        self.outbox.close()
+        for channel in self.channels.values():
+            await channel.close()
+        self.news_cache.close()
+    
     async def process_and_send(self, news_items: Dict[str, List[Dict]]) -> None:
-        """处理新闻并逐条发送"""
+        """处理新闻并逐条发送
+
+        AI分析和推送是两个独立阶段，通过有界队列连接：分析完成的新闻按评分顺序入队，
+        推送阶段随即发送，无需等待后续新闻的分析。
+        """
         try:
             # 合并所有新闻
             all_news = []
@@ -29,42 +107,250 @@ class NotificationProcessor:
             
             self.logger.info(f"Total news to process: {len(all_news)}")
             
+            # 已分析、仍在发件箱中等待发送的新闻不再重复分析
+            pending_keys = self.outbox.pending_keys()
+            all_news = [news for news in all_news if get_news_key(news) not in pending_keys]
+            
             # 过滤和排序新闻
             news_to_send = self.news_cache.filter_and_sort_news(all_news)
             self.logger.info(f"Filtered news to send: {len(news_to_send)}")
             
-            # 逐条处理和发送
-            for news in news_to_send:
-                try:
-                    # 生成AI分析
+            # 按评分在本轮token预算内分配AI分析
+            to_analyze, overflow = self.ai_processor.plan_run(news_to_send)
+            
+            queue = asyncio.Queue(maxsize=self.config.NOTIFICATION['queue_size'])
+            stages = [
+                asyncio.ensure_future(self._analysis_stage(to_analyze, overflow, queue)),
+                asyncio.ensure_future(self._delivery_stage(queue))
+            ]
+            # 任一阶段出错时取消另一个，避免分析阶段阻塞在已无人消费的队列上
+            done, running = await asyncio.wait(stages, return_when=asyncio.FIRST_EXCEPTION)
+            for task in running:
+                task.cancel()
+            await asyncio.gather(*running, return_exceptions=True)
+            errors = [task.exception() for task in done if task.exception() is not None]
+            if errors:
+                self.logger.error(f"推送流水线出错: {str(errors[0])}")
+                # 没有写入发件箱的新闻放弃认领，留给下一轮或其他进程
+                pending_keys = self.outbox.pending_keys()
+                for news in news_to_send:
+                    if get_news_key(news) not in pending_keys:
+                        self.news_cache.release(news)
+                    
+        except Exception as e:
+            self.logger.error(f"批量处理新闻出错: {str(e)}")
+    
+    async def _analysis_stage(self, to_analyze: List[Dict], overflow: List[Dict], queue: asyncio.Queue) -> None:
+        """分析阶段：并发生成AI分析，按评分顺序将 (新闻, 分析结果) 放入队列"""
+        try:
+            # 批量模式下每批新闻是一个分析单元，否则每条新闻一个
+            if self.ai_processor.config.AI_BATCH['enabled']:
+                batch_size = self.ai_processor.config.AI_BATCH['batch_size']
+                units = [to_analyze[i:i + batch_size] for i in range(0, len(to_analyze), batch_size)]
+            else:
+                units = [[news] for news in to_analyze]
+            units += [[news] for news in overflow]
+            overflow_keys = {get_news_key(news) for news in overflow}
+            
+            semaphore = asyncio.Semaphore(self.config.NOTIFICATION['analysis_concurrency'])
+            
+            async def run_unit(unit: List[Dict]) -> List[Tuple[Dict, str]]:
+                async with semaphore:
+                    return await self._analyze_unit(unit, overflow_keys)
+            
+            tasks = [asyncio.ensure_future(run_unit(unit)) for unit in units]
+            try:
+                # 按评分顺序等待，排在前面的分析完成后立即交给推送阶段
+                for task in tasks:
+                    for news, analysis in await task:
+                        await queue.put((news, analysis))
+            finally:
+                for task in tasks:
+                    task.cancel()
+        except Exception as e:
+            self.logger.error(f"AI分析阶段出错: {str(e)}")
+        # 被取消时推送阶段已经结束，不再放入结束标记
+        await queue.put(None)
+    
+    async def _analyze_unit(self, unit: List[Dict], overflow_keys: set) -> List[Tuple[Dict, str]]:
+        """分析一个单元内的新闻，返回 (新闻, 分析结果) 列表，跳过留到下一轮和分析失败的新闻"""
+        budget = self.ai_processor.budget
+        analyses = {}
+        if len(unit) > 1 and not budget.time_exhausted():
+            analyses = await self._retry_operation(
+                self.ai_processor.analyze_news_batch,
+                unit,
+                operation_name="AI批量分析"
+            ) or {}
+        
+        results = []
+        for news in unit:
+            try:
+                key = get_news_key(news)
+                analysis = analyses.get(key)
+                if not analysis and (key in overflow_keys or budget.time_exhausted()):
+                    # 超出本轮预算：留到下一轮或使用抽取式摘要
+                    if budget.overflow == 'defer':
+                        self.logger.info(f"超出本轮AI预算，留到下一轮: {news['title']}")
+                        self.news_cache.release(news)
+                        continue
+                    analysis = extractive_summary(news)
+                elif not analysis:
                     analysis = await self._retry_operation(
                         self.ai_processor.analyze_news,
                         news,
                         operation_name="AI分析"
                     )
-                    
-                    if not analysis:
-                        self.logger.error(f"无法获取AI分析: {news['title']}")
-                        continue
-                    
-                    # 格式化消息
+                
+                if not analysis:
+                    self.logger.error(f"无法获取AI分析: {news['title']}")
+                    self.news_cache.release(news)
+                    continue
+                results.append((news, analysis))
+            
+            except Exception as e:
+                self.logger.error(f"处理新闻出错: {str(e)}")
+                self.news_cache.release(news)
+        
+        if self.writer is not None and results:
+            analyzed_at = datetime.now().isoformat()
+            await self.writer.put([
+                {'unique_id': news['unique_id'], 'ai_analysis': analysis,
+                 'ai_processed': True, 'ai_processed_at': analyzed_at}
+                for news, analysis in results if news.get('unique_id')
+            ])
+        return results
+    
+    async def _delivery_stage(self, queue: asyncio.Queue) -> None:
+        """推送阶段：把分析结果格式化后写入发件箱，由发件箱限速发送
+
+        摘要模式下把尽量多的新闻合并为一条不超过markdown字节上限的消息，
+        装满即写入发件箱，队列结束时写入剩余部分。
+        """
+        digest_mode = self.config.NOTIFICATION['digest']
+        pending = []
+        while True:
+            entry = await queue.get()
+            if entry is None:
+                break
+            
+            news, analysis = entry
+            try:
+                if not digest_mode:
                     message = self._format_message(news, analysis)
-                    
-                    # 发送消息
-                    if await self.wechat.send_message(message):
-                        self.logger.info(f"准备添加新闻到缓存: {news['title']}")
-                        # 只有成功推送的才加入缓存
-                        self.news_cache.add_news(news)
-                        self.logger.info(f"推送成功并已加入缓存: {news['title']}")
-                    else:
-                        self.logger.error(f"推送失败: {news['title']}")
-                    
+                else:
+                    item = fit_single_item(dict(news, ai_summary=analysis))
+            except Exception as e:
+                self.logger.error(f"格式化消息出错: {news.get('title', '')}: {str(e)}")
+                self.news_cache.release(news)
+                continue
+            
+            if not digest_mode:
+                await self._enqueue(message, [news])
+                continue
+            
+            if pending and not fits_markdown_limit(pending + [item]):
+                await self._enqueue(format_digest(pending), pending)
+                pending = []
+            pending.append(item)
+        
+        if pending:
+            await self._enqueue(format_digest(pending), pending)
+    
+    async def _enqueue(self, message: str, items: List[Dict]) -> None:
+        """为每个渠道写入同一条渲染好的消息并触发发送；没有后台发送任务时直接并发发送"""
+        cached_items = [
+            {key: news.get(key, '') for key in ('unique_id', 'title', 'link', 'source')}
+            for news in items
+        ]
+        item_keys = [get_news_key(news) for news in items]
+        inline = []
+        for name in self.channels:
+            try:
+                self.outbox.enqueue(name, message, cached_items, item_keys)
+            except Exception as e:
+                self.logger.error(f"写入{name}发件箱出错: {str(e)}")
+                continue
+            
+            task = self._outbox_tasks.get(name)
+            if task is not None and not task.done():
+                self._outbox_wakeups[name].set()
+            else:
+                inline.append(name)
+        
+        if inline:
+            await asyncio.gather(*(self.drain_outbox(name) for name in inline))
+    
+    async def drain_outbox(self, channel: str) -> int:
+        """按渠道限速发送该渠道所有已到期的发件箱消息，返回成功发送的条数
+
+        任一渠道确认送达后即将消息中的新闻加入缓存；失败的消息按退避计划留待重试。
+        """
+        notifier = self.channels[channel]
+        sent = 0
+        for entry in self.outbox.due(channel):
+            await self._wait_for_send_slot(channel)
+            titles = ', '.join(news['title'] for news in entry['items'])
+            if not await notifier.send_message(entry['content']):
+                self.outbox.mark_failed(entry['id'], '推送失败')
+                self.logger.error(f"{channel}推送失败，稍后重试 (第{entry['attempts'] + 1}次): {titles}")
+                continue
+            
+            self.outbox.mark_sent(entry['id'])
+            sent += 1
+            if self.writer is not None:
+                pushed_at = datetime.now().isoformat()
+                await self.writer.put([
+                    {'unique_id': news['unique_id'], 'pushed': True, 'pushed_at': pushed_at}
+                    for news in entry['items'] if news.get('unique_id')
+                ])
+            for news in entry['items']:
+                try:
+                    # 只有成功推送的才加入缓存
+                    self.news_cache.add_news(news)
+                    self.logger.info(f"推送成功并已加入缓存: {news['title']}")
                 except Exception as e:
-                    self.logger.error(f"处理新闻出错: {str(e)}")
-                    continue
-                    
+                    self.logger.error(f"加入缓存出错: {str(e)}")
+        return sent
+    
+    async def _wait_for_send_slot(self, channel: str) -> None:
+        """等待推送渠道的限速令牌"""
+        bucket = self.send_buckets[channel]
+        while True:
+            wait = bucket.wait_time(1, time.monotonic())
+            if wait <= 0:
+                bucket.consume(1)
+                return
+            await asyncio.sleep(wait)
+    
+    def _refresh_claims(self) -> None:
+        """定期延长发件箱中待重试新闻的认领，退避等待可能超过claim_ttl"""
+        now = time.monotonic()
+        if now - self._claims_refreshed_at < self.config.NEWS_CACHE['claim_refresh_interval']:
+            return
+        self._claims_refreshed_at = now
+        try:
+            self.news_cache.refresh_claims(self.outbox.pending_items())
         except Exception as e:
-            self.logger.error(f"批量处理新闻出错: {str(e)}")
+            self.logger.warning(f"延长新闻认领出错: {str(e)}")
+    
+    async def _outbox_worker(self, channel: str) -> None:
+        """后台发送某个渠道的发件箱消息：有新消息时立即发送，失败的消息到期后自动重试"""
+        wakeup = self._outbox_wakeups[channel]
+        while True:
+            wakeup.clear()
+            self._refresh_claims()
+            try:
+                await self.drain_outbox(channel)
+            except Exception as e:
+                self.logger.error(f"{channel}发件箱发送出错: {str(e)}")
+            
+            next_due = self.outbox.next_due_in(channel)
+            timeout = min(next_due, 60) if next_due is not None else 60
+            try:
+                await asyncio.wait_for(wakeup.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
     
     async def _retry_operation(self, operation, *args, operation_name="操作"):
         """重试机制"""
@@ -94,7 +380,4 @@ class NotificationProcessor:
             f"**标签**: {', '.join(news.get('tags', []))}\n\n"
             f"### 🔍 AI分析:\n{analysis}\n\n"
             f"[阅读原文]({news['link']})"
-        ) 
-
-# 将测试模式设置为False
-notifier = NotificationProcessor(test_mode=False) 
\ No newline at end of file
+        )
@@ -0,0 +1,120 @@
+from typing import Dict, List, Optional, Union
+import hashlib
+
+# 提示词可以是单个字符串，也可以是OpenAI格式的消息列表
+Prompt = Union[str, List[Dict[str, str]]]
+
+# 按system前缀哈希登记的模板，用于从渲染后的提示词反查模板版本
+_TEMPLATES_BY_PREFIX: Dict[str, 'PromptTemplate'] = {}
+
+
+def prefix_hash(system: str) -> str:
+    return hashlib.sha1(system.encode('utf-8')).hexdigest()[:12]
+
+
+class PromptTemplate:
+    """版本化的提示词模板
+
+    静态指令放在system消息中，在模块加载时构建一次，所有调用逐字节相同，
+    便于服务端复用提示词前缀缓存；每条新闻的变化内容只出现在其后的user消息中。
+    """
+
+    def __init__(self, name: str, version: str, system: str, user: str):
+        self.name = name
+        self.version = version
+        self.system = system
+        self.user = user
+        self.prefix_hash = prefix_hash(system)
+        _TEMPLATES_BY_PREFIX[self.prefix_hash] = self
+
+    @property
+    def id(self) -> str:
+        return f"{self.name}@{self.version}"
+
+    def render(self, **fields) -> List[Dict[str, str]]:
+        """填充新闻内容，返回消息列表"""
+        return [
+            {"role": "system", "content": self.system},
+            {"role": "user", "content": self.user.format(**fields)}
+        ]
+
+
+def prompt_to_messages(prompt: Prompt) -> List[Dict[str, str]]:
+    """将提示词统一转换为消息列表"""
+    if isinstance(prompt, str):
+        return [{"role": "user", "content": prompt}]
+    return prompt
+
+
+def find_template(prompt: Prompt) -> Optional[PromptTemplate]:
+    """根据提示词的system消息找到渲染它的模板，不是由模板生成时返回None"""
+    messages = prompt_to_messages(prompt)
+    if not messages or messages[0].get('role') != 'system':
+        return None
+    return _TEMPLATES_BY_PREFIX.get(prefix_hash(messages[0]['content']))
+
+
+def prompt_to_text(prompt: Prompt) -> str:
+    """将提示词拼接为单个字符串（静态前缀在前），用于只接受单段文本的接口"""
+    if isinstance(prompt, str):
+        return prompt
+    return "\n\n".join(message['content'] for message in prompt)
+
+
+ANALYSIS_TEMPLATE = PromptTemplate(
+    name='analysis',
+    version='v2',
+    system="你是一名专业的科技新闻分析师。请简要分析用户提供的科技新闻的要点和影响（200字以内）。",
+    user="标题：{title}\n摘要：{summary}\n标签：{tags}\n"
+)
+
+BATCH_ANALYSIS_TEMPLATE = PromptTemplate(
+    name='batch_analysis',
+    version='v2',
+    system=(
+        "你是一名专业的科技新闻分析师。用户会提供一个JSON格式的新闻列表，"
+        "请简要分析每条新闻的要点和影响（每条200字以内）。\n"
+        "请只输出一个JSON对象，键为新闻的id，值为该条新闻的分析文本，不要输出其他内容。"
+    ),
+    user="新闻列表：\n{items}\n"
+)
+
+REPORT_TEMPLATE = PromptTemplate(
+    name='report',
+    version='v2',
+    system="""作为一个专业的科技新闻分析师，请对用户提供的新闻进行分析并以Markdown格式输出。
+
+请按以下结构进行分析：
+
+## 核心要点
+用3-5个简短的句子总结新闻最重要的信息。每句话以"•"开头，确保突出新闻的关键信息。
+
+## 详细分析
+
+### 相关方
+- 主要公司/机构：列出新闻中提到的主要公司、机构及其角色
+- 合作方/竞争方：相关的合作伙伴或竞争对手（如有）
+
+### 关键数据
+- 技术指标：具体的技术参数、性能数据等
+- 商业数据：市场份额、投资金额、营收等数据（如有）
+- 时间节点：重要的时间信息
+
+### 创新亮点
+- 技术创新：新技术、新特性、技术突破等
+- 商业创新：新商业模式、新应用场景等（如有）
+
+## 影响分析
+
+### 短期影响（0-6个月）
+分析此事件在半年内可能产生的直接影响
+
+### 中长期影响（6个月以上）
+分析此事件可能带来的深远影响
+
+### 行业启示
+总结这个新闻对行业从业者的启示和建议
+
+请用专业、客观的语言进行分析，确保内容准确、逻辑清晰。如果某些信息新闻中未提供，可以基于专业判断进行合理推测，但需要标注"(推测)"。""",
+    user="新闻内容：\n标题：{title}\n来源：{source}\n正文：{summary}"
+)
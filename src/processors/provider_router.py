@@ -0,0 +1,203 @@
+from typing import Callable, Dict, List, Optional
+import asyncio
+import logging
+import threading
+import time
+from collections import deque
+from ..utils.circuit_breaker import CircuitBreaker
+from .prompt_templates import Prompt
+
+
+class ResponseTruncated(Exception):
+    """服务商正常响应，但在输出正文之前就达到了长度预算（如推理模型的推理过程过长）
+
+    不计为服务商故障，也不再请求其他服务商，由调用方降级处理。
+    """
+
+
+class ProviderRouter:
+    """AI服务商路由：记录各服务商的滚动延迟分位数，主服务商超过p95仍未返回时向备用服务商发起对冲请求
+
+    providers中的调用函数签名为 fn(prompt, cancel_event) -> Optional[str]，返回None表示失败，
+    抛出ResponseTruncated表示响应被截断、没有正文，此时call()将其抛给调用方。
+    对冲请求中先返回有效结果的一方胜出，另一方通过cancel_event通知尽快放弃。
+    配置了熔断器的服务商在熔断期间会被跳过。
+    """
+
+    def __init__(self,
+                 providers: Dict[str, Callable[[Prompt, threading.Event], Optional[str]]],
+                 order: List[str],
+                 window_size: int = 50,
+                 hedge_percentile: float = 95,
+                 min_samples: int = 5,
+                 default_hedge_delay: float = 20.0,
+                 timeout: float = 90.0,
+                 breakers: Optional[Dict[str, CircuitBreaker]] = None):
+        self.logger = logging.getLogger(__name__)
+        self.providers = providers
+        self.order = [name for name in order if name in providers]
+        self.hedge_percentile = hedge_percentile
+        self.min_samples = min_samples
+        self.default_hedge_delay = default_hedge_delay
+        self.timeout = timeout
+        self.breakers = breakers or {}
+
+        self.latencies = {name: deque(maxlen=window_size) for name in self.order}
+        self.stats = {
+            name: {'requests': 0, 'successes': 0, 'failures': 0, 'truncated': 0,
+                   'hedges': 0, 'wins': 0, 'cancelled': 0}
+            for name in self.order
+        }
+
+    def percentile(self, name: str, pct: float) -> Optional[float]:
+        """计算服务商最近成功请求延迟的分位数，样本不足时返回None"""
+        samples = sorted(self.latencies.get(name, ()))
+        if len(samples) < self.min_samples:
+            return None
+        index = min(len(samples) - 1, int(round(pct / 100 * (len(samples) - 1))))
+        return samples[index]
+
+    def hedge_delay(self, name: str) -> float:
+        """主服务商等待多久后发起对冲请求"""
+        delay = self.percentile(name, self.hedge_percentile)
+        return delay if delay is not None else self.default_hedge_delay
+
+    def is_available(self) -> bool:
+        """是否至少有一个服务商未熔断"""
+        return any(
+            name not in self.breakers or self.breakers[name].is_available()
+            for name in self.order
+        )
+
+    async def call(self, prompt: Prompt) -> Optional[str]:
+        """按优先级调用服务商，必要时对冲，返回最先得到的有效结果"""
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.timeout
+        candidates = list(self.order)
+        pending = {}
+        won = False
+
+        def start_next(is_hedge: bool) -> Optional[str]:
+            # 跳过熔断中的服务商
+            while candidates:
+                name = candidates.pop(0)
+                breaker = self.breakers.get(name)
+                if breaker is None or breaker.allow_request():
+                    break
+            else:
+                return None
+
+            cancel_event = threading.Event()
+            task = asyncio.ensure_future(self._timed_call(name, prompt, cancel_event))
+            pending[task] = (name, cancel_event)
+            if is_hedge:
+                self.stats[name]['hedges'] += 1
+                self.logger.info(f"主服务商超过p{self.hedge_percentile:g}延迟，发起对冲请求: {name}")
+            return name
+
+        primary = start_next(is_hedge=False)
+        if primary is None:
+            return None
+        hedge_at = loop.time() + self.hedge_delay(primary)
+
+        try:
+            while pending:
+                now = loop.time()
+                if now >= deadline:
+                    self.logger.error(f"AI服务请求超过总时限 {self.timeout}s")
+                    return None
+
+                wait_until = min(hedge_at, deadline) if candidates else deadline
+                done, _ = await asyncio.wait(
+                    pending.keys(),
+                    timeout=max(0, wait_until - now),
+                    return_when=asyncio.FIRST_COMPLETED
+                )
+
+                if not done:
+                    # 等待超过对冲阈值，向下一个服务商发起对冲
+                    if candidates and loop.time() >= hedge_at:
+                        hedge_name = start_next(is_hedge=True)
+                        if hedge_name:
+                            hedge_at = loop.time() + self.hedge_delay(hedge_name)
+                    continue
+
+                for task in done:
+                    name, _ = pending.pop(task)
+                    try:
+                        result = task.result()
+                    except ResponseTruncated:
+                        # 服务商工作正常，只是没有产出正文；取消其他请求时不计为失败
+                        won = True
+                        raise
+                    if result:
+                        self.stats[name]['wins'] += 1
+                        won = True
+                        return result
+
+                # 全部失败时立即切换到下一个服务商，不再等待对冲阈值
+                if not pending and candidates:
+                    next_name = start_next(is_hedge=False)
+                    if next_name:
+                        hedge_at = loop.time() + self.hedge_delay(next_name)
+
+            return None
+
+        finally:
+            # 取消仍在进行的请求；因超过总时限被取消的计为失败
+            for task, (name, cancel_event) in pending.items():
+                cancel_event.set()
+                task.cancel()
+                self.stats[name]['cancelled'] += 1
+                breaker = self.breakers.get(name)
+                if breaker is not None:
+                    if won:
+                        breaker.release()
+                    else:
+                        breaker.record_failure()
+
+    async def _timed_call(self, name: str, prompt: Prompt, cancel_event: threading.Event) -> Optional[str]:
+        """在线程中调用服务商并记录延迟"""
+        self.stats[name]['requests'] += 1
+        start_time = time.monotonic()
+        try:
+            result = await asyncio.to_thread(self.providers[name], prompt, cancel_event)
+        except asyncio.CancelledError:
+            raise
+        except ResponseTruncated:
+            self.stats[name]['truncated'] += 1
+            breaker = self.breakers.get(name)
+            if breaker is not None:
+                breaker.record_success()
+            raise
+        except Exception as e:
+            self.logger.error(f"调用AI服务商 {name} 出错: {str(e)}")
+            result = None
+
+        if cancel_event.is_set():
+            return None
+
+        breaker = self.breakers.get(name)
+        if result:
+            self.stats[name]['successes'] += 1
+            self.latencies[name].append(time.monotonic() - start_time)
+            if breaker is not None:
+                breaker.record_success()
+        else:
+            self.stats[name]['failures'] += 1
+            if breaker is not None:
+                breaker.record_failure()
+        return result
+
+    def get_stats(self) -> Dict:
+        """获取各服务商的请求统计和延迟分位数"""
+        return {
+            name: dict(
+                self.stats[name],
+                p50=self.percentile(name, 50),
+                p95=self.percentile(name, 95),
+                hedge_delay=self.hedge_delay(name),
+                breaker=self.breakers[name].get_stats() if name in self.breakers else None
+            )
+            for name in self.order
+        }
@@ -7,6 +7,9 @@ from apscheduler.triggers.cron import CronTrigger
 from src.scrapers.news_scraper import NewsScraper
 from src.processors.text_processor import TextProcessor
 from src.processors.notification_processor import NotificationProcessor
+from src.storage.database import Database
+from src.storage.sqlite_backend import SQLiteDatabase
+from src.storage.bulk_writer import BulkWriter
 
 class NewsScheduler:
     def __init__(self):
@@ -16,7 +19,30 @@ class NewsScheduler:
         # 初始化组件
         self.scraper = NewsScraper()
         self.text_processor = TextProcessor()
-        self.notifier = NotificationProcessor(test_mode=False)  # 实际推送模式
+        self.writer = self._create_writer()
+        self.notifier = NotificationProcessor(test_mode=False, writer=self.writer)  # 实际推送模式
+
+    def _create_writer(self):
+        """配置了数据库时创建写后缓冲，连接失败则不持久化，继续推送"""
+        db_config = self.scraper.config.DATABASE
+        if not db_config['enabled']:
+            return None
+        try:
+            if db_config['backend'] == 'sqlite':
+                database = SQLiteDatabase(db_config['sqlite_path'])
+            else:
+                database = Database()
+            buffer_config = db_config['write_buffer']
+            return BulkWriter(
+                database,
+                flush_size=buffer_config['flush_size'],
+                flush_interval=buffer_config['flush_interval'],
+                max_buffer=buffer_config['max_buffer'],
+                retry_backoff=buffer_config['retry_backoff']
+            )
+        except Exception as e:
+            self.logger.error(f"数据库不可用，本次运行不保存新闻: {str(e)}")
+            return None
 
     async def fetch_and_process(self):
         """获取、处理并推送新闻"""
@@ -31,13 +57,21 @@ class NewsScheduler:
             
             # 2. 关键词过滤
             filtered_news = self.scraper.filter_by_keywords(all_news)
+            for items in filtered_news.values():
+                for item in items:
+                    item['passed_filter'] = True
             
             # 3. 文本处理
             processed_news = self.text_processor.process_batch(all_news)
             
+            # 抓取、评分、文本处理后的新闻交给写后缓冲，由后台线程批量写入数据库
+            if self.writer is not None:
+                await self.writer.put(processed_news)
+            
             # 4. 推送新闻
             await self.notifier.process_and_send(filtered_news)
             
+            self._log_ai_stats()
             self.logger.info("新闻处理任务完成")
             
         except Exception as e:
@@ -70,15 +104,44 @@ class NewsScheduler:
             name='初始新闻处理'
         )
         
+        loop = asyncio.get_event_loop()
+        
+        # 打开推送渠道的长连接会话
+        loop.run_until_complete(self.notifier.start())
+        
         self.scheduler.start()
         self.logger.info("定时任务已启动")
         
         try:
             # 保持程序运行
-            asyncio.get_event_loop().run_forever()
+            loop.run_forever()
         except (KeyboardInterrupt, SystemExit):
             self.logger.info("正在停止定时任务...")
             self.scheduler.shutdown()
+        finally:
+            loop.run_until_complete(self.notifier.close())
+            self._close_writer()
+
+    def _log_ai_stats(self):
+        """记录AI调用的累计用量，以及各服务商的成功率、延迟和熔断状态"""
+        ai_processor = self.notifier.ai_processor
+        self.logger.info(f"AI调用统计: {ai_processor.get_usage_stats()}")
+        for name, stats in ai_processor.get_provider_stats().items():
+            breaker = stats['breaker'] or {}
+            success_rate = f"{stats['successes'] / stats['requests']:.0%}" if stats['requests'] else '-'
+            p95 = f"{stats['p95']:.1f}s" if stats['p95'] is not None else '-'
+            self.logger.info(
+                f"AI服务商 {name}: 请求 {stats['requests']}, 成功率 {success_rate}, p95 {p95}, "
+                f"对冲 {stats['hedges']}, 熔断状态 {breaker.get('state', '-')}"
+            )
+
+    def _close_writer(self):
+        """写完缓冲中剩余的新闻并关闭数据库连接"""
+        if self.writer is None:
+            return
+        self.writer.close(self.scraper.config.DATABASE['write_buffer']['close_timeout'])
+        self.writer.database.close()
+        self.logger.info(f"数据库写入统计: {self.writer.get_stats()}")
 
     def stop(self):
         """停止调度器"""
@@ -0,0 +1,99 @@
+import hashlib
+import json
+from abc import ABC, abstractmethod
+from typing import Dict, List, Optional
+
+# 只在新增文档时写入的字段
+IMMUTABLE_FIELDS = ('created_at',)
+# 由存储自身维护的字段，忽略传入的值
+STORAGE_FIELDS = {'_id', 'updated_at', 'content_hash', 'field_hashes'}
+# 不参与内容比较的字段：每轮抓取或处理都会刷新的时间戳
+UNHASHED_FIELDS = {'created_at', 'text_processed_at', 'ai_processed_at', 'pushed_at'}
+
+
+def field_hashes(item: Dict) -> Dict[str, str]:
+    """逐字段计算内容哈希，时间戳等每轮都会变化的字段不参与比较"""
+    return {
+        key: hashlib.md5(
+            json.dumps(value, sort_keys=True, ensure_ascii=False, default=str).encode('utf-8')
+        ).hexdigest()[:16]
+        for key, value in item.items()
+        if key not in UNHASHED_FIELDS and key not in STORAGE_FIELDS
+    }
+
+
+def content_hash(hashes: Dict[str, str]) -> str:
+    content = ''.join(f"{key}:{value};" for key, value in sorted(hashes.items()))
+    return hashlib.md5(content.encode('utf-8')).hexdigest()
+
+
+def merge_batch(items: List[Dict]) -> Dict[str, Dict]:
+    """按unique_id合并同一批次中重复的新闻，去掉由存储维护的字段"""
+    merged = {}
+    for item in items:
+        merged.setdefault(item['unique_id'], {}).update(
+            (key, value) for key, value in item.items() if key not in STORAGE_FIELDS
+        )
+    return merged
+
+
+class StorageBackend(ABC):
+    """新闻存储后端接口
+
+    Database（MongoDB）和SQLiteDatabase（嵌入式SQLite + FTS5）都实现这组方法，
+    BulkWriter和调度器只依赖这里的接口。缺少任何一个方法的后端在实例化时即报错。
+    """
+
+    @abstractmethod
+    def upsert_batch(self, items: List[Dict]) -> Dict[str, int]:
+        """按unique_id批量upsert，返回新增、更新、跳过的条数；出错时抛出异常由调用方处理"""
+        raise NotImplementedError
+
+    @abstractmethod
+    def save_item(self, item: Dict) -> bool:
+        """保存单条新闻"""
+        raise NotImplementedError
+
+    @abstractmethod
+    def save_batch(self, items: List[Dict]) -> int:
+        """批量保存新闻，返回新增和更新的条数"""
+        raise NotImplementedError
+
+    @abstractmethod
+    def get_latest_news(self,
+                        limit: int = 100,
+                        tags: Optional[List[str]] = None,
+                        language: Optional[str] = None,
+                        processed_only: bool = True
+                        ) -> List[Dict]:
+        """获取最新新闻"""
+        raise NotImplementedError
+
+    @abstractmethod
+    def get_unprocessed_news(self,
+                             limit: int = 50,
+                             tags: Optional[List[str]] = None
+                             ) -> List[Dict]:
+        """获取未经处理的新闻"""
+        raise NotImplementedError
+
+    @abstractmethod
+    def search_news(self,
+                    keyword: str,
+                    start_date: Optional[str] = None,
+                    end_date: Optional[str] = None,
+                    tags: Optional[List[str]] = None,
+                    limit: int = 50
+                    ) -> List[Dict]:
+        """搜索新闻，按相关度排序"""
+        raise NotImplementedError
+
+    @abstractmethod
+    def get_stats(self) -> Dict:
+        """获取数据统计信息"""
+        raise NotImplementedError
+
+    @abstractmethod
+    def close(self) -> None:
+        """关闭存储连接"""
+        raise NotImplementedError
@@ -0,0 +1,187 @@
+import asyncio
+import logging
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Optional
+
+from pymongo.errors import BulkWriteError, PyMongoError
+
+
+class BulkWriter:
+    """写后缓冲的批量写入器
+
+    流水线各阶段把新闻（或只含unique_id和新增字段的部分更新）交给写入器后立即返回，
+    同一条新闻的多次更新在缓冲中按字段合并。后台线程在缓冲达到flush_size条、
+    或最早一条等待超过flush_interval秒时调用存储后端的upsert_batch批量写入，不占用事件循环。
+
+    缓冲中超过max_buffer条时写入方阻塞，直到后台线程写出一批（背压）；
+    数据库不可用时保留缓冲并按retry_backoff间隔重试，close()时写完剩余数据。
+    """
+
+    def __init__(self, database, flush_size: int = 500, flush_interval: float = 5.0,
+                 max_buffer: int = 5000, retry_backoff: float = 5.0):
+        self.logger = logging.getLogger(__name__)
+        self.database = database
+        self.flush_size = flush_size
+        self.flush_interval = flush_interval
+        self.max_buffer = max(max_buffer, flush_size)
+        self.retry_backoff = retry_backoff
+
+        self.condition = threading.Condition()
+        self.buffer: Dict[str, Dict] = {}
+        self.oldest = None          # 缓冲中最早一条的写入时间
+        self.writing = 0            # 正在写入数据库的条数
+        self.flush_requested = False
+        self.stopping = False
+        self.retry_at = None        # 写入失败后，下一次重试的时间
+
+        self.stats = {
+            'written': 0, 'inserted': 0, 'modified': 0, 'skipped': 0,
+            'failed': 0, 'flushes': 0, 'retries': 0, 'blocked': 0
+        }
+        self.thread = threading.Thread(target=self._run, name='bulk-writer', daemon=True)
+        self.thread.start()
+
+    def submit(self, items: List[Dict], timeout: Optional[float] = None) -> bool:
+        """放入缓冲，缓冲已满时阻塞等待；超时或写入器已关闭时返回False"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self.condition:
+            for item in items:
+                key = item.get('unique_id')
+                if not key:
+                    continue
+                while key not in self.buffer and len(self.buffer) >= self.max_buffer and not self.stopping:
+                    self.stats['blocked'] += 1
+                    self.flush_requested = True
+                    self.condition.notify_all()
+                    remaining = None if deadline is None else deadline - time.monotonic()
+                    if remaining is not None and remaining <= 0:
+                        return False
+                    self.condition.wait(remaining)
+                if self.stopping:
+                    return False
+
+                if key in self.buffer:
+                    self.buffer[key].update(item)
+                else:
+                    self.buffer[key] = dict(item)
+                if self.oldest is None:
+                    # 后台线程此前在无限期等待，唤醒它按flush_interval计时
+                    self.oldest = time.monotonic()
+                    self.condition.notify_all()
+            if len(self.buffer) >= self.flush_size:
+                self.condition.notify_all()
+        return True
+
+    async def put(self, items: List[Dict]) -> bool:
+        """在事件循环中放入缓冲；需要等待时在线程中等待，不阻塞事件循环"""
+        if not items:
+            return True
+        with self.condition:
+            has_room = len(self.buffer) + len(items) <= self.max_buffer
+        if has_room:
+            return self.submit(items)
+        return await asyncio.to_thread(self.submit, items)
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """立即写出缓冲中的全部数据并等待完成，返回是否在超时前写完"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self.condition:
+            self.flush_requested = True
+            self.condition.notify_all()
+            while self.buffer or self.writing:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self.condition.wait(remaining)
+        return True
+
+    def _due(self) -> bool:
+        if not self.buffer:
+            return False
+        if self.retry_at is not None and time.monotonic() < self.retry_at:
+            return False
+        return (
+            self.stopping or self.flush_requested
+            or len(self.buffer) >= self.flush_size
+            or time.monotonic() - self.oldest >= self.flush_interval
+        )
+
+    def _take_batch(self) -> List[Dict]:
+        keys = list(self.buffer)[:self.flush_size]
+        batch = [self.buffer.pop(key) for key in keys]
+        self.oldest = time.monotonic() if self.buffer else None
+        if not self.buffer:
+            self.flush_requested = False
+        self.writing = len(batch)
+        return batch
+
+    def _requeue(self, batch: List[Dict]) -> None:
+        """写入失败的数据放回缓冲，之后到达的同一条新闻的字段优先"""
+        for item in batch:
+            key = item['unique_id']
+            self.buffer[key] = dict(item, **self.buffer[key]) if key in self.buffer else item
+        if self.oldest is None:
+            self.oldest = time.monotonic()
+
+    def _run(self) -> None:
+        while True:
+            with self.condition:
+                while not self._due():
+                    if self.stopping and not self.buffer:
+                        return
+                    wake_at = self.retry_at
+                    if wake_at is None and self.oldest is not None:
+                        wake_at = self.oldest + self.flush_interval
+                    self.condition.wait(None if wake_at is None else max(0.0, wake_at - time.monotonic()))
+                batch = self._take_batch()
+
+            retry = False
+            failed = 0
+            counts = {}
+            try:
+                counts = self.database.upsert_batch(batch)
+            except BulkWriteError as e:
+                # 无序写入中个别文档的错误不会因重试而改变，记录后丢弃
+                errors = e.details.get('writeErrors', [])
+                failed = len(errors)
+                counts = {'inserted': e.details.get('nUpserted', 0), 'modified': e.details.get('nModified', 0)}
+                self.logger.error(f"批量写入有 {failed} 条失败: {errors[:3]}")
+            except (PyMongoError, sqlite3.OperationalError) as e:
+                retry = True
+                self.logger.warning(f"批量写入失败，{self.retry_backoff}秒后重试: {str(e)}")
+            except Exception as e:
+                failed = len(batch)
+                self.logger.error(f"批量写入出错，丢弃 {failed} 条: {str(e)}")
+
+            with self.condition:
+                self.writing = 0
+                self.stats['flushes'] += 1
+                if not retry:
+                    self.stats['written'] += len(batch) - failed
+                    self.stats['failed'] += failed
+                    for key, count in counts.items():
+                        self.stats[key] += count
+                if retry:
+                    # 关闭时也继续重试，直到close()的超时
+                    self.stats['retries'] += 1
+                    self._requeue(batch)
+                    self.retry_at = time.monotonic() + self.retry_backoff
+                else:
+                    self.retry_at = None
+                self.condition.notify_all()
+
+    def close(self, timeout: Optional[float] = 30.0) -> None:
+        """停止接收新数据，写完缓冲后结束后台线程"""
+        with self.condition:
+            self.stopping = True
+            self.condition.notify_all()
+        self.thread.join(timeout)
+        with self.condition:
+            if self.thread.is_alive() or self.buffer:
+                self.logger.error(f"退出时仍有 {len(self.buffer) + self.writing} 条新闻未写入数据库")
+
+    def get_stats(self) -> Dict[str, int]:
+        with self.condition:
+            return dict(self.stats, buffered=len(self.buffer))
@@ -1,40 +1,62 @@
-from typing import List, Dict, Optional, Union
+from typing import Iterator, List, Dict, Optional, Tuple, Union
 import logging
+import time
 from datetime import datetime, timedelta
 from pymongo import MongoClient, ASCENDING, DESCENDING, UpdateOne
 from pymongo.errors import DuplicateKeyError, BulkWriteError
 from ..config import Config
+from .base import IMMUTABLE_FIELDS, StorageBackend, content_hash, field_hashes, merge_batch
 
-class Database:
-    def __init__(self):
+# 已被按查询形状建立的索引取代；启动时只提示，由 index_audit --drop-legacy 删除
+LEGACY_INDEXES = ('published_-1_source_1_language_1_tags_1',)
+
+# 汇总集合的计数指标，以及标记字段首次变为True时累加的指标
+ROLLUP_METRICS = ('fetched', 'passed_filter', 'analyzed', 'pushed')
+ROLLUP_FLAGS = {'passed_filter': 'passed_filter', 'ai_processed': 'analyzed', 'pushed': 'pushed'}
+UNTAGGED = 'untagged'
+ALL_TAGS = '*'  # 不区分标签的合计行，按来源、语言、日期统计时使用，避免多标签新闻被重复计数
+
+# 统计查询使用的覆盖索引，聚合只扫描索引、不读取文档
+STATS_INDEX = 'stats_covering'
+
+# 列表查询默认不返回的大字段
+HEAVY_FIELDS = ('full_content', 'ai_summary', 'ai_analysis', 'field_hashes')
+# 分页游标：上一页最后一条的 (published, unique_id)
+PageCursor = Tuple[str, str]
+
+class Database(StorageBackend):
+    def __init__(self, client: Optional[MongoClient] = None):
         self.config = Config()
         self.logger = logging.getLogger(__name__)
+        self._stats_cache = None
+        self._stats_expires_at = 0.0
         
         try:
-            # 连接设置
-            client_options = {
-                'serverSelectionTimeoutMS': 30000,     # 增加服务器选择超时
-                'connectTimeoutMS': 30000,             # 增加连接超时
-                'socketTimeoutMS': 30000,              # 增加套接字超时
-                'ssl': True,
-                'ssl_cert_reqs': 'CERT_NONE',
-                'retryWrites': True,
-                'tlsAllowInvalidCertificates': True,
-                'directConnection': False,             # 禁用直接连接
-                'connect': True,                       # 立即连接
-                'maxPoolSize': 1,                      # 减小连接池大小
-                'waitQueueTimeoutMS': 30000           # 增加等待队列超时
-            }
-            
-            # 连接MongoDB Atlas
-            self.client = MongoClient(
-                self.config.DATABASE['uri'],
-                **client_options
-            )
+            if client is None:
+                # 连接设置；TLS由URI决定（mongodb+srv默认启用）
+                client_options = {
+                    'serverSelectionTimeoutMS': 30000,     # 增加服务器选择超时
+                    'connectTimeoutMS': 30000,             # 增加连接超时
+                    'socketTimeoutMS': 30000,              # 增加套接字超时
+                    'retryWrites': True,
+                    'directConnection': False,             # 禁用直接连接
+                    'connect': True,                       # 立即连接
+                    # 写入在后台线程中进行，读取和写入可以同时占用连接
+                    'maxPoolSize': self.config.DATABASE['max_pool_size'],
+                    'waitQueueTimeoutMS': 30000           # 增加等待队列超时
+                }
+                
+                # 连接MongoDB Atlas
+                client = MongoClient(
+                    self.config.DATABASE['uri'],
+                    **client_options
+                )
+            self.client = client
             
             # 强制连接检查
             self.db = self.client.get_database(self.config.DATABASE['name'])
             self.collection = self.db.get_collection(self.config.DATABASE['collection'])
+            self.rollups = self.db.get_collection(self.config.DATABASE['rollup_collection'])
             
             # 测试连接
             self.client.admin.command('ping')
@@ -48,7 +70,12 @@ class Database:
             raise
 
     def _create_indexes(self):
-        """创建必要的索引"""
+        """创建必要的索引
+
+        排序索引按“等值-排序-范围”（ESR）规则为每种查询形状建立：等值条件的字段在前，
+        排序字段 (published, unique_id) 紧随其后，这样过滤后的结果已按索引有序，不需要内存排序。
+        tags只有几个类别、区分度低，作为残余条件在索引扫描中过滤。用 python -m src.storage.index_audit 检查。
+        """
         try:
             # 创建唯一索引防止重复新闻
             self.collection.create_index(
@@ -56,14 +83,34 @@ class Database:
                 unique=True
             )
             
-            # 创建复合索引支持查询
+            # 无等值条件的查询（未处理新闻、只按标签过滤）和keyset分页
             self.collection.create_index([
                 ('published', DESCENDING),
-                ('source', ASCENDING),
+                ('unique_id', DESCENDING)
+            ])
+            
+            # 最新新闻：text_processed等值，按published排序
+            self.collection.create_index([
+                ('text_processed', ASCENDING),
+                ('published', DESCENDING),
+                ('unique_id', DESCENDING)
+            ])
+            
+            # 最新新闻：text_processed和language等值，按published排序
+            self.collection.create_index([
+                ('text_processed', ASCENDING),
                 ('language', ASCENDING),
-                ('tags', ASCENDING)
+                ('published', DESCENDING),
+                ('unique_id', DESCENDING)
             ])
             
+            # 统计信息的覆盖索引：get_stats只读这三个字段
+            self.collection.create_index([
+                ('text_processed', ASCENDING),
+                ('ai_processed', ASCENDING),
+                ('created_at', ASCENDING)
+            ], name=STATS_INDEX)
+            
             # 创建文本索引支持全文搜索
             self.collection.create_index([
                 ('title', 'text'),
@@ -71,24 +118,47 @@ class Database:
                 ('keywords', 'text')
             ])
             
+            # 汇总集合：每个 (日期, 来源, 语言, 标签) 一条文档
+            self.rollups.create_index([
+                ('day', ASCENDING),
+                ('source', ASCENDING),
+                ('language', ASCENDING),
+                ('tag', ASCENDING)
+            ], unique=True)
+            
+            # 旧的 (published, source, language, tags) 索引不能服务任何查询，只增加写入开销；
+            # 删除索引是不可逆的结构变更，启动时不自动执行
+            legacy = self.legacy_indexes()
+            if legacy:
+                self.logger.warning(
+                    f"存在不再使用的索引: {', '.join(legacy)}，"
+                    f"可运行 python -m src.storage.index_audit --drop-legacy 删除"
+                )
+            
             self.logger.info("数据库索引创建完成")
             
         except Exception as e:
             self.logger.error(f"创建索引时出错: {str(e)}")
 
+    def legacy_indexes(self) -> List[str]:
+        """集合中仍存在的旧索引"""
+        existing = self.collection.index_information()
+        return [name for name in LEGACY_INDEXES if name in existing]
+
+    def drop_legacy_indexes(self) -> List[str]:
+        """删除已被取代的旧索引，返回删除的索引名"""
+        dropped = []
+        for name in self.legacy_indexes():
+            self.collection.drop_index(name)
+            self.logger.info(f"已删除不再使用的索引: {name}")
+            dropped.append(name)
+        return dropped
+
     def save_item(self, item: Dict) -> bool:
         """保存单条新闻"""
         try:
-            # 添加更新时间
-            item['updated_at'] = datetime.now().isoformat()
-            
-            # 使用unique_id作为唯一标识，如果存在则更新
-            result = self.collection.update_one(
-                {'unique_id': item['unique_id']},
-                {'$set': item},
-                upsert=True
-            )
-            
+            # 使用unique_id作为唯一标识，如果存在则只更新变化的字段
+            self.upsert_batch([item])
             return True
         except DuplicateKeyError:
             self.logger.info(f"新闻已存在: {item.get('title', '')}")
@@ -97,33 +167,179 @@ class Database:
             self.logger.error(f"保存新闻时出错: {str(e)}")
             return False
 
+    def upsert_batch(self, items: List[Dict]) -> Dict[str, int]:
+        """按unique_id批量upsert，无序执行，返回新增、更新、跳过的条数；出错时抛出异常由调用方处理
+
+        先按unique_id读回已保存的逐字段哈希，内容没有变化的新闻直接跳过；
+        其余新闻只$set发生变化的字段，created_at等不可变字段用$setOnInsert只在新增时写入，
+        避免每轮重写整篇文档（full_content、ai_summary等）和重建索引。
+        """
+        counts = {'inserted': 0, 'modified': 0, 'skipped': 0}
+        merged = merge_batch(items)
+        if not merged:
+            return counts
+        
+        stored = {
+            doc['unique_id']: doc
+            for doc in self.collection.find(
+                {'unique_id': {'$in': list(merged)}},
+                {'_id': 0, 'unique_id': 1, 'field_hashes': 1, 'source': 1, 'language': 1, 'tags': 1,
+                 'published': 1, 'created_at': 1}
+            )
+        }
+        
+        now = datetime.now().isoformat()
+        operations = []
+        # 每个写入操作触发的汇总计数，与operations一一对应
+        events = []
+        for unique_id, item in merged.items():
+            hashes = field_hashes(item)
+            doc = stored.get(unique_id)
+            old_hashes = None if doc is None else doc.get('field_hashes', {})
+            changed = {key for key, value in hashes.items() if old_hashes is None or old_hashes.get(key) != value}
+            if not changed:
+                counts['skipped'] += 1
+                continue
+            
+            all_hashes = dict(old_hashes or {}, **hashes)
+            update = {
+                key: value for key, value in item.items()
+                if key in changed or (key not in hashes and key not in IMMUTABLE_FIELDS)
+            }
+            update.update({f'field_hashes.{key}': hashes[key] for key in changed})
+            update['content_hash'] = content_hash(all_hashes)
+            update['updated_at'] = now
+            
+            operation = {'$set': update}
+            insert_only = {key: item[key] for key in IMMUTABLE_FIELDS if key in item}
+            if insert_only:
+                operation['$setOnInsert'] = insert_only
+            operations.append(UpdateOne({'unique_id': unique_id}, operation, upsert=True))
+            events.append((dict(doc or {}, **item), self._rollup_metrics(item, changed, doc is None)))
+        
+        if operations:
+            try:
+                result = self.collection.bulk_write(operations, ordered=False)
+            except BulkWriteError as e:
+                failed = {error['index'] for error in e.details.get('writeErrors', [])}
+                self._increment_rollups([event for index, event in enumerate(events) if index not in failed])
+                raise
+            counts['inserted'] = result.upserted_count
+            counts['modified'] = result.modified_count
+            self._increment_rollups(events)
+        return counts
+
+    @staticmethod
+    def _rollup_metrics(item: Dict, changed: set, inserted: bool) -> List[str]:
+        """这次写入使新闻进入了哪些状态：首次保存计为fetched，标记字段首次变为True计为对应指标"""
+        metrics = ['fetched'] if inserted else []
+        metrics.extend(
+            metric for field, metric in ROLLUP_FLAGS.items()
+            if field in changed and item.get(field) is True
+        )
+        return metrics
+
+    @staticmethod
+    def _rollup_day(news: Dict) -> str:
+        """新闻计入汇总的日期：发布日期（保留published自带的时区），缺失或无法解析时用首次保存的日期"""
+        for field in ('published', 'created_at'):
+            value = news.get(field)
+            if isinstance(value, datetime):
+                return value.date().isoformat()
+            if isinstance(value, str) and value:
+                try:
+                    return datetime.fromisoformat(value.replace('Z', '+00:00')).date().isoformat()
+                except ValueError:
+                    continue
+        return datetime.now().date().isoformat()
+
+    def _increment_rollups(self, events: List[Tuple[Dict, List[str]]]) -> None:
+        """按 (日期, 来源, 语言, 标签) 用$inc upsert累加汇总计数
+
+        计数在状态变化的那次写入中累加一次，重复抓取、未变化的新闻不会重复计数。
+        一条新闻有多个标签时每个标签各计一次，另外计入一次tag为ALL_TAGS的合计行。
+        日期取新闻的发布日期而不是处理日期：延迟抓取和回填的新闻计入它发布的那一天，
+        同一条新闻的抓取、分析、推送计数都落在同一天。
+        """
+        increments = {}
+        for news, metrics in events:
+            if not metrics:
+                continue
+            day = self._rollup_day(news)
+            for tag in (news.get('tags') or [UNTAGGED]) + [ALL_TAGS]:
+                key = (day, news.get('source', ''), news.get('language', ''), tag)
+                counter = increments.setdefault(key, dict.fromkeys(ROLLUP_METRICS, 0))
+                for metric in metrics:
+                    counter[metric] += 1
+        if not increments:
+            return
+        
+        try:
+            self.rollups.bulk_write([
+                UpdateOne(
+                    {'day': day, 'source': source, 'language': language, 'tag': tag},
+                    {'$inc': {metric: count for metric, count in counter.items() if count}},
+                    upsert=True
+                )
+                for (day, source, language, tag), counter in increments.items()
+            ], ordered=False)
+        except Exception as e:
+            # 汇总是辅助数据，写入失败不影响新闻本身的保存
+            self.logger.error(f"更新汇总计数出错: {str(e)}")
+
+    def get_rollups(self,
+                    start_day: Optional[str] = None,
+                    end_day: Optional[str] = None,
+                    group_by: Tuple[str, ...] = ('day', 'source'),
+                    source: Optional[str] = None,
+                    tag: Optional[str] = None
+                    ) -> List[Dict]:
+        """从汇总集合按group_by（day、source、language、tag的组合）统计各指标，日期为YYYY-MM-DD
+
+        只读取汇总文档，开销与天数×来源×标签数成正比，与新闻总数无关。
+        不按标签分组也不按标签过滤时读取合计行，否则读取各标签的行。
+        """
+        query = {}
+        if start_day or end_day:
+            query['day'] = {}
+            if start_day:
+                query['day']['$gte'] = start_day
+            if end_day:
+                query['day']['$lte'] = end_day
+        if source:
+            query['source'] = source
+        if tag:
+            query['tag'] = tag
+        elif 'tag' in group_by:
+            query['tag'] = {'$ne': ALL_TAGS}
+        else:
+            query['tag'] = ALL_TAGS
+        
+        group = {'_id': {field: f'${field}' for field in group_by}}
+        group.update({metric: {'$sum': f'${metric}'} for metric in ROLLUP_METRICS})
+        rows = self.rollups.aggregate([
+            {'$match': query},
+            {'$group': group},
+            {'$sort': {f'_id.{field}': ASCENDING for field in group_by}}
+        ])
+        return [dict(row.pop('_id'), **row) for row in rows]
+
     def save_batch(self, items: List[Dict]) -> int:
-        """批量保存新闻"""
+        """批量保存新闻，返回新增和更新的条数"""
         try:
             if not items:
                 return 0
-                
-            # 准备批量更新操作
-            operations = []
-            for item in items:
-                item['updated_at'] = datetime.now().isoformat()
-                operations.append(
-                    UpdateOne(
-                        {'unique_id': item['unique_id']},
-                        {'$set': item},
-                        upsert=True
-                    )
-                )
             
-            # 执行批量操作
-            result = self.collection.bulk_write(operations, ordered=False)
+            counts = self.upsert_batch(items)
             
-            self.logger.info(f"批量保存完成: {result.upserted_count} 新增, {result.modified_count} 更新")
-            return result.upserted_count + result.modified_count
+            self.logger.info(
+                f"批量保存完成: {counts['inserted']} 新增, {counts['modified']} 更新, {counts['skipped']} 未变化跳过"
+            )
+            return counts['inserted'] + counts['modified']
             
         except BulkWriteError as e:
             self.logger.error(f"批量保存时出错: {str(e.details)}")
-            return len(items) - len(e.details['writeErrors'])
+            return e.details.get('nUpserted', 0) + e.details.get('nModified', 0)
         except Exception as e:
             self.logger.error(f"批量保存时出错: {str(e)}")
             return 0
@@ -135,16 +351,7 @@ class Database:
                        processed_only: bool = True
                        ) -> List[Dict]:
         """获取最新新闻"""
-        query = {}
-        
-        if tags:
-            query['tags'] = {'$in': tags}
-        
-        if language:
-            query['language'] = language
-            
-        if processed_only:
-            query['text_processed'] = True
+        query = self._news_query(tags, language, processed_only)
             
         return list(self.collection.find(
             query,
@@ -196,26 +403,207 @@ class Database:
             {'_id': 0, 'score': {'$meta': 'textScore'}}
         ).sort([('score', {'$meta': 'textScore'})]).limit(limit))
 
-    def get_stats(self) -> Dict:
-        """获取数据统计信息"""
+    def _projection(self, fields: Optional[List[str]]) -> Dict:
+        """列表查询的投影：指定fields时只返回这些字段，否则排除正文等大字段
+
+        分页依赖published和unique_id，这两个字段总会返回。
+        """
+        if fields:
+            projection = {field: 1 for field in fields}
+            projection.update({'_id': 0, 'published': 1, 'unique_id': 1})
+            return projection
+        projection = {field: 0 for field in HEAVY_FIELDS}
+        projection['_id'] = 0
+        return projection
+
+    def get_news_page(self,
+                      query: Optional[Dict] = None,
+                      limit: int = 100,
+                      after: Optional[PageCursor] = None,
+                      fields: Optional[List[str]] = None
+                      ) -> Tuple[List[Dict], Optional[PageCursor]]:
+        """按 (published, unique_id) 倒序分页查询，返回本页新闻和下一页游标（没有下一页时为None）
+
+        游标是上一页最后一条的 (published, unique_id)，下一页从它之后继续（keyset分页），
+        每页都走索引定位起点，不像skip那样随页数增加而变慢，期间写入的新闻也不会导致重复或遗漏。
+        """
+        query = dict(query or {})
+        if after is not None:
+            # published的$lte给出索引扫描的起点，$or只排除起点处已返回过的新闻
+            published, unique_id = after
+            keyset = {
+                'published': {'$lte': published},
+                '$or': [{'published': {'$lt': published}}, {'unique_id': {'$lt': unique_id}}]
+            }
+            query = {'$and': [query, keyset]} if query else keyset
+        
+        items = list(self.collection.find(
+            query,
+            self._projection(fields)
+        ).sort([('published', DESCENDING), ('unique_id', DESCENDING)]).limit(limit))
+        
+        if len(items) < limit:
+            return items, None
+        return items, (items[-1]['published'], items[-1]['unique_id'])
+
+    def iter_news(self,
+                  query: Optional[Dict] = None,
+                  batch_size: int = 500,
+                  fields: Optional[List[str]] = None,
+                  after: Optional[PageCursor] = None
+                  ) -> Iterator[Dict]:
+        """逐条返回符合条件的新闻，每次从数据库取batch_size条，内存占用与总数无关
+
+        适合导出和重新处理全部新闻；传入after可以从上次中断的位置继续。
+        """
+        while True:
+            items, after = self.get_news_page(query, limit=batch_size, after=after, fields=fields)
+            yield from items
+            if after is None:
+                return
+
+    def _news_query(self,
+                    tags: Optional[List[str]] = None,
+                    language: Optional[str] = None,
+                    processed_only: bool = True
+                    ) -> Dict:
+        query = {}
+        if tags:
+            query['tags'] = {'$in': tags}
+        if language:
+            query['language'] = language
+        if processed_only:
+            query['text_processed'] = True
+        return query
+
+    def iter_latest_news(self,
+                         tags: Optional[List[str]] = None,
+                         language: Optional[str] = None,
+                         processed_only: bool = True,
+                         batch_size: int = 500,
+                         fields: Optional[List[str]] = None
+                         ) -> Iterator[Dict]:
+        """按发布时间倒序逐条返回新闻，get_latest_news的流式版本"""
+        return self.iter_news(self._news_query(tags, language, processed_only), batch_size, fields)
+
+    def iter_unprocessed_news(self,
+                              tags: Optional[List[str]] = None,
+                              batch_size: int = 500,
+                              fields: Optional[List[str]] = None
+                              ) -> Iterator[Dict]:
+        """逐条返回未经处理的新闻，get_unprocessed_news的流式版本"""
+        query = self._news_query(tags, processed_only=False)
+        query['text_processed'] = {'$ne': True}
+        return self.iter_news(query, batch_size, fields)
+
+    def iter_search_news(self,
+                         keyword: str,
+                         start_date: Optional[str] = None,
+                         end_date: Optional[str] = None,
+                         tags: Optional[List[str]] = None,
+                         batch_size: int = 500,
+                         fields: Optional[List[str]] = None
+                         ) -> Iterator[Dict]:
+        """逐条返回匹配关键词的新闻，search_news的流式版本；按发布时间倒序而不是相关度排序
+
+        这不是索引支持的分页：$text查询只能使用文本索引，结果无法按published索引有序返回，
+        每一页都重新执行$text，把全部匹配的新闻在内存中排序后取batch_size条。
+        总开销随匹配条数和页数增长，匹配很多时用start_date/end_date缩小范围。
+        """
+        query = self._news_query(tags, processed_only=False)
+        query['$text'] = {'$search': keyword}
+        if start_date or end_date:
+            date_query = {}
+            if start_date:
+                date_query['$gte'] = start_date
+            if end_date:
+                date_query['$lte'] = end_date
+            query['published'] = date_query
+        return self.iter_news(query, batch_size, fields)
+
+    def query_shapes(self) -> List[Dict]:
+        """本类发出的各种查询形状，用样例参数构造，供索引审计使用"""
+        cursor = ('2026-01-01T00:00:00', 'ffffffffffffffffffffffffffffffff')
+        keyset = {
+            'published': {'$lte': cursor[0]},
+            '$or': [{'published': {'$lt': cursor[0]}}, {'unique_id': {'$lt': cursor[1]}}]
+        }
+        by_published = [('published', DESCENDING), ('unique_id', DESCENDING)]
+        shapes = [
+            ('latest', self._news_query(), by_published),
+            ('latest_by_language', self._news_query(language='zh'), by_published),
+            ('latest_by_tags', self._news_query(tags=['ai_ml']), by_published),
+            ('latest_by_language_tags', self._news_query(['ai_ml'], 'zh'), by_published),
+            ('latest_all', self._news_query(processed_only=False), by_published),
+            ('latest_next_page', {'$and': [self._news_query(language='zh'), keyset]}, by_published),
+            ('unprocessed', {'text_processed': {'$ne': True}}, None),
+            ('unprocessed_stream', {'text_processed': {'$ne': True}}, by_published),
+            ('upsert_lookup', {'unique_id': {'$in': ['a', 'b']}}, None),
+            ('search', {'$text': {'$search': 'AI'}}, [('score', {'$meta': 'textScore'})]),
+            ('search_stream_next_page', {'$and': [{'$text': {'$search': 'AI'}}, keyset]}, by_published),
+        ]
+        return [
+            {
+                'name': name,
+                'filter': query,
+                'sort': sort,
+                # $text查询只能使用文本索引，按相关度或发布时间排序都只能在内存中进行
+                'allow_sort': name.startswith('search')
+            }
+            for name, query, sort in shapes
+        ]
+
+    def explain_query_shapes(self, limit: int = 100) -> List[Dict]:
+        """对每种查询形状执行explain()，标出全表扫描（COLLSCAN）和内存排序（SORT）"""
+        report = []
+        for shape in self.query_shapes():
+            projection = {'_id': 0}
+            if shape['name'] == 'search':
+                projection['score'] = {'$meta': 'textScore'}
+            cursor = self.collection.find(shape['filter'], projection).limit(limit)
+            if shape['sort']:
+                cursor = cursor.sort(shape['sort'])
+            report.append(_shape_report(shape, cursor.explain()))
+        return report
+
+    def get_stats(self, refresh: bool = False) -> Dict:
+        """获取数据统计信息
+
+        总数取自集合元数据（estimated_document_count），其余计数由一次$facet聚合得到，
+        聚合只投影覆盖索引中的字段并指定该索引，一次索引扫描完成全部计数。
+        结果在进程内缓存stats_cache_ttl秒，频繁轮询不会每次都查询数据库。
+        """
+        now = time.monotonic()
+        if not refresh and self._stats_cache is not None and now < self._stats_expires_at:
+            return self._stats_cache
+        
         try:
-            total_count = self.collection.count_documents({})
-            processed_count = self.collection.count_documents({'text_processed': True})
-            ai_processed_count = self.collection.count_documents({'ai_processed': True})
-            
-            # 获取最近24小时的新闻数量
-            yesterday = datetime.now() - timedelta(days=1)
-            recent_count = self.collection.count_documents({
-                'created_at': {'$gte': yesterday.isoformat()}
-            })
-            
-            return {
-                'total_news': total_count,
-                'processed_news': processed_count,
-                'ai_processed_news': ai_processed_count,
-                'recent_24h': recent_count,
+            # created_at保存为ISO格式字符串，按字符串比较即按时间比较
+            yesterday = (datetime.now() - timedelta(days=1)).isoformat()
+            pipeline = [
+                {'$project': {'_id': 0, 'text_processed': 1, 'ai_processed': 1, 'created_at': 1}},
+                {'$facet': {
+                    'processed': [{'$match': {'text_processed': True}}, {'$count': 'count'}],
+                    'ai_processed': [{'$match': {'ai_processed': True}}, {'$count': 'count'}],
+                    'recent': [{'$match': {'created_at': {'$gte': yesterday}}}, {'$count': 'count'}]
+                }}
+            ]
+            facets = next(self.collection.aggregate(pipeline, hint=STATS_INDEX), {})
+            
+            def count(name: str) -> int:
+                result = facets.get(name) or [{}]
+                return result[0].get('count', 0)
+            
+            stats = {
+                'total_news': self.collection.estimated_document_count(),
+                'processed_news': count('processed'),
+                'ai_processed_news': count('ai_processed'),
+                'recent_24h': count('recent'),
                 'last_updated': datetime.now().isoformat()
             }
+            self._stats_cache = stats
+            self._stats_expires_at = now + self.config.DATABASE['stats_cache_ttl']
+            return stats
         except Exception as e:
             self.logger.error(f"获取统计信息时出错: {str(e)}")
             return {}
@@ -223,4 +611,48 @@ class Database:
     def close(self):
         """关闭数据库连接"""
         if self.client:
-            self.client.close() 
\ No newline at end of file
+            self.client.close()
+
+
+def _walk_plan(plan) -> Iterator[Dict]:
+    """遍历explain输出中的执行计划树（兼容classic和SBE两种格式）"""
+    if isinstance(plan, dict):
+        if 'stage' in plan:
+            yield plan
+        for key in ('queryPlan', 'inputStage', 'inputStages', 'shards'):
+            if key in plan:
+                yield from _walk_plan(plan[key])
+        if 'winningPlan' in plan:
+            yield from _walk_plan(plan['winningPlan'])
+    elif isinstance(plan, list):
+        for child in plan:
+            yield from _walk_plan(child)
+
+
+def _plan_stages(plan: Dict) -> List[str]:
+    return [node['stage'] for node in _walk_plan(plan)]
+
+
+def _plan_indexes(plan: Dict) -> List[str]:
+    return [node['indexName'] for node in _walk_plan(plan) if node.get('indexName')]
+
+
+def _shape_report(shape: Dict, plan: Dict) -> Dict:
+    """从一个查询形状的explain输出中取出执行阶段、使用的索引和扫描条数，并标出问题"""
+    winning_plan = plan.get('queryPlanner', {}).get('winningPlan', {})
+    stages = _plan_stages(winning_plan)
+    problems = []
+    if 'COLLSCAN' in stages:
+        problems.append('COLLSCAN')
+    if 'SORT' in stages and not shape['allow_sort']:
+        problems.append('SORT')
+    execution = plan.get('executionStats', {})
+    return {
+        'name': shape['name'],
+        'stages': stages,
+        'indexes': _plan_indexes(winning_plan),
+        'keys_examined': execution.get('totalKeysExamined'),
+        'docs_examined': execution.get('totalDocsExamined'),
+        'returned': execution.get('nReturned'),
+        'problems': problems
+    }
@@ -0,0 +1,58 @@
+"""索引审计：对Database发出的每种查询形状执行explain()，标出全表扫描和内存排序
+
+    python -m src.storage.index_audit
+
+有问题的查询形状时以退出码1结束，可以放在部署前的检查中。
+加上 --drop-legacy 时删除已被取代的旧索引（不可逆，启动时不会自动删除）。
+"""
+import argparse
+import logging
+import sys
+from typing import Dict, List
+
+from src.storage.database import Database
+
+
+def print_report(report: List[Dict], legacy: List[str]) -> int:
+    """打印审计结果，返回退出码：有问题的查询形状时为1，否则为0"""
+    print(f"{'shape':<26}{'plan':<34}{'keys':>8}{'docs':>8}{'returned':>10}  result")
+    for row in report:
+        plan = ' > '.join(row['stages'])
+        result = ', '.join(row['problems']) or 'ok'
+        print(f"{row['name']:<26}{plan:<34}{str(row['keys_examined']):>8}"
+              f"{str(row['docs_examined']):>8}{str(row['returned']):>10}  {result}")
+        if row['indexes']:
+            print(f"{'':<26}index: {', '.join(row['indexes'])}")
+
+    if legacy:
+        print(f"\n不再使用的旧索引: {', '.join(legacy)}（使用 --drop-legacy 删除）")
+
+    flagged = [row['name'] for row in report if row['problems']]
+    if flagged:
+        print(f"\n{len(flagged)} 个查询形状需要检查索引: {', '.join(flagged)}")
+        return 1
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--limit', type=int, default=100, help='每个查询形状explain时使用的limit')
+    parser.add_argument('--drop-legacy', action='store_true', help='删除已被取代的旧索引')
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING)
+
+    database = Database()
+    try:
+        if args.drop_legacy:
+            dropped = database.drop_legacy_indexes()
+            print(f"dropped legacy indexes: {', '.join(dropped) or 'none'}\n")
+        legacy = database.legacy_indexes()
+        report = database.explain_query_shapes(limit=args.limit)
+    finally:
+        database.close()
+
+    sys.exit(print_report(report, legacy))
+
+
+if __name__ == "__main__":
+    main()
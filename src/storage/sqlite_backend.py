@@ -0,0 +1,353 @@
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+from .base import IMMUTABLE_FIELDS, StorageBackend, content_hash, field_hashes, merge_batch
+
+# 中日韩文字没有空格分词，连续的一段按二元组（bigram）切分后交给unicode61分词器
+CJK_RUN = re.compile(r'[\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uac00-\ud7af\uf900-\ufaff]+')
+# 参与全文检索的字段，与MongoDB文本索引相同
+FTS_FIELDS = ('title', 'summary', 'keywords')
+# bm25中各字段的权重，标题命中比摘要更相关
+FTS_WEIGHTS = (3.0, 1.0, 2.0)
+# 每条IN查询的最大参数个数
+IN_CHUNK = 500
+
+
+def ngram_text(text: str) -> str:
+    """把文本中的中日韩文字段落切成空格分隔的二元组，其余部分保持原样
+
+    "OpenAI发布新模型" -> "OpenAI 发布 布新 新模 模型"；单个字符的段落保留为一个词。
+    """
+    parts = []
+    pos = 0
+    for match in CJK_RUN.finditer(text):
+        run = match.group()
+        parts.append(text[pos:match.start()])
+        parts.append(run if len(run) == 1 else ' '.join(run[i:i + 2] for i in range(len(run) - 1)))
+        pos = match.end()
+    parts.append(text[pos:])
+    return ' '.join(parts)
+
+
+def build_match_query(keyword: str) -> Tuple[Optional[str], List[str]]:
+    """把搜索关键词转换为FTS5查询，返回 (MATCH表达式, 需要用LIKE匹配的词)
+
+    空格分隔的每个词都必须命中；每个词的二元组作为短语查询，保证文字连续出现。
+    单个汉字只有在文本中独立成段时才有词条，"A股市场"中的"股"只出现在"股市"里，
+    所以含单字段落的词（"股"、"A股"）整词用LIKE匹配，其余部分仍用全文索引缩小范围。
+    """
+    phrases = []
+    like_terms = []
+    for word in keyword.split():
+        if any(len(run) == 1 for run in CJK_RUN.findall(word)):
+            like_terms.append(word)
+            parts = CJK_RUN.sub(lambda m: ' ' if len(m.group()) == 1 else f" {m.group()} ", word).split()
+        else:
+            parts = [word]
+        for part in parts:
+            if re.search(r'\w', part):
+                phrases.append('"' + ngram_text(part).strip().replace('"', '""') + '"')
+    return (' '.join(phrases) or None), like_terms
+
+
+class SQLiteDatabase(StorageBackend):
+    """嵌入式SQLite新闻存储，单机部署不需要外部数据库
+
+    新闻整篇以JSON保存，常用的过滤和排序字段单独成列并建索引；标签在news_tags表中。
+    全文检索使用FTS5：中日韩文字先切成二元组再由unicode61分词，
+    两个字的常见词（如“芯片”）也能命中索引，不会像MongoDB文本索引那样漏掉中文匹配。
+    FTS表不保存原文（contentless），内容变化时用旧值删除索引条目再写入新值。
+    """
+
+    def __init__(self, db_path: str):
+        self.logger = logging.getLogger(__name__)
+        self.db_path = db_path
+        self.lock = threading.Lock()
+
+        os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        # BulkWriter在后台线程中写入，读写共用一个连接，由self.lock串行化
+        self.conn = sqlite3.connect(db_path, timeout=30, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS news (
+                id INTEGER PRIMARY KEY,
+                unique_id TEXT NOT NULL UNIQUE,
+                published TEXT,
+                source TEXT,
+                language TEXT,
+                text_processed INTEGER NOT NULL DEFAULT 0,
+                ai_processed INTEGER NOT NULL DEFAULT 0,
+                created_at TEXT,
+                updated_at TEXT,
+                field_hashes TEXT NOT NULL,
+                data TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_news_published ON news (published DESC);
+            CREATE INDEX IF NOT EXISTS idx_news_processed_published ON news (text_processed, published DESC);
+            CREATE INDEX IF NOT EXISTS idx_news_processed_language_published
+                ON news (text_processed, language, published DESC);
+            CREATE TABLE IF NOT EXISTS news_tags (
+                tag TEXT NOT NULL,
+                news_id INTEGER NOT NULL,
+                PRIMARY KEY (tag, news_id)
+            ) WITHOUT ROWID;
+            CREATE INDEX IF NOT EXISTS idx_news_tags_news ON news_tags (news_id);
+            CREATE VIRTUAL TABLE IF NOT EXISTS news_fts USING fts5(
+                title, summary, keywords, content='', tokenize='unicode61 remove_diacritics 2'
+            );
+        """)
+        self.conn.commit()
+
+    @staticmethod
+    def _fts_values(doc: Dict) -> List[str]:
+        values = []
+        for field in FTS_FIELDS:
+            value = doc.get(field) or ''
+            if isinstance(value, list):
+                value = ' '.join(str(item) for item in value)
+            values.append(ngram_text(str(value)))
+        return values
+
+    def upsert_batch(self, items: List[Dict]) -> Dict[str, int]:
+        """按unique_id批量upsert，在一个事务中完成，返回新增、更新、跳过的条数
+
+        与Database相同，按逐字段哈希跳过内容没有变化的新闻；只有标题、摘要、关键词变化时才重建全文索引条目。
+        """
+        counts = {'inserted': 0, 'modified': 0, 'skipped': 0}
+        merged = merge_batch(items)
+        if not merged:
+            return counts
+
+        now = datetime.now().isoformat()
+        with self.lock, self.conn:
+            stored = {}
+            keys = list(merged)
+            for start in range(0, len(keys), IN_CHUNK):
+                chunk = keys[start:start + IN_CHUNK]
+                rows = self.conn.execute(
+                    f"SELECT id, unique_id, field_hashes, data FROM news "
+                    f"WHERE unique_id IN ({','.join('?' * len(chunk))})",
+                    chunk
+                )
+                for row in rows:
+                    stored[row[1]] = row
+
+            for unique_id, item in merged.items():
+                hashes = field_hashes(item)
+                row = stored.get(unique_id)
+                old_hashes = None if row is None else json.loads(row[2])
+                changed = {key for key, value in hashes.items() if old_hashes is None or old_hashes.get(key) != value}
+                if not changed:
+                    counts['skipped'] += 1
+                    continue
+
+                old_doc = {} if row is None else json.loads(row[3])
+                doc = dict(old_doc, **item)
+                for key in IMMUTABLE_FIELDS:
+                    if key in old_doc:
+                        doc[key] = old_doc[key]
+                all_hashes = dict(old_hashes or {}, **hashes)
+                doc['content_hash'] = content_hash(all_hashes)
+                doc['updated_at'] = now
+                columns = (
+                    doc.get('published'), doc.get('source'), doc.get('language'),
+                    int(bool(doc.get('text_processed'))), int(bool(doc.get('ai_processed'))),
+                    doc.get('created_at'), now, json.dumps(all_hashes),
+                    json.dumps(doc, ensure_ascii=False, default=str)
+                )
+
+                fts_changed = row is None or not changed.isdisjoint(FTS_FIELDS)
+                if row is None:
+                    news_id = self.conn.execute(
+                        "INSERT INTO news (published, source, language, text_processed, ai_processed, "
+                        "created_at, updated_at, field_hashes, data, unique_id) "
+                        "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                        columns + (unique_id,)
+                    ).lastrowid
+                    counts['inserted'] += 1
+                else:
+                    news_id = row[0]
+                    self.conn.execute(
+                        "UPDATE news SET published = ?, source = ?, language = ?, text_processed = ?, "
+                        "ai_processed = ?, created_at = ?, updated_at = ?, field_hashes = ?, data = ? "
+                        "WHERE id = ?",
+                        columns + (news_id,)
+                    )
+                    counts['modified'] += 1
+                    if fts_changed:
+                        self.conn.execute(
+                            "INSERT INTO news_fts (news_fts, rowid, title, summary, keywords) "
+                            "VALUES ('delete', ?, ?, ?, ?)",
+                            [news_id] + self._fts_values(old_doc)
+                        )
+                    if 'tags' in changed:
+                        self.conn.execute("DELETE FROM news_tags WHERE news_id = ?", (news_id,))
+
+                if fts_changed:
+                    self.conn.execute(
+                        "INSERT INTO news_fts (rowid, title, summary, keywords) VALUES (?, ?, ?, ?)",
+                        [news_id] + self._fts_values(doc)
+                    )
+                if 'tags' in changed and doc.get('tags'):
+                    self.conn.executemany(
+                        "INSERT OR IGNORE INTO news_tags (tag, news_id) VALUES (?, ?)",
+                        [(tag, news_id) for tag in doc['tags']]
+                    )
+        return counts
+
+    def save_item(self, item: Dict) -> bool:
+        """保存单条新闻"""
+        try:
+            self.upsert_batch([item])
+            return True
+        except Exception as e:
+            self.logger.error(f"保存新闻时出错: {str(e)}")
+            return False
+
+    def save_batch(self, items: List[Dict]) -> int:
+        """批量保存新闻，返回新增和更新的条数"""
+        try:
+            if not items:
+                return 0
+
+            counts = self.upsert_batch(items)
+
+            self.logger.info(
+                f"批量保存完成: {counts['inserted']} 新增, {counts['modified']} 更新, {counts['skipped']} 未变化跳过"
+            )
+            return counts['inserted'] + counts['modified']
+
+        except Exception as e:
+            self.logger.error(f"批量保存时出错: {str(e)}")
+            return 0
+
+    @staticmethod
+    def _filters(tags: Optional[List[str]] = None,
+                 language: Optional[str] = None,
+                 processed_only: bool = False,
+                 alias: str = 'news') -> Tuple[List[str], List]:
+        conditions, params = [], []
+        if tags:
+            # 逐条按主键 (tag, news_id) 检查，不物化某个标签下的全部新闻
+            conditions.append(
+                f"EXISTS (SELECT 1 FROM news_tags WHERE tag IN ({','.join('?' * len(tags))}) "
+                f"AND news_id = {alias}.id)"
+            )
+            params.extend(tags)
+        if language:
+            conditions.append(f"{alias}.language = ?")
+            params.append(language)
+        if processed_only:
+            conditions.append(f"{alias}.text_processed = 1")
+        return conditions, params
+
+    def _select(self, sql: str, params: List) -> List[Dict]:
+        with self.lock:
+            rows = self.conn.execute(sql, params).fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    def get_latest_news(self,
+                        limit: int = 100,
+                        tags: Optional[List[str]] = None,
+                        language: Optional[str] = None,
+                        processed_only: bool = True
+                        ) -> List[Dict]:
+        """获取最新新闻"""
+        conditions, params = self._filters(tags, language, processed_only)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ''
+        return self._select(
+            f"SELECT data FROM news {where} ORDER BY published DESC LIMIT ?",
+            params + [limit]
+        )
+
+    def get_unprocessed_news(self,
+                             limit: int = 50,
+                             tags: Optional[List[str]] = None
+                             ) -> List[Dict]:
+        """获取未经处理的新闻"""
+        conditions, params = self._filters(tags)
+        conditions.append("news.text_processed = 0")
+        return self._select(
+            f"SELECT data FROM news WHERE {' AND '.join(conditions)} LIMIT ?",
+            params + [limit]
+        )
+
+    def search_news(self,
+                    keyword: str,
+                    start_date: Optional[str] = None,
+                    end_date: Optional[str] = None,
+                    tags: Optional[List[str]] = None,
+                    limit: int = 50
+                    ) -> List[Dict]:
+        """搜索新闻，按bm25相关度排序，结果中的score越大越相关"""
+        match, like_terms = build_match_query(keyword)
+        if match is None and not like_terms:
+            return []
+
+        conditions, params = self._filters(tags, alias='n')
+        if start_date:
+            conditions.append("n.published >= ?")
+            params.append(start_date)
+        if end_date:
+            conditions.append("n.published <= ?")
+            params.append(end_date)
+        for term in like_terms:
+            conditions.append(
+                "(json_extract(n.data, '$.title') LIKE ? OR json_extract(n.data, '$.summary') LIKE ?)"
+            )
+            params.extend([f'%{term}%', f'%{term}%'])
+
+        if match is None:
+            # 只有单字关键词时无法使用全文索引，按发布时间倒序扫描
+            where = ' AND '.join(conditions)
+            return self._select(
+                f"SELECT data FROM news AS n WHERE {where} ORDER BY n.published DESC LIMIT ?",
+                params + [limit]
+            )
+
+        # 先只用rowid和过滤列排出前limit条，再读取这些新闻的JSON，常见词命中上万条时不必逐条读取正文
+        bm25 = f"bm25(news_fts, {', '.join(map(str, FTS_WEIGHTS))})"
+        if conditions:
+            ranked = (
+                f"SELECT news_fts.rowid AS id, {bm25} AS rank FROM news_fts JOIN news AS n ON n.id = news_fts.rowid "
+                f"WHERE news_fts MATCH ? AND {' AND '.join(conditions)} ORDER BY rank LIMIT ?"
+            )
+        else:
+            ranked = f"SELECT rowid AS id, {bm25} AS rank FROM news_fts WHERE news_fts MATCH ? ORDER BY rank LIMIT ?"
+        sql = f"SELECT news.data, r.rank FROM ({ranked}) AS r JOIN news ON news.id = r.id ORDER BY r.rank"
+        with self.lock:
+            rows = self.conn.execute(sql, [match] + params + [limit]).fetchall()
+        return [dict(json.loads(data), score=-rank) for data, rank in rows]
+
+    def get_stats(self) -> Dict:
+        """获取数据统计信息，一次扫描得到全部计数"""
+        try:
+            yesterday = (datetime.now() - timedelta(days=1)).isoformat()
+            with self.lock:
+                total, processed, ai_processed, recent = self.conn.execute(
+                    "SELECT COUNT(*), TOTAL(text_processed), TOTAL(ai_processed), "
+                    "TOTAL(created_at >= ?) FROM news",
+                    (yesterday,)
+                ).fetchone()
+            return {
+                'total_news': total,
+                'processed_news': int(processed),
+                'ai_processed_news': int(ai_processed),
+                'recent_24h': int(recent),
+                'last_updated': datetime.now().isoformat()
+            }
+        except Exception as e:
+            self.logger.error(f"获取统计信息时出错: {str(e)}")
+            return {}
+
+    def close(self) -> None:
+        """关闭数据库连接"""
+        with self.lock:
+            self.conn.close()
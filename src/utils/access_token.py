@@ -0,0 +1,101 @@
+import asyncio
+import logging
+import time
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+
+
+class AccessTokenManager:
+    """异步访问令牌缓存
+
+    令牌缓存到过期前expiry_margin秒；在过期前refresh_ahead秒由后台任务主动刷新，
+    调用方通常直接拿到缓存的令牌。并发的刷新合并为同一个进行中的请求，
+    不会同时向令牌接口发起多次请求，也不会阻塞事件循环。
+
+    fetch() 返回 (令牌, 有效期秒数)，失败时返回 (None, 0) 或抛出异常。
+    """
+
+    def __init__(self, name: str, fetch: Callable[[], Awaitable[Tuple[Optional[str], float]]],
+                 refresh_ahead: float = 300.0, expiry_margin: float = 60.0, retry_interval: float = 10.0):
+        self.logger = logging.getLogger(__name__)
+        self.name = name
+        self.fetch = fetch
+        self.refresh_ahead = refresh_ahead
+        self.expiry_margin = expiry_margin
+        self.retry_interval = retry_interval
+
+        self.token: Optional[str] = None
+        self.expires_at = 0.0
+        self._refresh_task: Optional[asyncio.Task] = None
+        self._scheduled_task: Optional[asyncio.Task] = None
+
+        self.stats = {'hits': 0, 'waits': 0, 'fetches': 0, 'failures': 0}
+
+    def _is_valid(self) -> bool:
+        return self.token is not None and time.monotonic() < self.expires_at - self.expiry_margin
+
+    async def get(self) -> Optional[str]:
+        """获取有效令牌，缓存失效时等待（共享的）刷新请求"""
+        if self._is_valid():
+            self.stats['hits'] += 1
+            return self.token
+        self.stats['waits'] += 1
+        # shield: 调用方被取消时不影响其他等待同一刷新请求的调用方
+        return await asyncio.shield(self._refresh())
+
+    def invalidate(self) -> None:
+        """服务端判定令牌无效时丢弃缓存，下次获取时重新请求"""
+        self.token = None
+        self.expires_at = 0.0
+
+    def _refresh(self) -> asyncio.Task:
+        """返回进行中的刷新请求，没有时发起一个"""
+        if self._refresh_task is None or self._refresh_task.done():
+            self._refresh_task = asyncio.ensure_future(self._do_refresh())
+        return self._refresh_task
+
+    async def _do_refresh(self) -> Optional[str]:
+        try:
+            token, expires_in = await self.fetch()
+        except Exception as e:
+            self.logger.error(f"{self.name} 获取访问令牌出错: {str(e)}")
+            token, expires_in = None, 0
+
+        if not token:
+            self.stats['failures'] += 1
+            # 旧令牌仍然有效时继续使用，稍后在后台重试
+            if self._is_valid():
+                self._schedule(self.retry_interval)
+                return self.token
+            return None
+
+        self.stats['fetches'] += 1
+        self.token = token
+        self.expires_at = time.monotonic() + expires_in
+        self._schedule(max(0.0, expires_in - self.refresh_ahead))
+        self.logger.info(f"{self.name} 访问令牌已刷新，有效期 {expires_in}s")
+        return token
+
+    def _schedule(self, delay: float) -> None:
+        """安排后台主动刷新"""
+        if self._scheduled_task is not None and not self._scheduled_task.done():
+            self._scheduled_task.cancel()
+        self._scheduled_task = asyncio.ensure_future(self._refresh_later(delay))
+
+    async def _refresh_later(self, delay: float) -> None:
+        await asyncio.sleep(delay)
+        await asyncio.shield(self._refresh())
+
+    async def close(self) -> None:
+        """取消后台刷新任务"""
+        for task in (self._scheduled_task, self._refresh_task):
+            if task is not None and not task.done():
+                task.cancel()
+                try:
+                    await task
+                except asyncio.CancelledError:
+                    pass
+        self._scheduled_task = None
+        self._refresh_task = None
+
+    def get_stats(self) -> Dict:
+        return dict(self.stats, expires_in=max(0.0, self.expires_at - time.monotonic()) if self.token else None)
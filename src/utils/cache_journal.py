@@ -0,0 +1,160 @@
+import json
+import logging
+import os
+import shutil
+import threading
+import time
+from typing import Dict, Iterator
+
+JOURNAL_FORMAT = 'news-cache-journal'
+JOURNAL_VERSION = 1
+
+
+class CacheJournal:
+    """NewsCache的追加写日志
+
+    第一行是格式头 {"format": "news-cache-journal", "version": 1}，之后每行一条紧凑的JSON记录。
+    每条记录写入后立即flush到操作系统，每fsync_every条或每fsync_interval秒做一次fsync（组提交），
+    进程崩溃不丢数据，断电最多丢失最近一个批次。
+
+    压缩时把当前日志改名为 .compacting 并开始写新日志，快照写完后删除 .compacting；
+    启动时依次重放 .compacting 和当前日志，重复记录按幂等处理。
+    """
+
+    def __init__(self, path: str, fsync_every: int = 32, fsync_interval: float = 1.0):
+        self.logger = logging.getLogger(__name__)
+        self.path = path
+        self.compacting_path = f"{path}.compacting"
+        self.fsync_every = fsync_every
+        self.fsync_interval = fsync_interval
+        self.lock = threading.Lock()
+
+        self.file = None
+        self.unsynced = 0
+        self.last_sync = time.monotonic()
+
+    def _header(self) -> bytes:
+        return (json.dumps({'format': JOURNAL_FORMAT, 'version': JOURNAL_VERSION}) + '\n').encode('utf-8')
+
+    def _open(self) -> None:
+        """打开日志用于追加，新文件先写入格式头"""
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self._truncate_partial_record()
+        self.file = open(self.path, 'ab')
+        if self.file.tell() == 0:
+            self.file.write(self._header())
+            self.file.flush()
+            os.fsync(self.file.fileno())
+
+    def _truncate_partial_record(self) -> None:
+        """去掉崩溃时写了一半的最后一行，避免后续记录接在残缺行之后"""
+        try:
+            with open(self.path, 'r+b') as f:
+                size = f.seek(0, os.SEEK_END)
+                if size == 0:
+                    return
+                f.seek(size - 1)
+                if f.read(1) == b'\n':
+                    return
+                block = min(size, 64 * 1024)
+                f.seek(size - block)
+                end = f.read(block).rfind(b'\n')
+                f.truncate(size - block + end + 1 if end >= 0 else 0)
+                self.logger.warning(f"日志 {self.path} 末尾记录不完整，已截断")
+        except FileNotFoundError:
+            pass
+
+    def _replay_file(self, path: str) -> Iterator[Dict]:
+        with open(path, 'rb') as f:
+            header_line = f.readline()
+            if not header_line:
+                return
+            header = json.loads(header_line)
+            if header.get('format') != JOURNAL_FORMAT:
+                raise ValueError(f"{path} 不是NewsCache日志文件")
+            if header.get('version', 0) > JOURNAL_VERSION:
+                raise ValueError(f"{path} 日志版本 {header.get('version')} 高于支持的版本 {JOURNAL_VERSION}")
+
+            for line_no, line in enumerate(f, start=2):
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    # 只有最后一行可能因崩溃而写了一半，之后的内容不可信
+                    self.logger.warning(f"日志 {path} 第{line_no}行不完整，停止重放")
+                    return
+
+    def replay(self) -> Iterator[Dict]:
+        """按写入顺序返回日志中的全部记录"""
+        for path in (self.compacting_path, self.path):
+            if os.path.exists(path):
+                yield from self._replay_file(path)
+
+    def append(self, record: Dict) -> None:
+        """追加一条记录，按批次fsync"""
+        line = (json.dumps(record, ensure_ascii=False, separators=(',', ':')) + '\n').encode('utf-8')
+        with self.lock:
+            if self.file is None:
+                self._open()
+            self.file.write(line)
+            self.file.flush()
+            self.unsynced += 1
+            if self.unsynced >= self.fsync_every or time.monotonic() - self.last_sync >= self.fsync_interval:
+                self._sync()
+
+    def _sync(self) -> None:
+        if self.file is not None and self.unsynced:
+            os.fsync(self.file.fileno())
+        self.unsynced = 0
+        self.last_sync = time.monotonic()
+
+    def sync(self) -> None:
+        """立即fsync尚未落盘的记录"""
+        with self.lock:
+            self._sync()
+
+    def size(self) -> int:
+        """当前日志的字节数"""
+        with self.lock:
+            if self.file is not None:
+                return self.file.tell()
+        try:
+            return os.path.getsize(self.path)
+        except OSError:
+            return 0
+
+    def rotate(self) -> None:
+        """开始压缩：当前日志转为 .compacting，之后的记录写入新日志
+
+        上一次压缩未完成（.compacting仍存在）时，把当前日志的记录接到它后面。
+        """
+        with self.lock:
+            self._sync()
+            if self.file is not None:
+                self.file.close()
+                self.file = None
+            if not os.path.exists(self.path):
+                return
+
+            if os.path.exists(self.compacting_path):
+                with open(self.path, 'rb') as src, open(self.compacting_path, 'ab') as dst:
+                    src.readline()  # 跳过格式头
+                    shutil.copyfileobj(src, dst)
+                    dst.flush()
+                    os.fsync(dst.fileno())
+                os.remove(self.path)
+            else:
+                os.replace(self.path, self.compacting_path)
+
+    def finish_compaction(self) -> None:
+        """快照已包含 .compacting 中的全部记录，删除它"""
+        try:
+            os.remove(self.compacting_path)
+        except FileNotFoundError:
+            pass
+
+    def close(self) -> None:
+        with self.lock:
+            self._sync()
+            if self.file is not None:
+                self.file.close()
+                self.file = None
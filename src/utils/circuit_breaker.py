@@ -0,0 +1,139 @@
+import asyncio
+import logging
+import threading
+import time
+from typing import Callable, Dict, Optional
+
+
+class CircuitBreaker:
+    """服务商熔断器
+
+    closed: 正常放行；连续失败达到阈值后进入 open。
+    open: 直接拒绝请求。配置了probe时由后台任务定期探测，探测成功后恢复 closed；
+          没有后台探测时在recovery_timeout后进入 half_open。
+    half_open: 只放行一个试探请求，成功则恢复 closed，失败则重新 open。
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, name: str, failure_threshold: int = 3, recovery_timeout: float = 60.0,
+                 probe: Optional[Callable[[], bool]] = None, probe_interval: float = 30.0):
+        self.logger = logging.getLogger(__name__)
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.probe = probe
+        self.probe_interval = probe_interval
+        self.lock = threading.Lock()
+
+        self.state = self.CLOSED
+        self.state_since = time.monotonic()
+        self.opened_at = 0.0
+        self.consecutive_failures = 0
+        self.trial_in_flight = False
+        self.probe_task = None
+
+        self.stats = {'successes': 0, 'failures': 0, 'rejected': 0, 'trips': 0}
+        self.state_durations = {self.CLOSED: 0.0, self.OPEN: 0.0, self.HALF_OPEN: 0.0}
+
+    def _transition(self, state: str) -> None:
+        now = time.monotonic()
+        self.state_durations[self.state] += now - self.state_since
+        self.logger.info(f"熔断器 {self.name}: {self.state} -> {state}")
+        self.state = state
+        self.state_since = now
+
+    def is_available(self) -> bool:
+        """是否可能放行请求（不占用试探名额）"""
+        with self.lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.HALF_OPEN:
+                return not self.trial_in_flight
+            return not self._probing() and time.monotonic() - self.opened_at >= self.recovery_timeout
+
+    def allow_request(self) -> bool:
+        """判断是否放行请求，half_open状态下占用唯一的试探名额"""
+        with self.lock:
+            if self.state == self.OPEN and not self._probing() \
+                    and time.monotonic() - self.opened_at >= self.recovery_timeout:
+                self._transition(self.HALF_OPEN)
+
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.HALF_OPEN and not self.trial_in_flight:
+                self.trial_in_flight = True
+                return True
+
+            self.stats['rejected'] += 1
+            return False
+
+    def record_success(self) -> None:
+        with self.lock:
+            self.stats['successes'] += 1
+            self.consecutive_failures = 0
+            self.trial_in_flight = False
+            if self.state != self.CLOSED:
+                self._transition(self.CLOSED)
+
+    def record_failure(self) -> None:
+        with self.lock:
+            self.stats['failures'] += 1
+            self.consecutive_failures += 1
+            self.trial_in_flight = False
+            if self.state == self.HALF_OPEN or (
+                    self.state == self.CLOSED and self.consecutive_failures >= self.failure_threshold):
+                self.opened_at = time.monotonic()
+                self.stats['trips'] += 1
+                self._transition(self.OPEN)
+                self._start_probe()
+
+    def release(self) -> None:
+        """请求被取消、结果不计入统计时释放试探名额"""
+        with self.lock:
+            self.trial_in_flight = False
+
+    def _probing(self) -> bool:
+        return self.probe_task is not None and not self.probe_task.done()
+
+    def _start_probe(self) -> None:
+        """在事件循环中启动后台探测任务（调用方需持有锁）"""
+        if self.probe is None or self._probing():
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            # 不在事件循环中（如同步调用），退化为超时后半开试探
+            return
+        self.probe_task = loop.create_task(self._probe_until_recovered())
+
+    async def _probe_until_recovered(self) -> None:
+        """熔断期间定期探测服务商，探测成功后恢复"""
+        while self.state == self.OPEN:
+            await asyncio.sleep(self.probe_interval)
+            try:
+                healthy = await asyncio.to_thread(self.probe)
+            except Exception as e:
+                self.logger.warning(f"熔断器 {self.name} 探测出错: {str(e)}")
+                healthy = False
+            if healthy:
+                self.logger.info(f"熔断器 {self.name} 探测成功，服务已恢复")
+                with self.lock:
+                    self.consecutive_failures = 0
+                    if self.state == self.OPEN:
+                        self._transition(self.CLOSED)
+
+    def get_stats(self) -> Dict:
+        """获取熔断器状态、成功率和各状态累计时长"""
+        with self.lock:
+            durations = dict(self.state_durations)
+            durations[self.state] += time.monotonic() - self.state_since
+            total = self.stats['successes'] + self.stats['failures']
+            return dict(
+                self.stats,
+                state=self.state,
+                success_rate=self.stats['successes'] / total if total else None,
+                time_in_state=durations
+            )
@@ -0,0 +1,375 @@
+import math
+import struct
+from array import array
+from typing import BinaryIO, Dict, Iterator, List, Optional, Tuple
+
+DIGEST_SIZE = 16
+
+SNAPSHOT_MAGIC = b'NCDS'
+SNAPSHOT_VERSION = 3
+# 魔数、版本，之后两个字段在v1中为 (槽位数, 条目数)，v2起为 (分桶秒数, 桶数)
+SNAPSHOT_HEADER = struct.Struct('<4sH2xQQ')
+# v2起每个桶的头：桶编号、槽位数、条目数
+BUCKET_HEADER = struct.Struct('<qQQ')
+# v3在桶之后保存布隆过滤器：设计容量、位数（0表示没有）、哈希数、已添加条目数、误判率
+BLOOM_HEADER = struct.Struct('<QQQQd')
+
+
+class DigestSet:
+    """16字节二进制摘要的紧凑集合，带并行的时间戳数组
+
+    开放寻址（线性探测）哈希表：摘要连续存放在一个bytearray中，时间戳存放在并行的array('d')中，
+    时间戳为0表示空槽。每个槽位24字节，装载因子不超过0.75，每条约30~50字节，
+    而原来的 {hex摘要: {'title', 'source', 'timestamp'}} 每条需要数百字节。
+    """
+
+    MAX_LOAD = 0.75
+
+    def __init__(self, capacity: int = 1024):
+        slots = 8
+        while slots * self.MAX_LOAD < capacity:
+            slots *= 2
+        self._init_table(slots)
+
+    def _init_table(self, slots: int) -> None:
+        self.slots = slots
+        self.mask = slots - 1
+        self.keys = bytearray(slots * DIGEST_SIZE)
+        self.timestamps = array('d', bytes(slots * 8))
+        self.count = 0
+
+    def __len__(self) -> int:
+        return self.count
+
+    def _find(self, digest: bytes) -> int:
+        """返回摘要所在的槽位，不存在时返回应插入的空槽位"""
+        keys = self.keys
+        timestamps = self.timestamps
+        mask = self.mask
+        index = int.from_bytes(digest[:8], 'little') & mask
+        while True:
+            if timestamps[index] == 0.0:
+                return index
+            offset = index * DIGEST_SIZE
+            if keys[offset:offset + DIGEST_SIZE] == digest:
+                return index
+            index = (index + 1) & mask
+
+    def __contains__(self, digest: bytes) -> bool:
+        return self.timestamps[self._find(digest)] != 0.0
+
+    def get(self, digest: bytes) -> Optional[float]:
+        """返回摘要的时间戳，不存在时返回None"""
+        timestamp = self.timestamps[self._find(digest)]
+        return timestamp if timestamp != 0.0 else None
+
+    def add(self, digest: bytes, timestamp: float) -> bool:
+        """添加摘要，已存在时返回False（不更新时间戳）"""
+        if len(digest) != DIGEST_SIZE or timestamp <= 0:
+            raise ValueError("摘要必须为16字节，时间戳必须为正数")
+        index = self._find(digest)
+        if self.timestamps[index] != 0.0:
+            return False
+        if (self.count + 1) > self.slots * self.MAX_LOAD:
+            self._grow()
+            index = self._find(digest)
+        offset = index * DIGEST_SIZE
+        self.keys[offset:offset + DIGEST_SIZE] = digest
+        self.timestamps[index] = timestamp
+        self.count += 1
+        return True
+
+    def remove(self, digest: bytes) -> bool:
+        """删除摘要，不存在时返回False
+
+        线性探测不能直接清空槽位，否则会截断后面同一探测链上的条目；
+        清空后把链上可以前移的条目逐个移到空位（backward shift），不需要墓碑标记。
+        """
+        keys = self.keys
+        timestamps = self.timestamps
+        mask = self.mask
+        hole = self._find(digest)
+        if timestamps[hole] == 0.0:
+            return False
+        timestamps[hole] = 0.0
+        self.count -= 1
+        index = (hole + 1) & mask
+        while timestamps[index] != 0.0:
+            offset = index * DIGEST_SIZE
+            home = int.from_bytes(keys[offset:offset + 8], 'little') & mask
+            # 空位位于该条目的初始槽位和当前槽位之间时，前移后仍能沿探测链找到
+            if (index - home) & mask >= (index - hole) & mask:
+                keys[hole * DIGEST_SIZE:(hole + 1) * DIGEST_SIZE] = keys[offset:offset + DIGEST_SIZE]
+                timestamps[hole] = timestamps[index]
+                timestamps[index] = 0.0
+                hole = index
+            index = (index + 1) & mask
+        return True
+
+    def _grow(self) -> None:
+        old_items = list(self.items())
+        self._init_table(self.slots * 2)
+        for digest, timestamp in old_items:
+            index = self._find(digest)
+            offset = index * DIGEST_SIZE
+            self.keys[offset:offset + DIGEST_SIZE] = digest
+            self.timestamps[index] = timestamp
+        self.count = len(old_items)
+
+    def items(self) -> Iterator[Tuple[bytes, float]]:
+        keys = self.keys
+        for index, timestamp in enumerate(self.timestamps):
+            if timestamp != 0.0:
+                offset = index * DIGEST_SIZE
+                yield bytes(keys[offset:offset + DIGEST_SIZE]), timestamp
+
+    def copy(self) -> 'DigestSet':
+        clone = DigestSet.__new__(DigestSet)
+        clone.slots = self.slots
+        clone.mask = self.mask
+        clone.keys = bytearray(self.keys)
+        clone.timestamps = array('d', self.timestamps)
+        clone.count = self.count
+        return clone
+
+    @property
+    def nbytes(self) -> int:
+        """哈希表占用的内存字节数"""
+        return len(self.keys) + len(self.timestamps) * self.timestamps.itemsize
+
+    def write_table(self, f: BinaryIO) -> None:
+        """写出摘要区和时间戳区"""
+        f.write(self.keys)
+        f.write(self.timestamps.tobytes())
+
+    @classmethod
+    def read_table(cls, f: BinaryIO, slots: int, count: int) -> 'DigestSet':
+        digests = cls.__new__(cls)
+        digests.slots = slots
+        digests.mask = slots - 1
+        digests.keys = bytearray(slots * DIGEST_SIZE)
+        if f.readinto(digests.keys) != len(digests.keys):
+            raise ValueError("快照摘要区不完整")
+        digests.timestamps = array('d')
+        digests.timestamps.frombytes(f.read(slots * 8))
+        if len(digests.timestamps) != slots:
+            raise ValueError("快照时间戳区不完整")
+        digests.count = count
+        return digests
+
+
+class TimeBucketedDigestSet:
+    """按时间分桶的摘要集合
+
+    每个桶是一个DigestSet，保存bucket_seconds时间段内添加的摘要。过期时整桶丢弃，
+    无需扫描条目；查询依次检查各个桶，桶数只取决于保留天数和分桶粒度，与条目数无关。
+    """
+
+    def __init__(self, bucket_seconds: int = 86400):
+        self.bucket_seconds = bucket_seconds
+        self.buckets: Dict[int, DigestSet] = {}
+        self.newest_first: List[int] = []
+        self.count = 0
+
+    def __len__(self) -> int:
+        return self.count
+
+    def _reorder(self) -> None:
+        self.newest_first = sorted(self.buckets, reverse=True)
+
+    def _bucket_id(self, timestamp: float) -> int:
+        return int(timestamp // self.bucket_seconds)
+
+    def get(self, digest: bytes) -> Optional[float]:
+        """返回摘要的时间戳，不存在时返回None；从最新的桶开始查找"""
+        for bucket_id in self.newest_first:
+            timestamp = self.buckets[bucket_id].get(digest)
+            if timestamp is not None:
+                return timestamp
+        return None
+
+    def __contains__(self, digest: bytes) -> bool:
+        return self.get(digest) is not None
+
+    def add(self, digest: bytes, timestamp: float, expired_before: float = 0.0) -> bool:
+        """添加摘要，已存在时返回False
+
+        已存在但时间戳早于expired_before（已过期、所在的桶尚未丢弃）时从旧桶中删除后重新添加到当前桶，
+        每个摘要只保存一份，条目数不会重复计算。
+        """
+        for old_bucket_id in self.newest_first:
+            old_bucket = self.buckets[old_bucket_id]
+            existing = old_bucket.get(digest)
+            if existing is None:
+                continue
+            if existing > expired_before:
+                return False
+            old_bucket.remove(digest)
+            self.count -= 1
+            if not old_bucket:
+                del self.buckets[old_bucket_id]
+                self._reorder()
+            break
+        bucket_id = self._bucket_id(timestamp)
+        bucket = self.buckets.get(bucket_id)
+        if bucket is None:
+            bucket = self.buckets[bucket_id] = DigestSet()
+            self._reorder()
+        bucket.add(digest, timestamp)
+        self.count += 1
+        return True
+
+    def oldest_expiry(self) -> Optional[float]:
+        """最早的桶整体过期的时间点（桶的结束时间），没有桶时返回None"""
+        if not self.buckets:
+            return None
+        return (min(self.buckets) + 1) * self.bucket_seconds
+
+    def expire(self, cutoff: float) -> Dict[int, DigestSet]:
+        """丢弃所有条目都早于cutoff的桶，返回被丢弃的桶"""
+        dropped = {
+            bucket_id: bucket for bucket_id, bucket in self.buckets.items()
+            if (bucket_id + 1) * self.bucket_seconds <= cutoff
+        }
+        for bucket_id, bucket in dropped.items():
+            del self.buckets[bucket_id]
+            self.count -= len(bucket)
+        if dropped:
+            self._reorder()
+        return dropped
+
+    def items(self) -> Iterator[Tuple[bytes, float]]:
+        for bucket_id in sorted(self.buckets):
+            yield from self.buckets[bucket_id].items()
+
+    def copy(self) -> 'TimeBucketedDigestSet':
+        clone = TimeBucketedDigestSet(self.bucket_seconds)
+        clone.buckets = {bucket_id: bucket.copy() for bucket_id, bucket in self.buckets.items()}
+        clone.newest_first = list(self.newest_first)
+        clone.count = self.count
+        return clone
+
+    @property
+    def nbytes(self) -> int:
+        return sum(bucket.nbytes for bucket in self.buckets.values())
+
+    def write(self, f: BinaryIO) -> None:
+        """按版本化的二进制格式写出：文件头后依次是每个桶的头、摘要区和时间戳区"""
+        f.write(SNAPSHOT_HEADER.pack(SNAPSHOT_MAGIC, SNAPSHOT_VERSION, self.bucket_seconds, len(self.buckets)))
+        for bucket_id in sorted(self.buckets):
+            bucket = self.buckets[bucket_id]
+            f.write(BUCKET_HEADER.pack(bucket_id, bucket.slots, bucket.count))
+            bucket.write_table(f)
+
+    @staticmethod
+    def read_header(f: BinaryIO) -> Tuple[int, int, int]:
+        """读取并校验文件头，返回 (版本, 字段1, 字段2)"""
+        header = f.read(SNAPSHOT_HEADER.size)
+        if len(header) != SNAPSHOT_HEADER.size:
+            raise ValueError("快照文件头不完整")
+        magic, version, first, second = SNAPSHOT_HEADER.unpack(header)
+        if magic != SNAPSHOT_MAGIC:
+            raise ValueError("不是NewsCache快照文件")
+        if version > SNAPSHOT_VERSION:
+            raise ValueError(f"快照版本 {version} 高于支持的版本 {SNAPSHOT_VERSION}")
+        return version, first, second
+
+    @classmethod
+    def read(cls, f: BinaryIO, bucket_seconds: int = 86400) -> 'TimeBucketedDigestSet':
+        """读取快照；v1（不分桶）或分桶粒度与配置不同的快照按时间戳重新分桶"""
+        version, first, second = cls.read_header(f)
+        if version == 1:
+            tables = [DigestSet.read_table(f, first, second)]
+            file_bucket_seconds = None
+        else:
+            file_bucket_seconds = first
+            tables = []
+            for _ in range(second):
+                bucket_id, slots, count = BUCKET_HEADER.unpack(f.read(BUCKET_HEADER.size))
+                tables.append((bucket_id, DigestSet.read_table(f, slots, count)))
+
+        digests = cls(bucket_seconds)
+        if file_bucket_seconds == bucket_seconds:
+            for bucket_id, bucket in tables:
+                digests.buckets[bucket_id] = bucket
+                digests.count += len(bucket)
+            digests._reorder()
+        else:
+            for table in tables:
+                bucket = table[1] if isinstance(table, tuple) else table
+                for digest, timestamp in bucket.items():
+                    digests.add(digest, timestamp)
+        return digests
+
+
+class BloomFilter:
+    """布隆过滤器，用于在查询集合之前快速排除不存在的摘要
+
+    直接从16字节摘要中取两个64位整数做双重哈希，不需要额外计算哈希。
+    """
+
+    def __init__(self, capacity: int, error_rate: float = 0.01):
+        self.capacity = max(capacity, 1)
+        self.error_rate = error_rate
+        self.bits = max(8, int(-self.capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.bits / self.capacity * math.log(2)))
+        self.bitmap = bytearray((self.bits + 7) // 8)
+        self.count = 0
+
+    def _positions(self, digest: bytes) -> Iterator[int]:
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:16], 'little') | 1
+        for i in range(self.hashes):
+            yield (h1 + i * h2) % self.bits
+
+    def add(self, digest: bytes) -> None:
+        for position in self._positions(digest):
+            self.bitmap[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, digest: bytes) -> bool:
+        bitmap = self.bitmap
+        return all(bitmap[position >> 3] & (1 << (position & 7)) for position in self._positions(digest))
+
+    def copy(self) -> 'BloomFilter':
+        clone = BloomFilter.__new__(BloomFilter)
+        clone.__dict__.update(self.__dict__)
+        clone.bitmap = bytearray(self.bitmap)
+        return clone
+
+    def write(self, f: BinaryIO) -> None:
+        f.write(BLOOM_HEADER.pack(self.capacity, self.bits, self.hashes, self.count, self.error_rate))
+        f.write(self.bitmap)
+
+    @staticmethod
+    def write_empty(f: BinaryIO) -> None:
+        f.write(BLOOM_HEADER.pack(0, 0, 0, 0, 0.0))
+
+    @classmethod
+    def read(cls, f: BinaryIO) -> Optional['BloomFilter']:
+        """读取快照末尾的布隆过滤器，旧版快照或未保存时返回None"""
+        header = f.read(BLOOM_HEADER.size)
+        if len(header) != BLOOM_HEADER.size:
+            return None
+        capacity, bits, hashes, count, error_rate = BLOOM_HEADER.unpack(header)
+        if not bits:
+            return None
+        bloom = cls.__new__(cls)
+        bloom.capacity = capacity
+        bloom.error_rate = error_rate
+        bloom.bits = bits
+        bloom.hashes = hashes
+        bloom.count = count
+        bloom.bitmap = bytearray((bits + 7) // 8)
+        if f.readinto(bloom.bitmap) != len(bloom.bitmap):
+            raise ValueError("快照布隆过滤器不完整")
+        return bloom
+
+    @property
+    def full(self) -> bool:
+        """条目数超过设计容量后误判率上升，需要按更大容量重建"""
+        return self.count > self.capacity
+
+    @property
+    def nbytes(self) -> int:
+        return len(self.bitmap)
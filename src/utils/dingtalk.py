@@ -0,0 +1,68 @@
+import base64
+import hashlib
+import hmac
+import time
+import urllib.parse
+from src.utils.webhook import WebhookNotifier
+
+class DingTalkNotifier(WebhookNotifier):
+    """钉钉群机器人，配置了加签密钥时对每个请求做HMAC-SHA256签名"""
+    
+    name = 'dingtalk'
+    display_name = '钉钉'
+    
+    def __init__(self):
+        super().__init__()
+        webhook_url = self.config.WEBHOOK.get('dingtalk', '')
+        if not webhook_url.startswith('http'):
+            webhook_url = f"https://oapi.dingtalk.com/robot/send?access_token={self.config.DINGTALK['access_token']}"
+        self.webhook_url = webhook_url
+        self.secret = self.config.DINGTALK['secret']
+        
+    def _signed_url(self) -> str:
+        """加签：对 "毫秒时间戳\\n密钥" 做HMAC-SHA256，Base64后URL编码，签名1小时内有效"""
+        if not self.secret:
+            return self.webhook_url
+        timestamp = str(round(time.time() * 1000))
+        string_to_sign = f"{timestamp}\n{self.secret}"
+        digest = hmac.new(
+            self.secret.encode('utf-8'),
+            string_to_sign.encode('utf-8'),
+            digestmod=hashlib.sha256
+        ).digest()
+        sign = urllib.parse.quote_plus(base64.b64encode(digest))
+        return f"{self.webhook_url}&timestamp={timestamp}&sign={sign}"
+    
+    @staticmethod
+    def _title(content: str) -> str:
+        """会话列表中显示的标题，取消息第一行"""
+        first_line = content.strip().split('\n', 1)[0]
+        return first_line.lstrip('#').strip()[:64] or '科技新闻'
+        
+    async def send_message(self, content: str) -> bool:
+        """通过群机器人发送markdown消息"""
+        try:
+            data = {
+                "msgtype": "markdown",
+                "markdown": {
+                    "title": self._title(content),
+                    "text": content
+                }
+            }
+            
+            session = await self._get_session()
+            async with session.post(self._signed_url(), json=data) as response:
+                if response.status == 200:
+                    result = await response.json(content_type=None)
+                    if result.get("errcode") == 0:
+                        return True
+                    else:
+                        self.logger.error(f"钉钉发送消息失败: {result}")
+                else:
+                    self.logger.error(f"钉钉请求失败: {response.status}")
+                        
+            return False
+            
+        except Exception as e:
+            self.logger.error(f"钉钉发送消息时出错: {str(e)}")
+            return False
@@ -3,152 +3,171 @@ import hashlib
 import os
 import time
 import logging
+import threading
 from typing import Dict, List, Optional
 from datetime import datetime, timedelta
 from src.config import Config
+from src.utils.cache_journal import CacheJournal
+from src.utils.digest_set import BloomFilter, TimeBucketedDigestSet
+
+
+def news_digest(news: Dict) -> bytes:
+    """生成新闻的16字节二进制摘要"""
+    # 使用更多字段来确保唯一性
+    content = f"{news['title']}{news.get('link', '')}{news.get('source', '')}"
+    return hashlib.md5(content.encode('utf-8')).digest()
+
 
 class NewsCache:
-    def __init__(self, cache_file: str = 'news_cache.json', expire_days: int = 7):
-        # 首先初始化 logger
+    def __init__(self, cache_file: str = 'news_cache.json', expire_days: int = 7, cache_dir: Optional[str] = None):
         self.logger = logging.getLogger(__name__)
+        cache_config = Config.NEWS_CACHE
         
-        # 获取项目根目录的绝对路径
-        current_file = os.path.abspath(__file__)
-        project_root = os.path.dirname(os.path.dirname(os.path.dirname(current_file)))
-        self.logger.info(f"Project root: {project_root}")
-        
-        # 设置缓存文件路径
-        self.cache_file = os.path.join(project_root, "src", "data", cache_file)
-        self.logger.info(f"Cache file path: {self.cache_file}")
+        # 只使用配置的缓存目录；cache_file为旧版JSON缓存，仅在迁移时读取
+        self.cache_file = os.path.join(cache_dir or cache_config['dir'], cache_file)
+        base_path = os.path.splitext(self.cache_file)[0]
+        self.snapshot_file = f"{base_path}.bin"
+        self.titles_file = f"{base_path}.titles.json"
+        os.makedirs(os.path.dirname(self.cache_file), exist_ok=True)
         
-        # 检查所有可能的缓存位置
-        possible_locations = [
-            os.path.join(project_root, "src", "data", cache_file),  # 主要位置
-            os.path.join(os.getcwd(), "src", "data", cache_file),   # 当前工作目录
-        ]
-        
-        # 如果在外部SSD上运行，添加外部SSD路径
-        if '/Volumes/Extreme SSD' in project_root:
-            possible_locations.append("/Volumes/Extreme SSD/deploy/src/data/" + cache_file)
-            self.logger.info("Added external SSD location to search paths")
-        
-        # 查找现有缓存
-        existing_cache = None
-        max_items = 0
+        self.expire_days = expire_days
+        self.lock = threading.Lock()
+        self.compaction_thread = None
+        self.compact_bytes = cache_config['compact_bytes']
         
-        self.logger.info("=== Checking Cache Locations ===")
-        for loc in possible_locations:
-            self.logger.info(f"Checking location: {loc}")
-            if os.path.exists(loc):
-                try:
-                    with open(loc, 'r', encoding='utf-8') as f:
-                        data = json.load(f)
-                        if not isinstance(data, dict) or 'items' not in data:
-                            self.logger.warning(f"Invalid cache structure in {loc}")
-                            continue
-                            
-                        items_count = len(data.get('items', {}))
-                        self.logger.info(f"Found {items_count} items in {loc}")
-                        
-                        # 验证缓存项的格式
-                        is_valid = True
-                        for key, item in data['items'].items():
-                            if not isinstance(item, dict) or 'title' not in item or 'timestamp' not in item:
-                                self.logger.warning(f"Invalid cache item format: {key}")
-                                is_valid = False
-                                break
-                        
-                        if not is_valid:
-                            continue
-                            
-                        if items_count > max_items:
-                            existing_cache = data
-                            max_items = items_count
-                            self.logger.info(f"Found larger cache with {items_count} items")
-                            
-                except json.JSONDecodeError as e:
-                    self.logger.error(f"JSON decode error in {loc}: {str(e)}")
-                    backup_file = f"{loc}.backup"
-                    try:
-                        os.rename(loc, backup_file)
-                        self.logger.info(f"Renamed corrupted cache file to {backup_file}")
-                    except Exception as rename_error:
-                        self.logger.error(f"Failed to rename corrupted cache file: {str(rename_error)}")
-                except Exception as e:
-                    self.logger.error(f"Error reading cache from {loc}: {str(e)}")
+        # 可选的标题旁路存储（仅用于调试）和布隆过滤器（不存在的新闻大多无需查询摘要集合）
+        self.titles: Optional[Dict[bytes, str]] = {} if cache_config['keep_titles'] else None
+        self.bloom_error_rate = cache_config['bloom_error_rate']
+        self.bloom: Optional[BloomFilter] = None
         
-        # 如果找到了现有缓存，使用它
-        if existing_cache:
-            self.logger.info(f"Using existing cache with {max_items} items")
-            self.cache = existing_cache
+        # 二进制快照只校验文件头，摘要区和布隆过滤器按原始字节直接读入，不逐条解析
+        migrated = False
+        if os.path.exists(self.snapshot_file):
+            with open(self.snapshot_file, 'rb') as f:
+                self.digests = TimeBucketedDigestSet.read(f, cache_config['bucket_seconds'])
+                bloom = BloomFilter.read(f)
+            if bloom is not None and bloom.error_rate == self.bloom_error_rate:
+                self.bloom = bloom
+            if self.titles is not None and os.path.exists(self.titles_file):
+                with open(self.titles_file, 'r', encoding='utf-8') as f:
+                    self.titles = {bytes.fromhex(key): title for key, title in json.load(f).items()}
+            self.logger.info(f"Loaded {len(self.digests)} items from {self.snapshot_file}")
         else:
-            self.logger.info("Creating new cache")
-            self.cache = {
-                'items': {},
-                'last_cleanup': time.time(),
-                'version': '1.0'
-            }
+            self.digests = TimeBucketedDigestSet(cache_config['bucket_seconds'])
+            migrated = self._migrate_legacy_cache()
         
-        self.expire_days = expire_days
+        if self.bloom_error_rate and self.bloom is None:
+            self._rebuild_bloom()
         
-        # 确保缓存目录存在
-        cache_dir = os.path.dirname(self.cache_file)
-        os.makedirs(cache_dir, exist_ok=True)
+        # 追加写日志：每次添加只写一条记录，日志过大时在后台压缩为快照
+        self.journal = CacheJournal(
+            f"{base_path}.journal",
+            fsync_every=cache_config['fsync_every'],
+            fsync_interval=cache_config['fsync_interval']
+        )
+        self._replay_journal()
+        self.next_expiry = None
+        self._expire_buckets()
         
-        # 立即保存以验证写入权限
+        # 只有从旧版JSON迁移时才写快照，正常启动不重写任何文件
+        if migrated:
+            self.compact(wait=True)
+
+    def _migrate_legacy_cache(self) -> bool:
+        """将旧版JSON缓存（{'items': {hex摘要: {'title', 'timestamp', ...}}}）导入摘要集合"""
+        if not os.path.exists(self.cache_file):
+            return False
         try:
-            self._save_cache()
-            self.logger.info("Successfully initialized cache")
-        except Exception as e:
-            self.logger.error(f"Failed to save initial cache: {str(e)}")
-            raise
+            with open(self.cache_file, 'r', encoding='utf-8') as f:
+                items = json.load(f).get('items', {})
+        except (ValueError, OSError, AttributeError) as e:
+            self.logger.error(f"Failed to read legacy cache {self.cache_file}: {str(e)}")
+            return False
+        
+        for key, item in items.items():
+            digest = bytes.fromhex(key)
+            self.digests.add(digest, item['timestamp'])
+            if self.titles is not None:
+                self.titles[digest] = item.get('title', '')
+        self.logger.info(f"Migrated {len(items)} items from legacy cache {self.cache_file}")
+        return bool(items)
+
+    def _replay_journal(self) -> None:
+        """将日志中未过期的记录合并到快照加载的缓存中"""
+        expire_time = time.time() - self.expire_days * 86400
+        replayed = 0
+        for record in self.journal.replay():
+            if record['t'] > expire_time:
+                digest = bytes.fromhex(record['k'])
+                if self.digests.add(digest, record['t'], expired_before=expire_time) and self.bloom is not None:
+                    self.bloom.add(digest)
+                if self.titles is not None and 'title' in record:
+                    self.titles[digest] = record['title']
+                replayed += 1
+        if replayed:
+            self.logger.info(f"Replayed {replayed} journal records")
+
+    def _rebuild_bloom(self) -> None:
+        """按当前条目数的两倍容量重建布隆过滤器"""
+        bloom = BloomFilter(max(1024, len(self.digests) * 2), self.bloom_error_rate)
+        for digest, _ in self.digests.items():
+            bloom.add(digest)
+        self.bloom = bloom
 
-    def _save_cache(self):
-        """保存缓存到文件"""
+    def _save_cache(self, digests: Optional[TimeBucketedDigestSet] = None, titles: Optional[Dict[bytes, str]] = None,
+                    bloom: Optional[BloomFilter] = None):
+        """保存二进制缓存快照到文件，digests为空时保存当前缓存"""
+        if digests is None:
+            digests = self.digests
+            titles = self.titles
+            bloom = self.bloom
         try:
             self.logger.info(f"=== Saving Cache ===")
-            self.logger.info(f"Target file: {self.cache_file}")
+            self.logger.info(f"Target file: {self.snapshot_file}")
             
-            # 验证缓存数据完整性
-            if not isinstance(self.cache, dict) or 'items' not in self.cache:
-                raise ValueError("Invalid cache structure")
-            
-            items_count = len(self.cache['items'])
+            items_count = len(digests)
             self.logger.info(f"Items count: {items_count}")
             
             # 创建临时文件
-            temp_file = f"{self.cache_file}.tmp"
+            temp_file = f"{self.snapshot_file}.tmp"
             self.logger.info(f"Writing to temp file: {temp_file}")
             
             # 确保目标目录存在
-            os.makedirs(os.path.dirname(self.cache_file), exist_ok=True)
+            os.makedirs(os.path.dirname(self.snapshot_file), exist_ok=True)
             
             # 写入临时文件
-            with open(temp_file, 'w', encoding='utf-8') as f:
-                json_str = json.dumps(self.cache, ensure_ascii=False, indent=2)
-                f.write(json_str)
+            with open(temp_file, 'wb') as f:
+                digests.write(f)
+                if bloom is not None:
+                    bloom.write(f)
+                else:
+                    BloomFilter.write_empty(f)
                 f.flush()
                 os.fsync(f.fileno())
             
-            # 验证临时文件
-            with open(temp_file, 'r', encoding='utf-8') as f:
-                temp_data = json.loads(f.read())
-                if not isinstance(temp_data, dict) or 'items' not in temp_data:
-                    raise ValueError("Verification failed: invalid data structure in temp file")
-                if len(temp_data['items']) != items_count:
-                    raise ValueError(f"Verification failed: temp file has {len(temp_data['items'])} items, memory has {items_count} items")
+            # 验证临时文件头
+            with open(temp_file, 'rb') as f:
+                _, _, temp_buckets = TimeBucketedDigestSet.read_header(f)
+                if temp_buckets != len(digests.buckets):
+                    raise ValueError(f"Verification failed: temp file has {temp_buckets} buckets, memory has {len(digests.buckets)} buckets")
             
             # 如果原文件存在，创建备份
-            if os.path.exists(self.cache_file):
-                backup_file = f"{self.cache_file}.bak"
+            if os.path.exists(self.snapshot_file):
+                backup_file = f"{self.snapshot_file}.bak"
                 try:
-                    os.replace(self.cache_file, backup_file)
+                    os.replace(self.snapshot_file, backup_file)
                     self.logger.info(f"Created backup: {backup_file}")
                 except Exception as e:
                     self.logger.warning(f"Failed to create backup: {str(e)}")
             
             # 原子性地替换文件
-            os.replace(temp_file, self.cache_file)
+            os.replace(temp_file, self.snapshot_file)
+            
+            # 标题旁路存储，仅用于调试
+            if titles is not None:
+                with open(f"{self.titles_file}.tmp", 'w', encoding='utf-8') as f:
+                    json.dump({digest.hex(): title for digest, title in titles.items()}, f, ensure_ascii=False)
+                os.replace(f"{self.titles_file}.tmp", self.titles_file)
             self.logger.info("=== Cache Saved Successfully ===")
             
         except Exception as e:
@@ -161,56 +180,100 @@ class NewsCache:
                     self.logger.error(f"Failed to clean up temp file: {str(cleanup_error)}")
             raise
 
+    def _generate_digest(self, news: Dict) -> bytes:
+        """生成新闻的16字节二进制摘要"""
+        return news_digest(news)
+
     def _generate_hash(self, news: Dict) -> str:
         """生成新闻的唯一标识"""
-        # 使用更多字段来确保唯一性
-        content = f"{news['title']}{news.get('link', '')}{news.get('source', '')}"
-        return hashlib.md5(content.encode('utf-8')).hexdigest()
+        return self._generate_digest(news).hex()
         
-    def _cleanup_expired(self):
-        """清理过期缓存"""
+    def _expire_buckets(self) -> None:
+        """整桶丢弃过期条目；只在最早的桶到期后才做实际工作，平时只比较一次时间"""
         now = time.time()
-        # 每天只清理一次
-        if now - self.cache['last_cleanup'] < 86400:  # 24小时
+        if self.next_expiry is not None and now < self.next_expiry:
             return
-            
-        expire_time = now - (self.expire_days * 86400)  # 7天前
-        original_count = len(self.cache['items'])
-        self.cache['items'] = {
-            k: v for k, v in self.cache['items'].items()
-            if v['timestamp'] > expire_time
-        }
-        new_count = len(self.cache['items'])
-        if new_count != original_count:
-            self.logger.info(f"Cleaned up {original_count - new_count} expired items")
-        
-        self.cache['last_cleanup'] = now
-        self._save_cache()
+        
+        expire_time = now - (self.expire_days * 86400)
+        with self.lock:
+            dropped = self.digests.expire(expire_time)
+            if self.titles is not None:
+                for bucket in dropped.values():
+                    for digest, _ in bucket.items():
+                        self.titles.pop(digest, None)
+            oldest_expiry = self.digests.oldest_expiry()
+            self.next_expiry = oldest_expiry + self.expire_days * 86400 if oldest_expiry is not None else None
+        
+        expired_count = sum(len(bucket) for bucket in dropped.values())
+        if expired_count:
+            # 布隆过滤器中残留的位只会造成误判，随后在桶中查询时排除
+            self.logger.info(f"Expired {expired_count} items in {len(dropped)} buckets")
+    
+    def compact(self, wait: bool = False) -> None:
+        """将当前缓存写为快照并清空日志，默认在后台线程中进行"""
+        with self.lock:
+            if self.compaction_thread is None or not self.compaction_thread.is_alive():
+                digests = self.digests.copy()
+                titles = dict(self.titles) if self.titles is not None else None
+                bloom = self.bloom.copy() if self.bloom is not None else None
+                self.journal.rotate()
+                self.compaction_thread = threading.Thread(
+                    target=self._write_snapshot, args=(digests, titles, bloom), daemon=True
+                )
+                self.compaction_thread.start()
+            thread = self.compaction_thread
+        if wait:
+            thread.join()
+    
+    def _write_snapshot(self, digests: TimeBucketedDigestSet, titles: Optional[Dict[bytes, str]],
+                        bloom: Optional[BloomFilter]) -> None:
+        try:
+            self._save_cache(digests, titles, bloom)
+            self.journal.finish_compaction()
+        except Exception as e:
+            # 日志保留在 .compacting 中，下次压缩或启动时重放
+            self.logger.error(f"Cache compaction failed: {str(e)}")
+    
+    def close(self) -> None:
+        """等待进行中的压缩完成，并将日志落盘"""
+        thread = self.compaction_thread
+        if thread is not None:
+            thread.join()
+        self.journal.close()
         
     def add_news(self, news: Dict):
         """添加新闻到缓存"""
         try:
-            news_hash = self._generate_hash(news)
-            self.logger.debug(f"Generated hash for news: {news_hash}")
+            digest = self._generate_digest(news)
+            self.logger.debug(f"Generated hash for news: {digest.hex()}")
             
-            if news_hash not in self.cache['items']:
-                self.logger.info(f"Adding new news to cache: {news['title']} (hash: {news_hash})")
-                self.cache['items'][news_hash] = {
-                    'title': news['title'],
-                    'source': news.get('source', ''),
-                    'timestamp': time.time()
-                }
+            self._expire_buckets()
+            with self.lock:
+                timestamp = time.time()
+                is_new = self.digests.add(digest, timestamp, expired_before=timestamp - self.expire_days * 86400)
+                if is_new:
+                    if self.bloom is not None:
+                        self.bloom.add(digest)
+                        if self.bloom.full:
+                            self._rebuild_bloom()
+                    if self.titles is not None:
+                        self.titles[digest] = news['title']
+                    if self.next_expiry is None:
+                        self.next_expiry = self.digests.oldest_expiry() + self.expire_days * 86400
+            
+            if is_new:
+                self.logger.info(f"Adding new news to cache: {news['title']} (hash: {digest.hex()})")
                 
-                # 立即保存到文件
-                try:
-                    self._save_cache()
-                    self.logger.info("Cache saved successfully")
-                except Exception as save_error:
-                    self.logger.error("Failed to save cache!", exc_info=True)
-                    raise  # 重新抛出异常
+                # 追加一条日志记录，日志过大时后台压缩
+                record = {'k': digest.hex(), 't': timestamp}
+                if self.titles is not None:
+                    record['title'] = news['title']
+                self.journal.append(record)
+                if self.journal.size() >= self.compact_bytes:
+                    self.compact()
                 
             else:
-                self.logger.debug(f"News already in cache: {news['title']} (hash: {news_hash})")
+                self.logger.debug(f"News already in cache: {news['title']} (hash: {digest.hex()})")
             
         except Exception as e:
             self.logger.error(f"Error adding news to cache: {str(e)}", exc_info=True)
@@ -219,16 +282,26 @@ class NewsCache:
     def is_exists(self, news: Dict) -> bool:
         """检查新闻是否已存在"""
         try:
-            news_hash = self._generate_hash(news)
-            exists = news_hash in self.cache['items']
+            self._expire_buckets()
+            digest = self._generate_digest(news)
+            if self.bloom is not None and digest not in self.bloom:
+                return False
+            # 桶内按条目时间戳判断，未到整桶丢弃时间的过期条目同样视为不存在
+            timestamp = self.digests.get(digest)
+            exists = timestamp is not None and timestamp > time.time() - self.expire_days * 86400
             if exists:
-                cached_item = self.cache['items'][news_hash]
                 self.logger.debug(f"Found news in cache: {news['title']}")
-                self.logger.debug(f"Cached item: {cached_item}")
             return exists
         except Exception as e:
             self.logger.error(f"Error checking news existence: {str(e)}", exc_info=True)
             return False
+    
+    def release(self, news: Dict) -> None:
+        """放弃推送一条已选中的新闻；单进程缓存不做认领，无需处理"""
+        
+    def refresh_claims(self, news_list: List[Dict]) -> int:
+        """延长新闻的认领；单进程缓存不做认领，无需处理"""
+        return 0
         
     def filter_and_sort_news(self, news_list: List[Dict], limit: int = 15) -> List[Dict]:
         """过滤未推送的新闻并按评分排序"""
@@ -0,0 +1,199 @@
+import json
+import logging
+import os
+import sqlite3
+import time
+import uuid
+from typing import Dict, List, Optional, Set
+
+
+class Outbox:
+    """持久化的待发送消息队列（SQLite）
+
+    格式化好的消息先写入发件箱，由发送方按渠道限速取出发送；发送失败按指数退避重试，
+    重试计划保存在数据库中，重启后继续。每条消息记录它包含的新闻，确认送达后才写入缓存。
+
+    多个进程可以共用同一个发件箱文件：due() 以一条UPDATE原子地租用到期消息（status=sending），
+    同一条消息同一时间只会被一个进程发送；租用者在lease秒内没有标记结果时，其他进程可以重新租用。
+    """
+
+    PENDING = 'pending'
+    SENDING = 'sending'
+    SENT = 'sent'
+    DEAD = 'dead'
+
+    def __init__(self, db_path: str, max_attempts: int = 8,
+                 base_backoff: float = 30.0, max_backoff: float = 3600.0,
+                 lease: float = 600.0, owner: Optional[str] = None):
+        self.logger = logging.getLogger(__name__)
+        self.db_path = db_path
+        self.max_attempts = max_attempts
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self.lease = lease
+        self.owner = owner or f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+
+        os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        self.conn = sqlite3.connect(db_path, timeout=30)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS outbox (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                channel TEXT NOT NULL,
+                content TEXT NOT NULL,
+                items TEXT NOT NULL,
+                status TEXT NOT NULL DEFAULT 'pending',
+                attempts INTEGER NOT NULL DEFAULT 0,
+                next_attempt_at REAL NOT NULL,
+                created_at REAL NOT NULL,
+                sent_at REAL,
+                last_error TEXT,
+                owner TEXT,
+                lease_until REAL
+            );
+            CREATE INDEX IF NOT EXISTS idx_outbox_due ON outbox (status, channel, next_attempt_at);
+            CREATE TABLE IF NOT EXISTS outbox_items (
+                message_id INTEGER NOT NULL,
+                item_key TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_outbox_items_key ON outbox_items (item_key);
+        """)
+        # 旧版发件箱没有租用字段
+        columns = {row['name'] for row in self.conn.execute("PRAGMA table_info(outbox)")}
+        for column, column_type in (('owner', 'TEXT'), ('lease_until', 'REAL')):
+            if column not in columns:
+                self.conn.execute(f"ALTER TABLE outbox ADD COLUMN {column} {column_type}")
+        self.conn.commit()
+
+    def enqueue(self, channel: str, content: str, items: List[Dict], item_keys: List[str]) -> int:
+        """写入一条待发送消息，返回消息ID"""
+        now = time.time()
+        with self.conn:
+            cursor = self.conn.execute(
+                "INSERT INTO outbox (channel, content, items, next_attempt_at, created_at) VALUES (?, ?, ?, ?, ?)",
+                (channel, content, json.dumps(items, ensure_ascii=False), now, now)
+            )
+            message_id = cursor.lastrowid
+            self.conn.executemany(
+                "INSERT INTO outbox_items (message_id, item_key) VALUES (?, ?)",
+                [(message_id, key) for key in item_keys]
+            )
+        return message_id
+
+    def due(self, channel: str, limit: int = 20) -> List[Dict]:
+        """租用已到发送时间的消息（包括租用已过期的），按写入顺序排列
+
+        选取和租用在同一条UPDATE中完成，多个进程同时调用时每条消息只会返回给其中一个。
+        """
+        now = time.time()
+        with self.conn:
+            rows = self.conn.execute(
+                "UPDATE outbox SET status = ?, owner = ?, lease_until = ? WHERE id IN ("
+                "SELECT id FROM outbox WHERE channel = ? AND ("
+                "(status = ? AND next_attempt_at <= ?) OR (status = ? AND lease_until < ?)"
+                ") ORDER BY id LIMIT ?"
+                ") RETURNING id, content, items, attempts",
+                (self.SENDING, self.owner, now + self.lease,
+                 channel, self.PENDING, now, self.SENDING, now, limit)
+            ).fetchall()
+        return sorted(
+            (
+                {'id': row['id'], 'content': row['content'], 'items': json.loads(row['items']),
+                 'attempts': row['attempts']}
+                for row in rows
+            ),
+            key=lambda entry: entry['id']
+        )
+
+    def next_due_in(self, channel: str) -> Optional[float]:
+        """距离下一条待发送消息到期（或其他进程的租用过期）还有多少秒，没有待发送消息时返回None"""
+        row = self.conn.execute(
+            "SELECT MIN(CASE WHEN status = ? THEN next_attempt_at ELSE lease_until END) FROM outbox "
+            "WHERE status IN (?, ?) AND channel = ?",
+            (self.PENDING, self.PENDING, self.SENDING, channel)
+        ).fetchone()
+        if row[0] is None:
+            return None
+        return max(0.0, row[0] - time.time())
+
+    def mark_sent(self, message_id: int) -> None:
+        with self.conn:
+            self.conn.execute(
+                "UPDATE outbox SET status = ?, sent_at = ?, lease_until = NULL WHERE id = ?",
+                (self.SENT, time.time(), message_id)
+            )
+
+    def mark_failed(self, message_id: int, error: str = '') -> None:
+        """记录一次发送失败，按指数退避安排重试，超过最大次数后不再重试
+
+        租用已过期并被其他进程重新租用的消息不做修改，由新的租用者记录结果。
+        """
+        row = self.conn.execute(
+            "SELECT attempts FROM outbox WHERE id = ? AND status = ? AND owner = ?",
+            (message_id, self.SENDING, self.owner)
+        ).fetchone()
+        if row is None:
+            return
+        attempts = row['attempts'] + 1
+        if attempts >= self.max_attempts:
+            status = self.DEAD
+            self.logger.error(f"消息 {message_id} 已重试 {attempts} 次，放弃发送: {error}")
+        else:
+            status = self.PENDING
+        backoff = min(self.max_backoff, self.base_backoff * 2 ** (attempts - 1))
+        with self.conn:
+            self.conn.execute(
+                "UPDATE outbox SET status = ?, attempts = ?, next_attempt_at = ?, last_error = ?, lease_until = NULL "
+                "WHERE id = ? AND owner = ?",
+                (status, attempts, time.time() + backoff, error, message_id, self.owner)
+            )
+
+    def pending_keys(self) -> Set[str]:
+        """仍在发件箱中等待发送的新闻标识，这些新闻不需要重新分析"""
+        rows = self.conn.execute(
+            "SELECT item_key FROM outbox_items JOIN outbox ON outbox.id = outbox_items.message_id "
+            "WHERE outbox.status IN (?, ?)",
+            (self.PENDING, self.SENDING)
+        ).fetchall()
+        return {row['item_key'] for row in rows}
+
+    def pending_items(self) -> List[Dict]:
+        """仍在发件箱中等待发送的新闻（标题、链接、来源），用于延长它们在共享去重存储中的认领"""
+        rows = self.conn.execute(
+            "SELECT items FROM outbox WHERE status IN (?, ?)",
+            (self.PENDING, self.SENDING)
+        ).fetchall()
+        return [news for row in rows for news in json.loads(row['items'])]
+
+    def purge(self, older_than_days: float = 7) -> int:
+        """清理早已发送或放弃的消息"""
+        cutoff = time.time() - older_than_days * 86400
+        with self.conn:
+            self.conn.execute(
+                "DELETE FROM outbox_items WHERE message_id IN "
+                "(SELECT id FROM outbox WHERE status IN (?, ?) AND created_at < ?)",
+                (self.SENT, self.DEAD, cutoff)
+            )
+            cursor = self.conn.execute(
+                "DELETE FROM outbox WHERE status IN (?, ?) AND created_at < ?",
+                (self.SENT, self.DEAD, cutoff)
+            )
+        return cursor.rowcount
+
+    def get_stats(self) -> Dict[str, int]:
+        rows = self.conn.execute("SELECT status, COUNT(*) FROM outbox GROUP BY status").fetchall()
+        return {row[0]: row[1] for row in rows}
+
+    def close(self) -> None:
+        """归还本进程尚未发送完的租用，重启后或其他进程可以立即发送"""
+        try:
+            with self.conn:
+                self.conn.execute(
+                    "UPDATE outbox SET status = ?, lease_until = NULL WHERE status = ? AND owner = ?",
+                    (self.PENDING, self.SENDING, self.owner)
+                )
+        except sqlite3.Error as e:
+            self.logger.warning(f"归还发件箱租用出错: {str(e)}")
+        self.conn.close()
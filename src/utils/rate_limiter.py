@@ -0,0 +1,147 @@
+import logging
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from typing import Dict, Optional
+from src.config import Config
+
+
+class TokenBucket:
+    """令牌桶：容量为capacity，每秒补充rate个令牌"""
+
+    def __init__(self, capacity: float, rate: float):
+        self.capacity = capacity
+        self.rate = rate
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount: float, now: float) -> float:
+        """获取amount个令牌还需等待的秒数"""
+        self._refill(now)
+        amount = min(amount, self.capacity)  # 超过容量的请求按满桶处理，避免永远等待
+        if self.tokens >= amount:
+            return 0.0
+        return (amount - self.tokens) / self.rate
+
+    def consume(self, amount: float) -> None:
+        self.tokens -= min(amount, self.capacity)
+
+    def drain(self) -> None:
+        self.tokens = min(self.tokens, 0)
+
+
+class RateLimiter:
+    """按服务商和模型的RPM/TPM限流，线程安全
+
+    请求先在本地排队等待令牌，收到429时根据Retry-After暂停整个服务商的发送。
+    """
+
+    def __init__(self, name: str, rpm: int, tpm: Optional[int] = None,
+                 burst: Optional[int] = None, max_wait: float = 120.0):
+        self.logger = logging.getLogger(__name__)
+        self.name = name
+        self.max_wait = max_wait
+        self.lock = threading.Lock()
+
+        # burst限制单个时刻最多可突发的请求数，默认允许一分钟的额度
+        request_capacity = burst or rpm
+        self.requests = TokenBucket(request_capacity, rpm / 60)
+        self.tokens = TokenBucket(tpm * request_capacity / rpm, tpm / 60) if tpm else None
+        self.blocked_until = 0.0
+
+        self.stats = {'acquired': 0, 'throttled': 0, 'rejected': 0, 'wait_time': 0.0}
+
+    def acquire(self, tokens: int = 0, cancel_event: Optional[threading.Event] = None) -> bool:
+        """等待发送许可，超过max_wait或被取消时返回False"""
+        start_time = time.monotonic()
+        deadline = start_time + self.max_wait
+
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                wait = max(
+                    self.blocked_until - now,
+                    self.requests.wait_time(1, now),
+                    self.tokens.wait_time(tokens, now) if self.tokens else 0.0
+                )
+                if wait <= 0:
+                    self.requests.consume(1)
+                    if self.tokens:
+                        self.tokens.consume(tokens)
+                    self.stats['acquired'] += 1
+                    self.stats['wait_time'] += now - start_time
+                    return True
+
+            if now + wait > deadline:
+                self.stats['rejected'] += 1
+                self.logger.error(f"{self.name} 限流排队超过 {self.max_wait}s，放弃请求")
+                return False
+
+            # 分段等待，以便及时响应取消
+            if cancel_event is not None:
+                if cancel_event.wait(min(wait, 1.0)):
+                    return False
+            else:
+                time.sleep(min(wait, 1.0))
+
+    def settle(self, reserved: int, actual: int) -> None:
+        """按实际token用量修正预留的TPM额度"""
+        if not self.tokens:
+            return
+        with self.lock:
+            self.tokens._refill(time.monotonic())
+            self.tokens.tokens = min(self.tokens.capacity, self.tokens.tokens + reserved - actual)
+
+    def penalize(self, retry_after: float) -> None:
+        """收到429后暂停发送retry_after秒"""
+        with self.lock:
+            self.blocked_until = max(self.blocked_until, time.monotonic() + retry_after)
+            self.requests.drain()
+            self.stats['throttled'] += 1
+        self.logger.warning(f"{self.name} 触发服务端限流，{retry_after:.1f}秒后重试")
+
+
+def parse_retry_after(value: Optional[str], default: float) -> float:
+    """解析Retry-After头，支持秒数和HTTP日期两种格式"""
+    if not value:
+        return default
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return default
+
+
+_limiters: Dict[str, RateLimiter] = {}
+_limiters_lock = threading.Lock()
+
+
+def get_rate_limiter(provider: str, model: str = 'default') -> Optional[RateLimiter]:
+    """获取服务商/模型对应的共享限流器，未启用限流时返回None"""
+    config = Config.RATE_LIMITS
+    if not config['enabled']:
+        return None
+
+    provider_limits = config['providers'].get(provider, {})
+    limits = provider_limits.get(model) or provider_limits.get('default')
+    if not limits:
+        return None
+
+    key = f"{provider}:{model}"
+    with _limiters_lock:
+        if key not in _limiters:
+            _limiters[key] = RateLimiter(
+                key,
+                rpm=limits['rpm'],
+                tpm=limits.get('tpm'),
+                burst=limits.get('burst'),
+                max_wait=config['max_wait']
+            )
+        return _limiters[key]
@@ -0,0 +1,141 @@
+import logging
+import os
+import sqlite3
+import time
+import uuid
+from typing import Dict, List, Optional
+from src.utils.news_cache import news_digest
+
+
+class SharedNewsCache:
+    """多进程共享的推送去重存储（SQLite WAL）
+
+    与NewsCache接口相同，可供同一台机器上的多个调度进程或按来源拆分的worker共同使用。
+    filter_and_sort_news 在选出新闻的同时原子地认领它们：同一条新闻只会被一个进程认领，
+    只有认领者会分析和推送。推送成功后 add_news 将认领转为已推送；
+    认领者放弃（release）或在claim_ttl内没有完成时，其他进程可以重新认领。
+    """
+
+    CLAIMED = 'claimed'
+    SENT = 'sent'
+
+    def __init__(self, db_path: str, expire_days: int = 7, claim_ttl: float = 3600.0,
+                 owner: Optional[str] = None):
+        self.logger = logging.getLogger(__name__)
+        self.db_path = db_path
+        self.expire_days = expire_days
+        self.claim_ttl = claim_ttl
+        self.owner = owner or f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self.last_purge = 0.0
+
+        os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        # 自动提交模式：每条语句单独成为一个事务，写锁只在语句执行期间持有
+        self.conn = sqlite3.connect(db_path, timeout=30, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS news (
+                digest BLOB PRIMARY KEY,
+                status TEXT NOT NULL,
+                owner TEXT,
+                updated_at REAL NOT NULL,
+                title TEXT
+            ) WITHOUT ROWID
+        """)
+
+    def _cutoffs(self, now: float):
+        """返回 (已推送记录的过期时间点, 认领的失效时间点)"""
+        return now - self.expire_days * 86400, now - self.claim_ttl
+
+    def claim(self, news: Dict) -> bool:
+        """原子地认领一条新闻，只有一个进程能认领成功
+
+        没有记录、认领已失效或推送记录已过期时认领成功；本进程已持有的认领也返回True。
+        """
+        now = time.time()
+        sent_cutoff, claim_cutoff = self._cutoffs(now)
+        cursor = self.conn.execute(
+            "INSERT INTO news (digest, status, owner, updated_at, title) VALUES (?, ?, ?, ?, ?) "
+            "ON CONFLICT(digest) DO UPDATE SET status = excluded.status, owner = excluded.owner, "
+            "updated_at = excluded.updated_at "
+            "WHERE (news.status = ? AND (news.owner = excluded.owner OR news.updated_at < ?)) "
+            "OR (news.status = ? AND news.updated_at < ?)",
+            (news_digest(news), self.CLAIMED, self.owner, now, news.get('title', ''),
+             self.CLAIMED, claim_cutoff, self.SENT, sent_cutoff)
+        )
+        return cursor.rowcount == 1
+
+    def release(self, news: Dict) -> None:
+        """放弃本进程的认领，让其他进程可以重新认领"""
+        self.conn.execute(
+            "DELETE FROM news WHERE digest = ? AND status = ? AND owner = ?",
+            (news_digest(news), self.CLAIMED, self.owner)
+        )
+
+    def refresh_claims(self, news_list: List[Dict]) -> int:
+        """延长这些新闻的认领（不限认领者），返回延长的条数
+
+        已分析、仍在发件箱中等待退避重试的新闻可能比claim_ttl等得更久，
+        定期延长它们的认领，避免认领失效后被其他进程重新分析和推送。
+        """
+        if not news_list:
+            return 0
+        cursor = self.conn.executemany(
+            "UPDATE news SET updated_at = ? WHERE digest = ? AND status = ?",
+            [(time.time(), news_digest(news), self.CLAIMED) for news in news_list]
+        )
+        return cursor.rowcount
+
+    def add_news(self, news: Dict) -> None:
+        """记录新闻已推送"""
+        now = time.time()
+        self.conn.execute(
+            "INSERT INTO news (digest, status, owner, updated_at, title) VALUES (?, ?, ?, ?, ?) "
+            "ON CONFLICT(digest) DO UPDATE SET status = excluded.status, owner = excluded.owner, "
+            "updated_at = excluded.updated_at",
+            (news_digest(news), self.SENT, self.owner, now, news.get('title', ''))
+        )
+        self._purge_expired(now)
+
+    def is_exists(self, news: Dict) -> bool:
+        """新闻已推送（未过期），或正被其他进程处理"""
+        now = time.time()
+        sent_cutoff, claim_cutoff = self._cutoffs(now)
+        row = self.conn.execute(
+            "SELECT 1 FROM news WHERE digest = ? AND ("
+            "(status = ? AND updated_at >= ?) OR (status = ? AND owner != ? AND updated_at >= ?))",
+            (news_digest(news), self.SENT, sent_cutoff, self.CLAIMED, self.owner, claim_cutoff)
+        ).fetchone()
+        return row is not None
+
+    def _purge_expired(self, now: float) -> None:
+        """每小时清理一次过期的推送记录和失效的认领"""
+        if now - self.last_purge < 3600:
+            return
+        self.last_purge = now
+        sent_cutoff, claim_cutoff = self._cutoffs(now)
+        cursor = self.conn.execute(
+            "DELETE FROM news WHERE (status = ? AND updated_at < ?) OR (status = ? AND updated_at < ?)",
+            (self.SENT, sent_cutoff, self.CLAIMED, claim_cutoff)
+        )
+        if cursor.rowcount:
+            self.logger.info(f"Purged {cursor.rowcount} expired entries from shared cache")
+
+    def filter_and_sort_news(self, news_list: List[Dict], limit: int = 15) -> List[Dict]:
+        """按评分从高到低认领未推送的新闻，返回本进程认领到的前N条"""
+        sorted_news = sorted(
+            news_list,
+            key=lambda x: float(x.get('article_score', 0)),
+            reverse=True
+        )
+        
+        claimed = []
+        for news in sorted_news:
+            if len(claimed) >= limit:
+                break
+            if self.claim(news):
+                claimed.append(news)
+        return claimed
+
+    def close(self) -> None:
+        self.conn.close()
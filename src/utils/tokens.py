@@ -0,0 +1,36 @@
+import re
+
+# 中日韩字符（含全角标点）
+_CJK_PATTERN = re.compile(r'[　-〿㐀-䶿一-鿿＀-￯]')
+
+
+def estimate_tokens(text: str) -> int:
+    """粗略估算文本的token数量
+
+    DeepSeek等模型的分词器中，一个汉字约0.6个token，英文约4个字符一个token。
+    该估算只用于预算和统计，不追求与服务端计数完全一致。
+    """
+    if not text:
+        return 0
+    cjk_count = len(_CJK_PATTERN.findall(text))
+    other_count = len(text) - cjk_count
+    return int(cjk_count * 0.6 + other_count / 4) + 1
+
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """将文本截断到估算token数以内，尽量在句末截断"""
+    if not text or max_tokens <= 0:
+        return ''
+    estimated = estimate_tokens(text)
+    if estimated <= max_tokens:
+        return text
+
+    # 按比例估算字符位置，再逐步收缩直到满足预算
+    cut = text[:max(1, int(len(text) * max_tokens / estimated))]
+    while cut and estimate_tokens(cut) > max_tokens:
+        cut = cut[:int(len(cut) * 0.9)]
+
+    end = max(cut.rfind(mark) for mark in '。！？.!?\n')
+    if end >= len(cut) // 2:
+        return cut[:end + 1]
+    return cut.rstrip() + '...'
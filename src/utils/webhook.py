@@ -0,0 +1,55 @@
+import logging
+import aiohttp
+import ssl
+from typing import Optional
+from src.config import Config
+
+class WebhookNotifier:
+    """推送渠道基类：每个渠道持有自己的长连接会话，子类实现send_message
+
+    send_message(content) 接收渲染好的markdown文本，返回是否确认送达。
+    """
+    
+    name = 'webhook'
+    display_name = '推送渠道'
+    
+    def __init__(self):
+        self.config = Config()
+        self.logger = logging.getLogger(__name__)
+        
+        # 长连接会话，由调度器在启动时创建、退出时关闭
+        self.session: Optional[aiohttp.ClientSession] = None
+        
+    async def start(self, ssl_context: Optional[ssl.SSLContext] = None) -> None:
+        """创建带连接池和DNS缓存的共享会话"""
+        if self.session and not self.session.closed:
+            return
+        
+        http_config = self.config.NOTIFY_HTTP
+        connector = aiohttp.TCPConnector(
+            limit=http_config['connection_limit'],
+            ttl_dns_cache=http_config['dns_cache_ttl'],
+            keepalive_timeout=http_config['keepalive_timeout'],
+            ssl=ssl_context if ssl_context is not None else True
+        )
+        self.session = aiohttp.ClientSession(
+            connector=connector,
+            timeout=aiohttp.ClientTimeout(total=http_config['timeout'])
+        )
+        self.logger.info(f"{self.display_name}HTTP会话已创建")
+        
+    async def close(self) -> None:
+        """关闭共享会话"""
+        if self.session and not self.session.closed:
+            await self.session.close()
+            self.logger.info(f"{self.display_name}HTTP会话已关闭")
+        self.session = None
+        
+    async def _get_session(self) -> aiohttp.ClientSession:
+        """获取共享会话，未启动时自动创建"""
+        if self.session is None or self.session.closed:
+            await self.start()
+        return self.session
+    
+    async def send_message(self, content: str) -> bool:
+        raise NotImplementedError
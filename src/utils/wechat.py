@@ -1,14 +1,52 @@
-import logging
-import aiohttp
-import json
-from src.config import Config
+from typing import Optional, Tuple
+from src.utils.access_token import AccessTokenManager
+from src.utils.webhook import WebhookNotifier
 
-class WeChatNotifier:
+# 应用消息接口返回的令牌无效/过期错误码
+INVALID_TOKEN_ERRCODES = {40001, 40014, 42001}
+
+class WeChatNotifier(WebhookNotifier):
+    """企业微信群机器人（send_message）及应用消息接口（send_markdown）"""
+    
+    name = 'wechat'
+    display_name = '企业微信'
+    
     def __init__(self):
-        self.config = Config()
-        self.logger = logging.getLogger(__name__)
+        super().__init__()
         self.webhook_url = f"https://qyapi.weixin.qq.com/cgi-bin/webhook/send?key={self.config.WECHAT['webhook_key']}"
         
+        # 应用消息接口的访问令牌，并发发送时共享同一个刷新请求
+        self.token_manager = AccessTokenManager(
+            'wechat',
+            self._fetch_access_token,
+            refresh_ahead=self.config.WECHAT['token_refresh_ahead'],
+            expiry_margin=self.config.WECHAT['token_expiry_margin']
+        )
+        
+    async def close(self) -> None:
+        """停止令牌后台刷新并关闭共享会话"""
+        await self.token_manager.close()
+        await super().close()
+        
+    async def _fetch_access_token(self) -> Tuple[Optional[str], float]:
+        """请求gettoken接口，返回 (令牌, 有效期秒数)"""
+        params = {
+            "corpid": self.config.WECHAT['corp_id'],
+            "corpsecret": self.config.WECHAT['corp_secret']
+        }
+        session = await self._get_session()
+        async with session.get("https://qyapi.weixin.qq.com/cgi-bin/gettoken", params=params) as response:
+            data = await response.json(content_type=None)
+        
+        if data.get("errcode") == 0:
+            return data["access_token"], data["expires_in"]
+        self.logger.error(f"获取访问令牌失败: {data}")
+        return None, 0
+        
+    async def get_access_token(self) -> Optional[str]:
+        """获取应用消息接口的访问令牌（缓存，过期前后台刷新）"""
+        return await self.token_manager.get()
+        
     async def send_message(self, content: str) -> bool:
         """通过群机器人发送消息"""
         try:
@@ -19,16 +57,16 @@ class WeChatNotifier:
                 }
             }
             
-            async with aiohttp.ClientSession() as session:
-                async with session.post(self.webhook_url, json=data) as response:
-                    if response.status == 200:
-                        result = await response.json()
-                        if result.get("errcode") == 0:
-                            return True
-                        else:
-                            self.logger.error(f"发送消息失败: {result}")
+            session = await self._get_session()
+            async with session.post(self.webhook_url, json=data) as response:
+                if response.status == 200:
+                    result = await response.json()
+                    if result.get("errcode") == 0:
+                        return True
                     else:
-                        self.logger.error(f"请求失败: {response.status}")
+                        self.logger.error(f"发送消息失败: {result}")
+                else:
+                    self.logger.error(f"请求失败: {response.status}")
                         
             return False
             
@@ -39,12 +77,6 @@ class WeChatNotifier:
     async def send_markdown(self, content: str) -> bool:
         """发送markdown格式消息"""
         try:
-            access_token = await self.get_access_token()
-            if not access_token:
-                return False
-                
-            url = f"https://qyapi.weixin.qq.com/cgi-bin/message/send?access_token={access_token}"
-            
             data = {
                 "touser": "@all",
                 "msgtype": "markdown",
@@ -54,19 +86,31 @@ class WeChatNotifier:
                 }
             }
             
-            async with aiohttp.ClientSession() as session:
+            # 令牌被服务端判定无效时丢弃缓存，重新获取后再试一次
+            for attempt in range(2):
+                access_token = await self.get_access_token()
+                if not access_token:
+                    return False
+                    
+                url = f"https://qyapi.weixin.qq.com/cgi-bin/message/send?access_token={access_token}"
+                session = await self._get_session()
                 async with session.post(url, json=data) as response:
-                    if response.status == 200:
-                        result = await response.json()
-                        if result.get("errcode") == 0:
-                            return True
-                        else:
-                            self.logger.error(f"发送markdown消息失败: {result}")
-                    else:
+                    if response.status != 200:
                         self.logger.error(f"请求失败: {response.status}")
+                        return False
+                    result = await response.json()
+                
+                if result.get("errcode") == 0:
+                    return True
+                if result.get("errcode") in INVALID_TOKEN_ERRCODES and attempt == 0:
+                    self.logger.warning(f"访问令牌已失效，重新获取: {result}")
+                    self.token_manager.invalidate()
+                    continue
+                self.logger.error(f"发送markdown消息失败: {result}")
+                return False
                         
             return False
             
         except Exception as e:
             self.logger.error(f"发送markdown消息时出错: {str(e)}")
-            return False 
\ No newline at end of file
+            return False
@@ -0,0 +1,74 @@
+import asyncio
+
+from src.utils.access_token import AccessTokenManager
+
+
+def test_concurrent_callers_share_one_refresh():
+    calls = []
+
+    async def fetch():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return f"token-{len(calls)}", 7200
+
+    async def run():
+        manager = AccessTokenManager('test', fetch)
+        tokens = await asyncio.gather(*(manager.get() for _ in range(20)))
+        cached = await manager.get()
+        stats = manager.get_stats()
+        await manager.close()
+        return tokens, cached, stats
+
+    tokens, cached, stats = asyncio.run(run())
+    assert len(calls) == 1
+    assert tokens == ['token-1'] * 20
+    assert cached == 'token-1'
+    assert stats['fetches'] == 1
+    assert stats['waits'] == 20
+    assert stats['hits'] == 1
+
+
+def test_cancelled_caller_does_not_cancel_shared_refresh():
+    calls = []
+
+    async def fetch():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return 'token', 7200
+
+    async def run():
+        manager = AccessTokenManager('test', fetch)
+        first = asyncio.ensure_future(manager.get())
+        second = asyncio.ensure_future(manager.get())
+        await asyncio.sleep(0.01)
+        first.cancel()
+        token = await second
+        await manager.close()
+        return token
+
+    assert asyncio.run(run()) == 'token'
+    assert len(calls) == 1
+
+
+def test_failed_refresh_is_retried_by_next_caller():
+    results = [RuntimeError('接口不可用'), ('token', 7200)]
+
+    async def fetch():
+        result = results.pop(0)
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    async def run():
+        manager = AccessTokenManager('test', fetch)
+        failed = await manager.get()
+        token = await manager.get()
+        stats = manager.get_stats()
+        await manager.close()
+        return failed, token, stats
+
+    failed, token, stats = asyncio.run(run())
+    assert failed is None
+    assert token == 'token'
+    assert stats['failures'] == 1
+    assert stats['fetches'] == 1
@@ -0,0 +1,120 @@
+import asyncio
+import json
+import threading
+import time
+
+import requests
+
+from src.processors.ai_processor import AIProcessor
+from src.processors.budget_manager import extractive_summary
+from src.config import Config
+from src.utils.rate_limiter import get_rate_limiter
+
+NEWS = {
+    'title': '某公司发布新一代推理芯片',
+    'summary': '某公司今日发布新一代推理芯片。新芯片的能效比上一代提升一倍。预计明年量产。',
+    'tags': ['chip'],
+    'link': 'https://example.com/news/1',
+    'source': 'test'
+}
+
+
+class FakeStreamResponse:
+    """按SSE格式逐行返回预先准备的增量，记录客户端最近一次读到了第几行"""
+
+    status_code = 200
+    headers = {}
+    text = ''
+
+    def __init__(self, deltas):
+        self.lines = []
+        for delta in deltas:
+            chunk = {'choices': [{'delta': delta}]}
+            self.lines.append(f"data: {json.dumps(chunk, ensure_ascii=False)}".encode('utf-8'))
+            self.lines.append(b'')
+        self.lines.append(b'data: [DONE]')
+        self.read = 0
+
+    def iter_lines(self):
+        self.read = 0
+        for line in self.lines:
+            self.read += 1
+            yield line
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def make_processor(monkeypatch, deltas):
+    response = FakeStreamResponse(deltas)
+    monkeypatch.setattr(requests.Session, 'post', lambda session, *args, **kwargs: response)
+    monkeypatch.setitem(Config.RATE_LIMITS, 'enabled', False)
+    processor = AIProcessor()
+    processor.router.order = ['siliconflow']
+    return processor, response
+
+
+def test_long_reasoning_preamble_falls_back_without_tripping_breaker(monkeypatch):
+    reasoning = [{'reasoning_content': '思考' * 10}] * 500
+    processor, response = make_processor(monkeypatch, reasoning + [{'content': '分析内容'}])
+    calls = processor.config.CIRCUIT_BREAKER['failure_threshold'] + 1
+    for _ in range(calls):
+        analysis = asyncio.run(processor.analyze_news(NEWS))
+        assert analysis == extractive_summary(NEWS)
+
+    # 推理预算用完时断开连接，没有读完整个流
+    assert response.read < len(response.lines)
+    stats = processor.get_provider_stats()['siliconflow']
+    assert stats['truncated'] == calls
+    assert stats['failures'] == 0
+    assert stats['breaker']['state'] == 'closed'
+    assert processor.get_usage_stats()['truncated'] == calls
+
+
+def test_content_after_short_reasoning_is_returned(monkeypatch):
+    deltas = [{'reasoning_content': '思考'}] * 20 + [{'content': '芯片能效提升，'}, {'content': '利好端侧推理。'}]
+    processor, _ = make_processor(monkeypatch, deltas)
+
+    assert asyncio.run(processor.analyze_news(NEWS)) == '芯片能效提升，利好端侧推理。'
+    assert processor.get_provider_stats()['siliconflow']['successes'] == 1
+
+
+def _tpm_tokens(processor):
+    limiter = get_rate_limiter('siliconflow', processor.config.SILICONFLOW['model'])
+    limiter.tokens._refill(time.monotonic())
+    return limiter.tokens.tokens
+
+
+def test_failed_and_cancelled_requests_return_tpm_reservation(monkeypatch):
+    # 每分钟额度足够大，测试期间的自然补充可以忽略
+    monkeypatch.setitem(Config.RATE_LIMITS['providers']['siliconflow'], 'test-model', {'rpm': 1000, 'tpm': 10 ** 6})
+    monkeypatch.setitem(Config.SILICONFLOW, 'model', 'test-model')
+    processor = AIProcessor()
+    before = _tpm_tokens(processor)
+
+    error = FakeStreamResponse([])
+    error.status_code = 500
+    monkeypatch.setattr(requests.Session, 'post', lambda session, *args, **kwargs: error)
+    assert processor.call_siliconflow_api_stream(processor._generate_prompt(NEWS)) is None
+    assert processor.call_siliconflow_api(processor._generate_prompt(NEWS)) is None
+    assert _tpm_tokens(processor) >= before - 1
+
+    def timeout(session, *args, **kwargs):
+        raise requests.exceptions.Timeout()
+    monkeypatch.setattr(requests.Session, 'post', timeout)
+    assert processor.call_siliconflow_api(processor._generate_prompt(NEWS)) is None
+    assert _tpm_tokens(processor) >= before - 1
+
+    # 对冲中落败的请求在读到第一行前被取消
+    cancel_event = threading.Event()
+    cancel_event.set()
+    stream = FakeStreamResponse([{'content': '分析'}])
+    monkeypatch.setattr(requests.Session, 'post', lambda session, *args, **kwargs: stream)
+    assert processor.call_siliconflow_api_stream(processor._generate_prompt(NEWS), cancel_event=cancel_event) is None
+    assert _tpm_tokens(processor) >= before - 1
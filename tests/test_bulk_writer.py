@@ -0,0 +1,57 @@
+import threading
+
+from pymongo.errors import AutoReconnect
+
+from src.storage.bulk_writer import BulkWriter
+
+
+class FakeDatabase:
+    """记录每次upsert_batch写入的新闻，可以先失败若干次"""
+
+    def __init__(self, failures=0):
+        self.batches = []
+        self.failures = failures
+        self.lock = threading.Lock()
+
+    def upsert_batch(self, items):
+        with self.lock:
+            if self.failures:
+                self.failures -= 1
+                raise AutoReconnect('连接断开')
+            self.batches.append(items)
+        return {'inserted': len(items), 'modified': 0, 'skipped': 0}
+
+    @property
+    def written(self):
+        return [item for batch in self.batches for item in batch]
+
+
+def test_close_drains_buffer():
+    database = FakeDatabase()
+    # flush_interval很长，只有close()会触发写入
+    writer = BulkWriter(database, flush_size=50, flush_interval=3600)
+    assert writer.submit([{'unique_id': f"id-{index}", 'title': f"新闻 {index}"} for index in range(120)])
+    assert writer.submit([{'unique_id': 'id-0', 'ai_processed': True}])
+    assert database.batches == []
+
+    writer.close(timeout=5)
+    assert not writer.thread.is_alive()
+    assert [len(batch) for batch in database.batches] == [50, 50, 20]
+    written = {item['unique_id']: item for item in database.written}
+    assert len(written) == 120
+    # 同一条新闻的多次更新在缓冲中按字段合并
+    assert written['id-0'] == {'unique_id': 'id-0', 'title': '新闻 0', 'ai_processed': True}
+    assert writer.get_stats()['written'] == 120
+    assert not writer.submit([{'unique_id': 'late'}])
+
+
+def test_close_retries_failed_batch_before_exiting():
+    database = FakeDatabase(failures=2)
+    writer = BulkWriter(database, flush_size=10, flush_interval=3600, retry_backoff=0.05)
+    writer.submit([{'unique_id': f"id-{index}"} for index in range(5)])
+
+    writer.close(timeout=5)
+    assert len(database.written) == 5
+    stats = writer.get_stats()
+    assert stats['retries'] == 2
+    assert stats['buffered'] == 0
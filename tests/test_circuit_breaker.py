@@ -0,0 +1,62 @@
+import time
+
+from src.utils.circuit_breaker import CircuitBreaker
+
+
+def test_opens_after_threshold_and_recovers_through_half_open():
+    breaker = CircuitBreaker('test', failure_threshold=3, recovery_timeout=0.05)
+    for _ in range(2):
+        assert breaker.allow_request()
+        breaker.record_failure()
+    assert breaker.state == CircuitBreaker.CLOSED
+
+    assert breaker.allow_request()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    assert not breaker.allow_request()
+    assert not breaker.is_available()
+
+    # 超过recovery_timeout后只放行一个试探请求
+    time.sleep(0.1)
+    assert breaker.is_available()
+    assert breaker.allow_request()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert not breaker.allow_request()
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
+
+    stats = breaker.get_stats()
+    assert stats['trips'] == 1
+    assert stats['rejected'] == 2
+    assert stats['failures'] == 3
+    assert stats['successes'] == 1
+
+
+def test_failed_trial_reopens():
+    breaker = CircuitBreaker('test', failure_threshold=1, recovery_timeout=0.05)
+    breaker.record_failure()
+    time.sleep(0.1)
+    assert breaker.allow_request()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    assert not breaker.allow_request()
+    assert breaker.get_stats()['trips'] == 2
+
+
+def test_released_trial_lets_next_request_through():
+    breaker = CircuitBreaker('test', failure_threshold=1, recovery_timeout=0.05)
+    breaker.record_failure()
+    time.sleep(0.1)
+    assert breaker.allow_request()
+    # 对冲中落败的试探请求被取消，不计入成败
+    breaker.release()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert breaker.allow_request()
+
+
+def test_success_resets_consecutive_failures():
+    breaker = CircuitBreaker('test', failure_threshold=2)
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.CLOSED
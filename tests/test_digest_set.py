@@ -0,0 +1,38 @@
+import os
+import random
+
+from src.utils.digest_set import DigestSet, TimeBucketedDigestSet
+
+
+def test_remove_keeps_colliding_digests_reachable():
+    random.seed(0)
+    digests = DigestSet(16)
+    expected = {}
+    for step in range(5000):
+        # 只有前两个字节随机，大量摘要落在同一条探测链上
+        digest = os.urandom(2) + bytes(14)
+        if random.random() < 0.5:
+            if digests.add(digest, step + 1.0):
+                expected[digest] = step + 1.0
+        else:
+            assert digests.remove(digest) == (digest in expected)
+            expected.pop(digest, None)
+    assert len(digests) == len(expected)
+    assert dict(digests.items()) == expected
+
+
+def test_expired_digest_is_moved_not_counted_twice():
+    digests = TimeBucketedDigestSet(bucket_seconds=10)
+    digest = b'x' * 16
+    assert digests.add(digest, 5.0)
+    assert not digests.add(digest, 15.0, expired_before=1.0)
+
+    # 旧条目已过期但所在的桶还没丢弃
+    assert digests.add(digest, 25.0, expired_before=20.0)
+    assert len(digests) == 1
+    assert list(digests.buckets) == [2]
+    assert digests.get(digest) == 25.0
+
+    digests.expire(30.0)
+    assert len(digests) == 0
+    assert digest not in digests
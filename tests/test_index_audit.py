@@ -0,0 +1,185 @@
+from src.storage.database import Database, _shape_report
+from src.storage.index_audit import print_report
+
+ESR_INDEX = 'text_processed_1_language_1_published_-1_unique_id_-1'
+
+# MongoDB 5.0及以前的classic执行计划
+CLASSIC_PLAN = {
+    'queryPlanner': {
+        'winningPlan': {
+            'stage': 'LIMIT',
+            'limitAmount': 100,
+            'inputStage': {
+                'stage': 'PROJECTION_DEFAULT',
+                'inputStage': {
+                    'stage': 'FETCH',
+                    'inputStage': {'stage': 'IXSCAN', 'indexName': ESR_INDEX, 'direction': 'forward'}
+                }
+            }
+        },
+        'rejectedPlans': []
+    },
+    'executionStats': {'nReturned': 100, 'totalKeysExamined': 100, 'totalDocsExamined': 100}
+}
+
+# 6.0起的SBE执行计划：阶段树在queryPlan下，slotBasedPlan是字符串形式的执行细节
+SBE_PLAN = {
+    'explainVersion': '2',
+    'queryPlanner': {
+        'winningPlan': {
+            'queryPlan': {
+                'stage': 'LIMIT',
+                'planNodeId': 3,
+                'inputStage': {
+                    'stage': 'FETCH',
+                    'planNodeId': 2,
+                    'inputStage': {'stage': 'IXSCAN', 'planNodeId': 1, 'indexName': ESR_INDEX}
+                }
+            },
+            'slotBasedPlan': {'slots': '$$RESULT=s11', 'stages': '[3] limit 100 ...'}
+        }
+    },
+    'executionStats': {'nReturned': 100, 'totalKeysExamined': 101, 'totalDocsExamined': 100}
+}
+
+# $or的两个分支各走一个索引，按索引顺序归并（SORT_MERGE），不是内存排序
+OR_PLAN = {
+    'queryPlanner': {
+        'winningPlan': {
+            'stage': 'SUBPLAN',
+            'inputStage': {
+                'stage': 'LIMIT',
+                'inputStage': {
+                    'stage': 'FETCH',
+                    'inputStage': {
+                        'stage': 'SORT_MERGE',
+                        'inputStages': [
+                            {'stage': 'IXSCAN', 'indexName': 'published_-1_unique_id_-1'},
+                            {'stage': 'IXSCAN', 'indexName': ESR_INDEX}
+                        ]
+                    }
+                }
+            }
+        }
+    },
+    'executionStats': {'nReturned': 100, 'totalKeysExamined': 140, 'totalDocsExamined': 100}
+}
+
+# 分片集群上每个分片各有一个winningPlan；没有可用索引时全表扫描后在内存中排序
+SHARDED_COLLSCAN_SORT_PLAN = {
+    'queryPlanner': {
+        'winningPlan': {
+            'stage': 'SINGLE_SHARD',
+            'shards': [{
+                'shardName': 'shard0',
+                'winningPlan': {
+                    'stage': 'SORT',
+                    'sortPattern': {'published': -1, 'unique_id': -1},
+                    'inputStage': {'stage': 'COLLSCAN', 'direction': 'forward'}
+                }
+            }]
+        }
+    },
+    'executionStats': {'nReturned': 100, 'totalKeysExamined': 0, 'totalDocsExamined': 50000}
+}
+
+TEXT_SEARCH_PLAN = {
+    'queryPlanner': {
+        'winningPlan': {
+            'stage': 'SORT',
+            'inputStage': {
+                'stage': 'TEXT_MATCH',
+                'inputStage': {
+                    'stage': 'FETCH',
+                    'inputStage': {
+                        'stage': 'TEXT_OR',
+                        'inputStage': {'stage': 'IXSCAN', 'indexName': 'title_text_summary_text_keywords_text'}
+                    }
+                }
+            }
+        }
+    },
+    'executionStats': {'nReturned': 12, 'totalKeysExamined': 12, 'totalDocsExamined': 12}
+}
+
+
+def _shape(name, allow_sort=False):
+    return {'name': name, 'filter': {}, 'sort': None, 'allow_sort': allow_sort}
+
+
+def test_classic_and_sbe_plans_are_parsed_alike():
+    classic = _shape_report(_shape('latest_by_language'), CLASSIC_PLAN)
+    sbe = _shape_report(_shape('latest_by_language'), SBE_PLAN)
+
+    assert classic['stages'] == ['LIMIT', 'PROJECTION_DEFAULT', 'FETCH', 'IXSCAN']
+    assert sbe['stages'] == ['LIMIT', 'FETCH', 'IXSCAN']
+    for report in (classic, sbe):
+        assert report['indexes'] == [ESR_INDEX]
+        assert report['problems'] == []
+    assert sbe['keys_examined'] == 101
+    assert sbe['docs_examined'] == 100
+    assert sbe['returned'] == 100
+
+
+def test_or_branches_are_all_walked():
+    report = _shape_report(_shape('latest_next_page'), OR_PLAN)
+    assert report['stages'] == ['SUBPLAN', 'LIMIT', 'FETCH', 'SORT_MERGE', 'IXSCAN', 'IXSCAN']
+    assert report['indexes'] == ['published_-1_unique_id_-1', ESR_INDEX]
+    assert report['problems'] == []
+
+
+def test_collscan_and_sort_are_flagged_unless_sort_is_accepted():
+    report = _shape_report(_shape('latest'), SHARDED_COLLSCAN_SORT_PLAN)
+    assert report['stages'] == ['SINGLE_SHARD', 'SORT', 'COLLSCAN']
+    assert report['problems'] == ['COLLSCAN', 'SORT']
+
+    search = _shape_report(_shape('search', allow_sort=True), TEXT_SEARCH_PLAN)
+    assert search['problems'] == []
+    assert _shape_report(_shape('latest'), TEXT_SEARCH_PLAN)['problems'] == ['SORT']
+
+
+class FakeCursor:
+    def __init__(self, plan):
+        self.plan = plan
+
+    def limit(self, limit):
+        return self
+
+    def sort(self, sort):
+        return self
+
+    def explain(self):
+        return self.plan
+
+
+class FakeCollection:
+    """按查询形状的名称返回预先准备的执行计划，其余形状都用classic计划"""
+
+    def __init__(self, shapes, plans):
+        self.plans = [plans.get(shape['name'], CLASSIC_PLAN) for shape in shapes]
+
+    def find(self, query, projection):
+        return FakeCursor(self.plans.pop(0))
+
+
+def _audit(plans, capsys):
+    database = Database.__new__(Database)
+    database.collection = FakeCollection(database.query_shapes(), plans)
+    report = database.explain_query_shapes()
+    exit_code = print_report(report, legacy=[])
+    return report, exit_code, capsys.readouterr().out
+
+
+def test_audit_exit_code(capsys):
+    plans = {'latest_next_page': OR_PLAN, 'latest_all': SBE_PLAN,
+             'search': TEXT_SEARCH_PLAN, 'search_stream_next_page': TEXT_SEARCH_PLAN}
+    report, exit_code, output = _audit(plans, capsys)
+    assert exit_code == 0
+    assert all(row['problems'] == [] for row in report)
+    assert '需要检查索引' not in output
+
+    plans['latest_by_tags'] = SHARDED_COLLSCAN_SORT_PLAN
+    report, exit_code, output = _audit(plans, capsys)
+    assert exit_code == 1
+    assert [row['name'] for row in report if row['problems']] == ['latest_by_tags']
+    assert '1 个查询形状需要检查索引: latest_by_tags' in output
@@ -0,0 +1,46 @@
+import os
+
+from src.utils.news_cache import NewsCache, news_digest
+
+
+def _news(index):
+    return {'title': f"新闻 {index}", 'link': f"https://example.com/news/{index}", 'source': 'test'}
+
+
+def test_journal_replay_stops_at_truncated_tail(tmp_path):
+    cache = NewsCache(cache_dir=str(tmp_path))
+    for index in range(3):
+        cache.add_news(_news(index))
+    cache.close()
+
+    # 模拟写到一半时崩溃：最后一条记录只写了一部分
+    journal_path = os.path.join(tmp_path, 'news_cache.journal')
+    with open(journal_path, 'ab') as f:
+        f.write(f'{{"k":"{news_digest(_news(3)).hex()}","t":17'.encode('utf-8'))
+
+    cache = NewsCache(cache_dir=str(tmp_path))
+    assert len(cache.digests) == 3
+    assert all(cache.is_exists(_news(index)) for index in range(3))
+    assert not cache.is_exists(_news(3))
+
+    # 继续写入时先截掉残缺行，新记录不会接在它后面
+    cache.add_news(_news(4))
+    cache.close()
+    cache = NewsCache(cache_dir=str(tmp_path))
+    assert len(cache.digests) == 4
+    assert cache.is_exists(_news(4))
+    cache.close()
+
+
+def test_compacted_snapshot_and_journal_are_merged(tmp_path):
+    cache = NewsCache(cache_dir=str(tmp_path))
+    cache.add_news(_news(0))
+    cache.compact(wait=True)
+    cache.add_news(_news(1))
+    cache.add_news(_news(0))
+    cache.close()
+
+    cache = NewsCache(cache_dir=str(tmp_path))
+    assert len(cache.digests) == 2
+    assert cache.is_exists(_news(0)) and cache.is_exists(_news(1))
+    cache.close()
@@ -0,0 +1,74 @@
+import multiprocessing
+import os
+import time
+
+from src.utils.outbox import Outbox
+
+MESSAGES = 200
+
+
+def _drain(db_path: str, worker_id: int, start_event, results) -> None:
+    """模拟一个调度进程的发件箱后台发送：反复取出到期消息并标记为已发送"""
+    outbox = Outbox(db_path, owner=f"worker-{worker_id}")
+    start_event.wait()
+    sent = []
+    idle_since = None
+    while True:
+        entries = outbox.due('wechat', limit=5)
+        if not entries:
+            if outbox.next_due_in('wechat') is None:
+                break
+            idle_since = idle_since or time.monotonic()
+            if time.monotonic() - idle_since > 5:
+                break
+            time.sleep(0.01)
+            continue
+        idle_since = None
+        for entry in entries:
+            sent.append(entry['id'])
+            outbox.mark_sent(entry['id'])
+    outbox.close()
+    results.put(sent)
+
+
+def test_two_workers_send_each_message_once(tmp_path):
+    db_path = os.path.join(tmp_path, 'outbox.db')
+    outbox = Outbox(db_path)
+    for index in range(MESSAGES):
+        outbox.enqueue('wechat', f"消息 {index}", [{'title': f"新闻 {index}"}], [f"key-{index}"])
+    outbox.close()
+
+    start_event = multiprocessing.Event()
+    results = multiprocessing.Queue()
+    workers = [
+        multiprocessing.Process(target=_drain, args=(db_path, worker_id, start_event, results))
+        for worker_id in range(2)
+    ]
+    for worker in workers:
+        worker.start()
+    start_event.set()
+    sent = [message_id for _ in workers for message_id in results.get(timeout=60)]
+    for worker in workers:
+        worker.join(10)
+
+    assert len(sent) == MESSAGES
+    assert len(set(sent)) == MESSAGES
+    assert Outbox(db_path).get_stats() == {'sent': MESSAGES}
+
+
+def test_expired_lease_is_taken_over(tmp_path):
+    db_path = os.path.join(tmp_path, 'outbox.db')
+    first = Outbox(db_path, lease=0.05, owner='first')
+    second = Outbox(db_path, owner='second')
+    message_id = first.enqueue('wechat', '消息', [{'title': '新闻'}], ['key'])
+
+    assert [entry['id'] for entry in first.due('wechat')] == [message_id]
+    assert second.due('wechat') == []
+
+    time.sleep(0.1)
+    assert [entry['id'] for entry in second.due('wechat')] == [message_id]
+    # 租用已被接管，原租用者的失败结果不再生效
+    first.mark_failed(message_id, '超时')
+    assert second.pending_keys() == {'key'}
+    second.mark_sent(message_id)
+    assert second.pending_keys() == set()
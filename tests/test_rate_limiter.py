@@ -0,0 +1,65 @@
+import threading
+import time
+
+from src.utils.rate_limiter import RateLimiter, parse_retry_after
+
+
+def _available_tokens(limiter):
+    limiter.tokens._refill(time.monotonic())
+    return limiter.tokens.tokens
+
+
+def test_settle_returns_unused_reservation():
+    limiter = RateLimiter('test', rpm=60, tpm=6000)
+    capacity = limiter.tokens.capacity
+    assert limiter.acquire(tokens=80)
+    assert _available_tokens(limiter) < capacity - 79
+
+    limiter.settle(reserved=80, actual=20)
+    assert capacity - 21 < _available_tokens(limiter) < capacity - 19
+
+    # 实际用量超过预留时补扣差额
+    limiter.settle(reserved=0, actual=30)
+    assert capacity - 51 < _available_tokens(limiter) < capacity - 49
+
+    # 失败的请求退回全部预留，余额不超过容量
+    limiter.settle(reserved=1000, actual=0)
+    assert _available_tokens(limiter) == capacity
+
+
+def test_settle_without_tpm_limit_is_noop():
+    limiter = RateLimiter('test', rpm=60)
+    assert limiter.acquire(tokens=100)
+    limiter.settle(reserved=100, actual=0)
+    assert limiter.tokens is None
+
+
+def test_penalize_blocks_until_retry_after():
+    limiter = RateLimiter('test', rpm=6000, max_wait=5.0)
+    limiter.penalize(0.2)
+    assert limiter.stats['throttled'] == 1
+
+    start = time.monotonic()
+    assert limiter.acquire()
+    assert time.monotonic() - start >= 0.15
+
+
+def test_penalize_beyond_max_wait_rejects_and_cancel_stops_waiting():
+    limiter = RateLimiter('test', rpm=6000, max_wait=0.1)
+    limiter.penalize(10)
+    assert not limiter.acquire()
+    assert limiter.stats['rejected'] == 1
+
+    limiter.max_wait = 60
+    cancel_event = threading.Event()
+    threading.Timer(0.05, cancel_event.set).start()
+    start = time.monotonic()
+    assert not limiter.acquire(cancel_event=cancel_event)
+    assert time.monotonic() - start < 1.0
+
+
+def test_parse_retry_after():
+    assert parse_retry_after('3', 10.0) == 3.0
+    assert parse_retry_after(None, 10.0) == 10.0
+    assert parse_retry_after('soon', 10.0) == 10.0
+    assert parse_retry_after('Wed, 21 Oct 2015 07:28:00 GMT', 10.0) == 0.0
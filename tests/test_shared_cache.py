@@ -0,0 +1,52 @@
+import os
+import time
+
+from src.utils.shared_cache import SharedNewsCache
+
+NEWS = {'title': '某公司发布新一代推理芯片', 'link': 'https://example.com/news/1', 'source': 'test'}
+
+
+def test_only_one_process_claims_a_news_item(tmp_path):
+    db_path = os.path.join(tmp_path, 'shared.db')
+    first = SharedNewsCache(db_path, owner='first')
+    second = SharedNewsCache(db_path, owner='second')
+
+    assert first.claim(NEWS)
+    assert first.claim(NEWS)
+    assert not second.claim(NEWS)
+    assert second.is_exists(NEWS)
+    assert not first.is_exists(NEWS)
+
+    # 推送后对两个进程都是已存在，不能再被认领
+    first.add_news(NEWS)
+    assert first.is_exists(NEWS)
+    assert not second.claim(NEWS)
+
+
+def test_expired_claim_is_taken_over(tmp_path):
+    db_path = os.path.join(tmp_path, 'shared.db')
+    first = SharedNewsCache(db_path, claim_ttl=0.05, owner='first')
+    second = SharedNewsCache(db_path, claim_ttl=0.05, owner='second')
+
+    assert first.claim(NEWS)
+    assert not second.claim(NEWS)
+
+    time.sleep(0.1)
+    assert not second.is_exists(NEWS)
+    assert second.claim(NEWS)
+    assert not first.claim(NEWS)
+    # 认领已被接管，原认领者放弃时不会删除新认领者的记录
+    first.release(NEWS)
+    assert first.is_exists(NEWS)
+
+
+def test_refreshed_claim_is_not_taken_over(tmp_path):
+    db_path = os.path.join(tmp_path, 'shared.db')
+    first = SharedNewsCache(db_path, claim_ttl=0.2, owner='first')
+    second = SharedNewsCache(db_path, claim_ttl=0.2, owner='second')
+
+    assert first.claim(NEWS)
+    time.sleep(0.15)
+    assert first.refresh_claims([NEWS]) == 1
+    time.sleep(0.1)
+    assert not second.claim(NEWS)
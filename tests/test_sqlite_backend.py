@@ -0,0 +1,32 @@
+import os
+
+from src.storage.sqlite_backend import SQLiteDatabase, build_match_query
+
+NEWS = [
+    {'unique_id': 'a-share', 'title': 'A股市场大涨', 'summary': '沪指收涨2%', 'published': '2024-05-01T08:00:00'},
+    {'unique_id': '5g-chip', 'title': '国产5G芯片量产', 'summary': '基带芯片性能提升', 'published': '2024-05-02T08:00:00'},
+    {'unique_id': 'b-share', 'title': 'B股退市', 'summary': '市场关注A 股表现', 'published': '2024-05-03T08:00:00'},
+]
+
+
+def _titles(results):
+    return [item['title'] for item in results]
+
+
+def test_mixed_latin_and_cjk_terms_are_found(tmp_path):
+    database = SQLiteDatabase(os.path.join(tmp_path, 'news.db'))
+    database.upsert_batch(NEWS)
+
+    assert _titles(database.search_news('A股')) == ['A股市场大涨']
+    assert _titles(database.search_news('a股')) == ['A股市场大涨']
+    assert _titles(database.search_news('5G芯片')) == ['国产5G芯片量产']
+    assert _titles(database.search_news('5G芯片 量产')) == ['国产5G芯片量产']
+    assert _titles(database.search_news('股')) == ['B股退市', 'A股市场大涨']
+    database.close()
+
+
+def test_single_cjk_characters_fall_back_to_like():
+    assert build_match_query('芯片 量产') == ('"芯片" "量产"', [])
+    assert build_match_query('5G芯片') == ('"5G 芯片"', [])
+    assert build_match_query('A股') == ('"A"', ['A股'])
+    assert build_match_query('股') == (None, ['股'])